@@ -90,24 +90,16 @@ class Kontrola_RAG_Pipeline {
             return; // Agent not available, skip indexing
         }
 
-        $vectors = [];
-        $metadata = [];
+        $texts = [];
+        $candidates = [];
 
         foreach ($plugins as $path => $data) {
             $plugin_name = basename(dirname($path));
 
             // Read plugin file to extract more metadata
             $content = self::extract_plugin_content($path);
-            $text = $data['Name'] . '. ' . $data['Description'] . '. ' . implode(' ', (array) $data['Tags']);
-
-            // Generate embedding (via agent)
-            $embedding = self::get_embedding($text);
-            if (!$embedding) {
-                continue;
-            }
-
-            $vectors[] = $embedding;
-            $metadata[] = [
+            $texts[] = $data['Name'] . '. ' . $data['Description'] . '. ' . implode(' ', (array) $data['Tags']);
+            $candidates[] = [
                 'type' => 'plugin',
                 'name' => $data['Name'],
                 'slug' => $plugin_name,
@@ -119,6 +111,9 @@ class Kontrola_RAG_Pipeline {
             ];
         }
 
+        // Generate embeddings (via agent, batched)
+        [$vectors, $metadata] = self::embed_candidates($texts, $candidates);
+
         if (!empty($vectors)) {
             self::insert_vectors('plugins', $vectors, $metadata);
         }
@@ -137,19 +132,12 @@ class Kontrola_RAG_Pipeline {
             return;
         }
 
-        $vectors = [];
-        $metadata = [];
+        $texts = [];
+        $candidates = [];
 
         foreach ($themes as $theme) {
-            $text = $theme->get('Name') . '. ' . $theme->get('Description');
-
-            $embedding = self::get_embedding($text);
-            if (!$embedding) {
-                continue;
-            }
-
-            $vectors[] = $embedding;
-            $metadata[] = [
+            $texts[] = $theme->get('Name') . '. ' . $theme->get('Description');
+            $candidates[] = [
                 'type' => 'theme',
                 'name' => $theme->get('Name'),
                 'slug' => $theme->get_stylesheet(),
@@ -160,6 +148,8 @@ class Kontrola_RAG_Pipeline {
             ];
         }
 
+        [$vectors, $metadata] = self::embed_candidates($texts, $candidates);
+
         if (!empty($vectors)) {
             self::insert_vectors('themes', $vectors, $metadata);
         }
@@ -191,20 +181,13 @@ class Kontrola_RAG_Pipeline {
             return;
         }
 
-        $vectors = [];
-        $metadata = [];
+        $texts = [];
+        $candidates = [];
 
         foreach ($posts as $post) {
             $text = $post->post_title . '. ' . wp_strip_all_tags($post->post_content);
-            $text = substr($text, 0, 2000); // Limit to 2000 chars for embedding
-
-            $embedding = self::get_embedding($text);
-            if (!$embedding) {
-                continue;
-            }
-
-            $vectors[] = $embedding;
-            $metadata[] = [
+            $texts[] = substr($text, 0, 2000); // Limit to 2000 chars for embedding
+            $candidates[] = [
                 'type' => 'post',
                 'id' => $post->ID,
                 'title' => $post->post_title,
@@ -215,6 +198,8 @@ class Kontrola_RAG_Pipeline {
             ];
         }
 
+        [$vectors, $metadata] = self::embed_candidates($texts, $candidates);
+
         if (!empty($vectors)) {
             self::insert_vectors('posts', $vectors, $metadata);
         }
@@ -229,20 +214,80 @@ class Kontrola_RAG_Pipeline {
      * @return array|null Vector embedding or null if failed
      */
     private static function get_embedding($text) {
+        $embeddings = self::get_embeddings([$text]);
+        return $embeddings[0] ?? null;
+    }
+
+    /**
+     * Get vector embeddings for many texts via the agent's batched /embed endpoint.
+     *
+     * @param string[] $texts The texts to embed
+     * @return array Embeddings keyed like $texts (missing entries failed)
+     */
+    private static function get_embeddings(array $texts): array {
         $agent_url = self::get_agent_url();
-        if (!$agent_url) {
-            return null;
+        if (!$agent_url || empty($texts)) {
+            return [];
         }
 
-        // For now, use a simple hash-based pseudo-vector
-        // In production, call agent's embedding API or OpenAI
-        $hash = hash('sha256', $text, true);
-        $vector = [];
-        for ($i = 0; $i < 1536; $i++) { // OpenAI embedding dim
-            $vector[] = ((ord($hash[$i % 32]) / 256) * 2) - 1;
+        $url = trailingslashit($agent_url) . 'embed';
+        $secret = self::get_agent_secret();
+        $keys = array_keys($texts);
+        $embeddings = [];
+
+        // One request per chunk; the agent batches model calls and caches by content hash.
+        foreach (array_chunk($keys, 64) as $chunk) {
+            $body = [
+                'texts' => array_values(array_map(function ($key) use ($texts) {
+                    return (string) $texts[$key];
+                }, $chunk)),
+            ];
+
+            $args = [
+                'method' => 'POST',
+                'timeout' => 60,
+                'headers' => ['Content-Type' => 'application/json'],
+                'body' => wp_json_encode($body),
+            ];
+
+            if ($secret) {
+                $args['headers']['X-Kontrola-Secret'] = $secret;
+            }
+
+            $response = wp_remote_post($url, $args);
+            if (is_wp_error($response) || wp_remote_retrieve_response_code($response) !== 200) {
+                continue;
+            }
+
+            $data = json_decode(wp_remote_retrieve_body($response), true);
+            if (empty($data['embeddings']) || count($data['embeddings']) !== count($chunk)) {
+                continue;
+            }
+
+            foreach ($chunk as $i => $key) {
+                $embeddings[$key] = $data['embeddings'][$i];
+            }
+        }
+
+        return $embeddings;
+    }
+
+    /**
+     * Embed $texts and pair each vector with its $candidates metadata,
+     * dropping entries whose embedding failed.
+     *
+     * @return array [vectors, metadata]
+     */
+    private static function embed_candidates(array $texts, array $candidates): array {
+        $vectors = [];
+        $metadata = [];
+
+        foreach (self::get_embeddings($texts) as $i => $embedding) {
+            $vectors[] = $embedding;
+            $metadata[] = $candidates[$i];
         }
 
-        return $vector;
+        return [$vectors, $metadata];
     }
 
     /**
@@ -0,0 +1,285 @@
+"""
+Caching helpers for Kontrola Agent.
+
+- SingleFlight: coalesces concurrent async calls for the same key so only one
+  of them does the expensive work while the others await its result.
+- ReadThroughCache: JSON values in Redis with a TTL, populated on miss through
+  a SingleFlight so an expired hot key is repopulated exactly once.
+- SemanticCache: reuses a stored value when a new text embeds within a
+  similarity threshold of an earlier one, via the VectorStore abstraction.
+
+Redis is optional. When it is missing or unreachable the cache degrades to
+single-flight only, and stops trying Redis for a short back-off period so a
+dead cache never adds its connect timeout to every request.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from typing import Any, Awaitable, Callable
+
+import numpy as np
+
+
+class SingleFlight:
+    """Deduplicate concurrent in-flight async calls by key."""
+
+    def __init__(self):
+        self._inflight: dict[str, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> tuple[Any, bool]:
+        """
+        Await fn() unless a call for key is already running, in which case
+        await that one instead. Returns (result, shared).
+        """
+        while True:
+            fut = self._inflight.get(key)
+            if fut is None:
+                break
+            try:
+                return await asyncio.shield(fut), True
+            except asyncio.CancelledError:
+                # The leader was cancelled (its client went away); take over.
+                if fut.cancelled():
+                    continue
+                raise
+
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except BaseException as e:
+            fut.set_exception(e)
+            # Mark retrieved so asyncio does not warn when nobody was waiting.
+            fut.exception()
+            raise
+        else:
+            fut.set_result(result)
+            return result, False
+        finally:
+            self._inflight.pop(key, None)
+
+
+class ReadThroughCache:
+    """Redis-backed read-through cache with stampede protection and hit/miss counters."""
+
+    def __init__(self, client: Any, namespace: str, ttl: int = 300, retry_after: float = 30.0):
+        self.client = client
+        self.namespace = namespace
+        self.ttl = ttl
+        self.retry_after = retry_after
+        self._flight = SingleFlight()
+        self._lock = threading.Lock()
+        self._disabled_until = 0.0
+        self._counters = {"hits": 0, "misses": 0, "coalesced": 0, "errors": 0}
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Any]], ttl: int | None = None) -> Any:
+        """Return the cached JSON value for key, calling loader() once on a miss."""
+        value, _ = await self.fetch(key, loader, ttl)
+        return value
+
+    async def fetch(
+        self, key: str, loader: Callable[[], Awaitable[Any]], ttl: int | None = None
+    ) -> tuple[Any, str]:
+        """Like get_or_load(), also returning how it was served: 'hit', 'miss' or 'coalesced'."""
+        full_key = f"{self.namespace}:{key}"
+        cached = await self._get(full_key)
+        if cached is not None:
+            self._count("hits")
+            return cached, "hit"
+
+        async def load() -> Any:
+            # Re-check: another request may have stored it while we were missing.
+            cached = await self._get(full_key)
+            if cached is not None:
+                return cached
+            value = await loader()
+            await self._set(full_key, value, self.ttl if ttl is None else ttl)
+            return value
+
+        value, shared = await self._flight.do(full_key, load)
+        self._count("coalesced" if shared else "misses")
+        return value, "coalesced" if shared else "miss"
+
+    async def lookup(self, key: str) -> Any:
+        """Plain cache read (counted as a hit or miss); None when absent."""
+        value = await self._get(f"{self.namespace}:{key}")
+        self._count("hits" if value is not None else "misses")
+        return value
+
+    async def store(self, key: str, value: Any, ttl: int | None = None) -> None:
+        await self._set(f"{self.namespace}:{key}", value, self.ttl if ttl is None else ttl)
+
+    async def lookup_many(self, keys: list[str]) -> list[Any]:
+        """lookup() for several keys in one MGET round trip; None for each absent key."""
+        if not keys or not self._redis_usable():
+            values = [None] * len(keys)
+        else:
+            try:
+                raw = await asyncio.to_thread(self.client.mget, [f"{self.namespace}:{k}" for k in keys])
+                values = [json.loads(v) if v is not None else None for v in raw]
+            except Exception:
+                self._redis_failed()
+                values = [None] * len(keys)
+        hits = sum(v is not None for v in values)
+        with self._lock:
+            self._counters["hits"] += hits
+            self._counters["misses"] += len(keys) - hits
+        return values
+
+    async def store_many(self, items: dict[str, Any], ttl: int | None = None) -> None:
+        """store() for several keys in one pipelined round trip."""
+        if not items or not self._redis_usable():
+            return
+        ttl = self.ttl if ttl is None else ttl
+
+        def write() -> None:
+            pipe = self.client.pipeline(transaction=False)
+            for key, value in items.items():
+                pipe.set(f"{self.namespace}:{key}", json.dumps(value), ex=ttl)
+            pipe.execute()
+
+        try:
+            await asyncio.to_thread(write)
+        except Exception:
+            self._redis_failed()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+        lookups = counters["hits"] + counters["misses"] + counters["coalesced"]
+        return {
+            "namespace": self.namespace,
+            "ttl": self.ttl,
+            **counters,
+            "hit_rate": round(counters["hits"] / lookups, 4) if lookups else 0.0,
+            "inflight": len(self._flight),
+            "redis_enabled": self._redis_usable(),
+        }
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+    def _redis_usable(self) -> bool:
+        return self.client is not None and time.monotonic() >= self._disabled_until
+
+    def _redis_failed(self) -> None:
+        with self._lock:
+            self._counters["errors"] += 1
+            self._disabled_until = time.monotonic() + self.retry_after
+
+    async def _get(self, key: str) -> Any:
+        if not self._redis_usable():
+            return None
+        try:
+            raw = await asyncio.to_thread(self.client.get, key)
+        except Exception:
+            self._redis_failed()
+            return None
+        return json.loads(raw) if raw is not None else None
+
+    async def _set(self, key: str, value: Any, ttl: int) -> None:
+        if not self._redis_usable():
+            return
+        try:
+            await asyncio.to_thread(self.client.set, key, json.dumps(value), ex=ttl)
+        except Exception:
+            self._redis_failed()
+
+
+class SemanticCache:
+    """
+    Nearest-neighbour cache: a lookup embeds the text, searches `collection`
+    in the vector store and returns the stored value of the closest entry
+    whose cosine similarity reaches `threshold`. Entries are partitioned by a
+    caller-supplied scope string (e.g. model + settings) and expire after ttl.
+    """
+
+    def __init__(
+        self,
+        store: Any,
+        embed: Callable[[str], Awaitable[list[float]]],
+        collection: str,
+        threshold: float = 0.95,
+        ttl: int = 86400,
+        candidates: int = 5,
+    ):
+        self.store = store
+        self.embed = embed
+        self.collection = collection
+        self.threshold = threshold
+        self.ttl = ttl
+        self.candidates = candidates
+        self._collection_ready = False
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "errors": 0}
+
+    async def lookup(self, scope: str, text: str) -> tuple[Any, list[float] | None]:
+        """Return (value or None, embedding of text) so a miss can reuse the embedding in remember()."""
+        try:
+            vector = _unit(await self.embed(text))
+            results = await asyncio.to_thread(
+                self.store.search, self.collection, vector, self.candidates, {"scope": scope}
+            )
+        except Exception:
+            self._count("errors")
+            return None, None
+
+        now = time.time()
+        for r in results:
+            meta = r.get("metadata") or {}
+            # Not every backend pushes the filter down, so re-check it here.
+            if meta.get("scope") != scope or now - float(meta.get("created_at", 0)) > self.ttl:
+                continue
+            if self.store.score_to_similarity(r["score"]) >= self.threshold:
+                self._count("hits")
+                return json.loads(meta["value"]), vector
+        self._count("misses")
+        return None, vector
+
+    async def remember(self, scope: str, text: str, value: Any, vector: list[float] | None = None) -> None:
+        try:
+            vector = vector or _unit(await self.embed(text))
+            if not self._collection_ready:
+                try:
+                    await asyncio.to_thread(self.store.create_collection, self.collection, len(vector))
+                except Exception:
+                    pass  # Already exists on backends without create-if-missing.
+                self._collection_ready = True
+            entry_id = hashlib.sha256(f"{scope}\0{text}".encode()).hexdigest()[:32]
+            meta = {"scope": scope, "value": json.dumps(value), "created_at": time.time()}
+            await asyncio.to_thread(self.store.insert, self.collection, [vector], [meta], [entry_id])
+        except Exception:
+            self._count("errors")
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+        lookups = counters["hits"] + counters["misses"]
+        return {
+            "collection": self.collection,
+            "threshold": self.threshold,
+            **counters,
+            "hit_rate": round(counters["hits"] / lookups, 4) if lookups else 0.0,
+        }
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+
+def _unit(vector: list[float]) -> list[float]:
+    arr = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(arr))
+    return (arr / norm).tolist() if norm else arr.tolist()
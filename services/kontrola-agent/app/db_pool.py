@@ -0,0 +1,257 @@
+"""
+Connection pooling for Kontrola Agent database integrations.
+
+Provides a small, driver-agnostic, thread-safe pool:
+- Bounded size with backpressure (callers wait up to a timeout for a free slot)
+- Health-checking of idle connections before they are handed out
+- Max-lifetime recycling so long-lived connections are rotated
+- Optional min_size floor of idle connections, filled by warm()
+- Counters exposed via stats() for status endpoints
+
+The pool never opens connections in its constructor; slots are filled on
+first use (or by an explicit warm()) so the agent can start even when the
+database is down.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Iterator
+
+
+class PoolError(RuntimeError):
+    """Base class for pool checkout failures."""
+
+
+class PoolExhaustedError(PoolError):
+    """Raised when no connection slot became free within the acquire timeout."""
+
+
+class PoolConnectionError(PoolError):
+    """Raised when the pool could not open a new connection."""
+
+
+@dataclass
+class _PooledConnection:
+    conn: Any
+    created_at: float
+    last_used: float
+
+
+class ConnectionPool:
+    """Bounded pool of reusable DB-API connections."""
+
+    def __init__(
+        self,
+        factory: Callable[[], Any],
+        *,
+        size: int = 5,
+        min_size: int = 0,
+        max_lifetime: float = 1800.0,
+        acquire_timeout: float = 2.0,
+        ping: Callable[[Any], bool] | None = None,
+        ping_interval: float = 30.0,
+        name: str = "pool",
+    ):
+        if size < 1:
+            raise ValueError("pool size must be >= 1")
+        if not 0 <= min_size <= size:
+            raise ValueError("pool min_size must be between 0 and size")
+
+        self.name = name
+        self.size = size
+        self.min_size = min_size
+        self.max_lifetime = max_lifetime
+        self.acquire_timeout = acquire_timeout
+        self.ping_interval = ping_interval
+        self._factory = factory
+        self._ping = ping
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle: deque[_PooledConnection] = deque()
+        self._checked_out: dict[int, _PooledConnection] = {}
+        self._lock = threading.Lock()
+        self._closed = False
+        self._in_use = 0
+        self._counters = {
+            "acquired": 0,
+            "created": 0,
+            "recycled": 0,
+            "failed_health_checks": 0,
+            "discarded": 0,
+            "waits": 0,
+            "timeouts": 0,
+        }
+        self._wait_seconds_total = 0.0
+
+    @contextmanager
+    def connection(self, timeout: float | None = None) -> Iterator[Any]:
+        """
+        Borrow a connection for the duration of the block.
+        Connections are discarded instead of returned if the block raises.
+        """
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        except BaseException:
+            self.release(conn, discard=True)
+            raise
+        else:
+            self.release(conn)
+
+    def acquire(self, timeout: float | None = None) -> Any:
+        """Check out a connection; pair with release() when a with-block does not fit."""
+        pooled = self._acquire(self.acquire_timeout if timeout is None else timeout)
+        with self._lock:
+            self._checked_out[id(pooled.conn)] = pooled
+        return pooled.conn
+
+    def release(self, conn: Any, discard: bool = False) -> None:
+        """Return a connection, or close it if it may be in an unknown state."""
+        with self._lock:
+            pooled = self._checked_out.pop(id(conn))
+        if discard:
+            self._discard(pooled)
+        else:
+            self._release(pooled)
+
+    def warm(self) -> int:
+        """
+        Open connections until min_size are idle or in use. Returns how many
+        were opened; stops quietly at the first connection failure.
+        """
+        opened = 0
+        while True:
+            with self._lock:
+                if self._closed or self._in_use + len(self._idle) >= self.min_size:
+                    return opened
+            if not self._slots.acquire(blocking=False):
+                return opened
+            try:
+                pooled = self._create()
+            except PoolConnectionError:
+                self._slots.release()
+                return opened
+            with self._lock:
+                self._idle.appendleft(pooled)
+            self._slots.release()
+            opened += 1
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            acquired = self._counters["acquired"]
+            return {
+                "name": self.name,
+                "size": self.size,
+                "min_size": self.min_size,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "utilization": round(self._in_use / self.size, 3),
+                "max_lifetime": self.max_lifetime,
+                "acquire_timeout": self.acquire_timeout,
+                **self._counters,
+                "avg_wait_ms": round(self._wait_seconds_total * 1000 / acquired, 3) if acquired else 0.0,
+            }
+
+    def close(self) -> None:
+        """Close idle connections and refuse further checkouts."""
+        with self._lock:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+        for pooled in idle:
+            _close_quietly(pooled.conn)
+
+    def _acquire(self, timeout: float) -> _PooledConnection:
+        if self._closed:
+            raise RuntimeError(f"Connection pool '{self.name}' is closed")
+
+        started = time.monotonic()
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._counters["waits"] += 1
+            if not self._slots.acquire(timeout=timeout):
+                with self._lock:
+                    self._counters["timeouts"] += 1
+                raise PoolExhaustedError(
+                    f"Connection pool '{self.name}' exhausted ({self.size} in use, waited {timeout:.1f}s)"
+                )
+        waited = time.monotonic() - started
+
+        try:
+            pooled = self._checkout_idle() or self._create()
+        except BaseException:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self._in_use += 1
+            self._counters["acquired"] += 1
+            self._wait_seconds_total += waited
+        return pooled
+
+    def _checkout_idle(self) -> _PooledConnection | None:
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return None
+                # LIFO keeps a hot working set and lets surplus connections age out.
+                pooled = self._idle.pop()
+
+            now = time.monotonic()
+            if self.max_lifetime and now - pooled.created_at >= self.max_lifetime:
+                with self._lock:
+                    self._counters["recycled"] += 1
+                _close_quietly(pooled.conn)
+                continue
+
+            if self._ping and now - pooled.last_used >= self.ping_interval:
+                try:
+                    healthy = self._ping(pooled.conn)
+                except Exception:
+                    healthy = False
+                if not healthy:
+                    with self._lock:
+                        self._counters["failed_health_checks"] += 1
+                    _close_quietly(pooled.conn)
+                    continue
+
+            return pooled
+
+    def _create(self) -> _PooledConnection:
+        try:
+            conn = self._factory()
+        except Exception as e:
+            raise PoolConnectionError(f"Connection pool '{self.name}' could not connect: {e}") from e
+        now = time.monotonic()
+        with self._lock:
+            self._counters["created"] += 1
+        return _PooledConnection(conn=conn, created_at=now, last_used=now)
+
+    def _release(self, pooled: _PooledConnection) -> None:
+        pooled.last_used = time.monotonic()
+        with self._lock:
+            self._in_use -= 1
+            keep = not self._closed
+            if keep:
+                self._idle.append(pooled)
+        if not keep:
+            _close_quietly(pooled.conn)
+        self._slots.release()
+
+    def _discard(self, pooled: _PooledConnection) -> None:
+        with self._lock:
+            self._in_use -= 1
+            self._counters["discarded"] += 1
+        _close_quietly(pooled.conn)
+        self._slots.release()
+
+
+def _close_quietly(conn: Any) -> None:
+    try:
+        conn.close()
+    except Exception:
+        pass
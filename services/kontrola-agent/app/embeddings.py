@@ -0,0 +1,201 @@
+"""
+Text embeddings for Kontrola Agent (/embed).
+
+EmbeddingService turns texts into vectors through one of two backends:
+- openai: any OpenAI-compatible /embeddings API (the shared upstream client,
+  behind the UpstreamScheduler's rate limit and retries)
+- local:  a sentence-transformers model on CPU (optional dependency)
+
+Two layers keep model calls down:
+- Content-hash cache: vectors are cached in Redis under sha256(model, text)
+  as base64 float32, so re-indexing unchanged content costs one MGET.
+- MicroBatcher: cache misses from concurrent requests are gathered for up
+  to EMBED_BATCH_WAIT_MS (or until EMBED_MAX_BATCH texts) and sent as one
+  model call. Identical texts waiting in the same batch are embedded once.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import hashlib
+import os
+import threading
+from typing import Any, Awaitable, Callable
+
+import numpy as np
+
+from app.caching import ReadThroughCache
+
+EMBEDDING_BACKENDS = {"openai", "local"}
+
+EmbedBatch = Callable[[list[str]], Awaitable[list[list[float]]]]
+
+
+class MicroBatcher:
+    """Coalesce concurrent submit() calls into batched fn() calls."""
+
+    def __init__(self, fn: EmbedBatch, max_batch: int = 128, max_wait: float = 0.005):
+        self.fn = fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._pending: dict[str, asyncio.Future] = {}
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+        self._counters = {"batches": 0, "items": 0, "max_batch_seen": 0, "failures": 0}
+
+    async def submit(self, items: list[str]) -> list[list[float]]:
+        """Results for items, in order; each item joins the batch currently being gathered."""
+        loop = asyncio.get_running_loop()
+        futures = []
+        for item in items:
+            fut = self._pending.get(item)
+            if fut is None:
+                fut = self._pending[item] = loop.create_future()
+                if len(self._pending) >= self.max_batch:
+                    self._flush()
+            futures.append(fut)
+        if self._pending and self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        # shield(): one caller going away must not cancel a result others are waiting for.
+        return list(await asyncio.gather(*(asyncio.shield(f) for f in futures)))
+
+    def stats(self) -> dict[str, Any]:
+        batches = self._counters["batches"]
+        return {
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000,
+            "pending": len(self._pending),
+            "in_flight_batches": len(self._tasks),
+            **self._counters,
+            "avg_batch": round(self._counters["items"] / batches, 2) if batches else 0.0,
+        }
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, {}
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: dict[str, asyncio.Future]) -> None:
+        self._counters["batches"] += 1
+        self._counters["items"] += len(batch)
+        self._counters["max_batch_seen"] = max(self._counters["max_batch_seen"], len(batch))
+        try:
+            results = await self.fn(list(batch))
+            if len(results) != len(batch):
+                raise RuntimeError(f"Embedding backend returned {len(results)} vectors for {len(batch)} texts")
+        except Exception as e:
+            self._counters["failures"] += 1
+            for fut in batch.values():
+                if not fut.done():
+                    fut.set_exception(e)
+                    # Mark retrieved so asyncio does not warn when every waiter has gone.
+                    fut.exception()
+            return
+        for fut, result in zip(batch.values(), results):
+            if not fut.done():
+                fut.set_result(result)
+
+
+class LocalEmbedder:
+    """sentence-transformers model on CPU, loaded on first use."""
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self._model: Any = None
+        self._lock = threading.Lock()
+
+    def _encode(self, texts: list[str]) -> list[list[float]]:
+        with self._lock:
+            if self._model is None:
+                from sentence_transformers import SentenceTransformer
+
+                self._model = SentenceTransformer(self.model_name, device="cpu")
+            # One model call at a time: it already uses every core for a batch.
+            matrix = self._model.encode(texts, batch_size=len(texts), convert_to_numpy=True, normalize_embeddings=True)
+        return matrix.astype(np.float32).tolist()
+
+    async def __call__(self, texts: list[str]) -> list[list[float]]:
+        return await asyncio.to_thread(self._encode, texts)
+
+
+def _encode_vector(vector: list[float]) -> str:
+    return base64.b64encode(np.asarray(vector, dtype="<f4").tobytes()).decode()
+
+
+def _decode_vector(data: str) -> list[float]:
+    return np.frombuffer(base64.b64decode(data), dtype="<f4").tolist()
+
+
+class EmbeddingService:
+    """Cached, micro-batched embeddings for one model."""
+
+    def __init__(
+        self,
+        backend: str,
+        model: str,
+        embed_batch: EmbedBatch,
+        cache: ReadThroughCache | None = None,
+        *,
+        max_batch: int = 128,
+        max_wait: float = 0.005,
+    ):
+        self.backend = backend
+        self.model = model
+        self.cache = cache
+        self.batcher = MicroBatcher(embed_batch, max_batch=max_batch, max_wait=max_wait)
+
+    @classmethod
+    def from_env(cls, remote: Callable[[list[str], str], Awaitable[list[list[float]]]], cache: ReadThroughCache | None = None) -> "EmbeddingService":
+        """remote(texts, model) embeds through the OpenAI-compatible upstream."""
+        backend = os.getenv("EMBEDDING_BACKEND", "openai").lower()
+        if backend not in EMBEDDING_BACKENDS:
+            raise ValueError(f"Unknown EMBEDDING_BACKEND {backend!r}; supported: {sorted(EMBEDDING_BACKENDS)}")
+        if backend == "local":
+            model = os.getenv("LOCAL_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+            embed_batch = LocalEmbedder(model)
+        else:
+            model = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small")
+
+            async def embed_batch(texts: list[str]) -> list[list[float]]:
+                return await remote(texts, model)
+        return cls(
+            backend,
+            model,
+            embed_batch,
+            cache,
+            max_batch=int(os.getenv("EMBED_MAX_BATCH", "128")),
+            max_wait=float(os.getenv("EMBED_BATCH_WAIT_MS", "5")) / 1000,
+        )
+
+    def cache_key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model}\0{text}".encode()).hexdigest()
+
+    async def embed(self, texts: list[str]) -> tuple[list[list[float]], int]:
+        """Vectors for texts, in order, and how many of them came from the cache."""
+        unique = list(dict.fromkeys(texts))
+        vectors: dict[str, list[float]] = {}
+        if self.cache is not None:
+            cached = await self.cache.lookup_many([self.cache_key(t) for t in unique])
+            vectors = {t: _decode_vector(c) for t, c in zip(unique, cached) if c is not None}
+
+        missing = [t for t in unique if t not in vectors]
+        if missing:
+            fresh = await self.batcher.submit(missing)
+            vectors.update(zip(missing, fresh))
+            if self.cache is not None:
+                await self.cache.store_many({self.cache_key(t): _encode_vector(v) for t, v in zip(missing, fresh)})
+        return [vectors[t] for t in texts], len(unique) - len(missing)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "model": self.model,
+            "batcher": self.batcher.stats(),
+            "cache": self.cache.stats() if self.cache is not None else None,
+        }
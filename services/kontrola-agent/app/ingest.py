@@ -0,0 +1,409 @@
+"""
+Asynchronous document ingestion for the vector store (/vector/ingest).
+
+An ingestion job takes raw documents and streams them through three stages
+connected by bounded queues:
+
+    chunk -> embed (INGEST_EMBED_WORKERS) -> upsert (INGEST_UPSERT_WORKERS)
+
+Chunks travel in batches of INGEST_BATCH_SIZE. The queues hold at most
+INGEST_QUEUE_DEPTH batches, so a slow stage applies backpressure instead of
+buffering a whole corpus in memory. Embedding goes through the shared
+EmbeddingService, so ingestion gets its micro-batching and content-hash
+cache. Upserts run in threads because vector store clients are blocking.
+
+submit() returns the job right away. Its progress() reports counts per stage
+and throughput while the pipeline runs. At most INGEST_MAX_JOBS jobs run at
+once; later ones wait as "queued".
+
+Re-indexing is incremental. IngestManifest records, per collection, each
+document's content hash (text, metadata and chunking settings), embedding
+model and chunk count. A job skips documents whose hash and model are
+unchanged. For changed documents it re-embeds them and deletes chunk ids
+beyond the new chunk count. With prune=True the submitted documents are the
+complete set, and documents missing from them are deleted. Chunk ids are
+deterministic ("<doc id>:<n>") and every backend upserts on id, so a re-run
+replaces rows instead of duplicating them.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Iterator
+
+from app.vector_store import VectorStore
+
+EmbedTexts = Callable[[list[str]], Awaitable[list[list[float]]]]
+
+
+@dataclass
+class Document:
+    id: str
+    text: str
+    metadata: dict[str, Any] = field(default_factory=dict)
+
+
+def content_hash(doc: Document, chunk_size: int, chunk_overlap: int) -> str:
+    """Hash of everything that determines a document's chunks and their metadata."""
+    payload = json.dumps([doc.text, doc.metadata, chunk_size, chunk_overlap], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+@dataclass(frozen=True)
+class ManifestEntry:
+    doc_id: str
+    content_hash: str
+    model: str
+    chunks: int
+
+
+class IngestManifest:
+    """Per-collection record of indexed documents, in a SQLite file shared by all workers."""
+
+    def __init__(self, path: str | os.PathLike[str]):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS manifest ("
+                "collection TEXT NOT NULL, doc_id TEXT NOT NULL, content_hash TEXT NOT NULL, "
+                "model TEXT NOT NULL, chunks INTEGER NOT NULL, updated_at REAL NOT NULL, "
+                "PRIMARY KEY (collection, doc_id))"
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def entries(self, collection: str) -> dict[str, ManifestEntry]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT doc_id, content_hash, model, chunks FROM manifest WHERE collection = ?", (collection,)
+            ).fetchall()
+        return {row[0]: ManifestEntry(*row) for row in rows}
+
+    def record(self, collection: str, entries: list[ManifestEntry]) -> None:
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO manifest (collection, doc_id, content_hash, model, chunks, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                [(collection, e.doc_id, e.content_hash, e.model, e.chunks, now) for e in entries],
+            )
+
+    def remove(self, collection: str, doc_ids: list[str]) -> None:
+        with self._connect() as conn:
+            conn.executemany("DELETE FROM manifest WHERE collection = ? AND doc_id = ?", [(collection, d) for d in doc_ids])
+
+    def drop(self, collection: str) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM manifest WHERE collection = ?", (collection,))
+
+    @classmethod
+    def from_env(cls) -> "IngestManifest":
+        return cls(os.getenv("INGEST_MANIFEST_PATH", "/app/data/manifest/ingest.sqlite3"))
+
+
+def chunk_text(text: str, size: int = 1000, overlap: int = 100) -> Iterator[str]:
+    """
+    Split text into chunks of at most `size` characters, each starting up to
+    `overlap` characters before the previous one ended. Cuts fall on
+    whitespace in the second half of a window when there is any.
+    """
+    if size <= 0 or not 0 <= overlap < size:
+        raise ValueError("chunk size must be positive and overlap in [0, size)")
+    text = text.strip()
+    start = 0
+    while start < len(text):
+        end = min(start + size, len(text))
+        if end < len(text):
+            cut = text.rfind(" ", start + size // 2, end)
+            if cut > start:
+                end = cut
+        chunk = text[start:end].strip()
+        if chunk:
+            yield chunk
+        if end >= len(text):
+            return
+        next_start = max(end - overlap, start + 1)
+        if not text[next_start - 1].isspace():
+            # Begin the overlap at a word boundary rather than mid-word.
+            space = text.find(" ", next_start, end)
+            if space != -1:
+                next_start = space + 1
+        start = next_start
+
+
+@dataclass
+class IngestJob:
+    id: str
+    collection: str
+    documents: int
+    status: str = "queued"
+    created_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    documents_chunked: int = 0
+    documents_skipped: int = 0
+    documents_deleted: int = 0
+    chunks: int = 0
+    chunks_embedded: int = 0
+    chunks_upserted: int = 0
+    chunks_deleted: int = 0
+    error: str | None = None
+
+    def progress(self) -> dict[str, Any]:
+        end = self.finished_at or time.time()
+        elapsed = end - self.started_at if self.started_at else 0.0
+        scanned = self.documents_chunked + self.documents_skipped
+        chunking_done = scanned == self.documents
+        return {
+            "job_id": self.id,
+            "collection": self.collection,
+            "status": self.status,
+            "documents": self.documents,
+            "documents_chunked": self.documents_chunked,
+            "documents_skipped": self.documents_skipped,
+            "documents_deleted": self.documents_deleted,
+            "chunks": self.chunks,
+            "chunks_embedded": self.chunks_embedded,
+            "chunks_upserted": self.chunks_upserted,
+            "chunks_deleted": self.chunks_deleted,
+            # Only final once every document is chunked; until then the total still grows.
+            "progress": round(self.chunks_upserted / self.chunks, 4) if chunking_done and self.chunks else (1.0 if self.status == "done" else 0.0),
+            "elapsed_seconds": round(elapsed, 3),
+            "chunks_per_second": round(self.chunks_upserted / elapsed, 2) if elapsed else 0.0,
+            "documents_per_second": round(scanned / elapsed, 2) if elapsed else 0.0,
+            "error": self.error,
+        }
+
+
+class IngestManager:
+    """Runs ingestion jobs as background tasks and keeps recent ones for status queries."""
+
+    def __init__(
+        self,
+        store: VectorStore,
+        embed: EmbedTexts,
+        *,
+        model: str = "",
+        manifest: IngestManifest | None = None,
+        batch_size: int = 64,
+        embed_workers: int = 4,
+        upsert_workers: int = 2,
+        queue_depth: int = 8,
+        max_jobs: int = 2,
+        history: int = 100,
+    ):
+        self.store = store
+        self.embed = embed
+        self.model = model
+        self.manifest = manifest
+        self.batch_size = batch_size
+        self.embed_workers = embed_workers
+        self.upsert_workers = upsert_workers
+        self.queue_depth = queue_depth
+        self.max_jobs = max_jobs
+        self.history = history
+        self._jobs: OrderedDict[str, IngestJob] = OrderedDict()
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._slots: asyncio.Semaphore | None = None
+
+    @classmethod
+    def from_env(cls, store: VectorStore, embed: EmbedTexts, model: str = "") -> "IngestManager":
+        return cls(
+            store,
+            embed,
+            model=model,
+            manifest=IngestManifest.from_env(),
+            batch_size=int(os.getenv("INGEST_BATCH_SIZE", "64")),
+            embed_workers=int(os.getenv("INGEST_EMBED_WORKERS", "4")),
+            upsert_workers=int(os.getenv("INGEST_UPSERT_WORKERS", "2")),
+            queue_depth=int(os.getenv("INGEST_QUEUE_DEPTH", "8")),
+            max_jobs=int(os.getenv("INGEST_MAX_JOBS", "2")),
+        )
+
+    def submit(
+        self,
+        collection: str,
+        documents: list[Document],
+        chunk_size: int = 1000,
+        chunk_overlap: int = 100,
+        *,
+        incremental: bool = True,
+        prune: bool = False,
+    ) -> IngestJob:
+        """
+        Validate and start a job; must be called on the event loop that will
+        run it. incremental=False re-indexes every document regardless of the
+        manifest; prune=True deletes documents absent from `documents`.
+        """
+        if chunk_size <= 0 or not 0 <= chunk_overlap < chunk_size:
+            raise ValueError("chunk_size must be positive and chunk_overlap in [0, chunk_size)")
+        if prune and self.manifest is None:
+            raise ValueError("prune needs an ingestion manifest")
+        # A document id repeated in one request: the last version wins.
+        documents = list({doc.id: doc for doc in documents}.values())
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_jobs)
+        job = IngestJob(id=uuid.uuid4().hex, collection=collection, documents=len(documents))
+        self._jobs[job.id] = job
+        self._prune()
+        task = asyncio.get_running_loop().create_task(
+            self._run(job, documents, chunk_size, chunk_overlap, incremental, prune)
+        )
+        self._tasks[job.id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job.id, None))
+        return job
+
+    def get(self, job_id: str) -> IngestJob | None:
+        return self._jobs.get(job_id)
+
+    def jobs(self) -> list[IngestJob]:
+        return list(self._jobs.values())
+
+    async def wait(self, job_id: str) -> IngestJob | None:
+        task = self._tasks.get(job_id)
+        if task is not None:
+            await asyncio.shield(task)
+        return self._jobs.get(job_id)
+
+    def _prune(self) -> None:
+        finished = [j.id for j in self._jobs.values() if j.status in ("done", "failed")]
+        for job_id in finished[: max(0, len(self._jobs) - self.history)]:
+            del self._jobs[job_id]
+
+    async def _run(self, job: IngestJob, documents: list[Document], chunk_size: int, chunk_overlap: int, incremental: bool, prune: bool) -> None:
+        async with self._slots:
+            job.status = "running"
+            job.started_at = time.time()
+            try:
+                await self._pipeline(job, documents, chunk_size, chunk_overlap, incremental, prune)
+            except Exception as e:
+                job.status = "failed"
+                job.error = str(e)
+            else:
+                job.status = "done"
+            finally:
+                job.finished_at = time.time()
+
+    async def _pipeline(self, job: IngestJob, documents: list[Document], chunk_size: int, chunk_overlap: int, incremental: bool, prune: bool) -> None:
+        # Each batch: (ids, texts, metadata); None tells a worker to stop.
+        embed_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_depth)
+        upsert_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_depth)
+        collection_ready = asyncio.Lock()
+        created = False
+
+        known = await asyncio.to_thread(self.manifest.entries, job.collection) if self.manifest else {}
+        # A document is recorded in the manifest once it is fully chunked and
+        # its last chunk is upserted, so a failed job leaves it to be redone.
+        unfinished: dict[str, int] = {}
+        chunked: dict[str, ManifestEntry] = {}
+
+        async def complete(doc_ids: set[str]) -> None:
+            done = [chunked.pop(d) for d in doc_ids if d in chunked and not unfinished.get(d)]
+            if done and self.manifest:
+                await asyncio.to_thread(self.manifest.record, job.collection, done)
+
+        async def delete(ids: list[str]) -> None:
+            for start in range(0, len(ids), self.batch_size):
+                await asyncio.to_thread(self.store.delete, job.collection, ids[start:start + self.batch_size])
+            job.chunks_deleted += len(ids)
+
+        async def produce() -> None:
+            ids: list[str] = []
+            texts: list[str] = []
+            metadata: list[dict[str, Any]] = []
+            for doc in documents:
+                digest = content_hash(doc, chunk_size, chunk_overlap)
+                previous = known.get(doc.id)
+                if incremental and previous and previous.content_hash == digest and previous.model == self.model:
+                    job.documents_skipped += 1
+                    continue
+
+                n = 0
+                for n, chunk in enumerate(chunk_text(doc.text, chunk_size, chunk_overlap), start=1):
+                    ids.append(f"{doc.id}:{n - 1}")
+                    texts.append(chunk)
+                    metadata.append({**doc.metadata, "doc_id": doc.id, "chunk": n - 1, "text": chunk})
+                    unfinished[doc.id] = unfinished.get(doc.id, 0) + 1
+                    job.chunks += 1
+                    if len(ids) >= self.batch_size:
+                        await embed_queue.put((ids, texts, metadata))
+                        ids, texts, metadata = [], [], []
+                if previous and previous.chunks > n:
+                    # The document shrank: its trailing chunks would otherwise linger.
+                    await delete([f"{doc.id}:{i}" for i in range(n, previous.chunks)])
+                chunked[doc.id] = ManifestEntry(doc.id, digest, self.model, n)
+                job.documents_chunked += 1
+                await complete({doc.id})
+            if ids:
+                await embed_queue.put((ids, texts, metadata))
+
+            if prune:
+                present = {doc.id for doc in documents}
+                removed = [entry for doc_id, entry in known.items() if doc_id not in present]
+                await delete([f"{e.doc_id}:{i}" for e in removed for i in range(e.chunks)])
+                await asyncio.to_thread(self.manifest.remove, job.collection, [e.doc_id for e in removed])
+                job.documents_deleted += len(removed)
+
+        async def embed_worker() -> None:
+            while (batch := await embed_queue.get()) is not None:
+                ids, texts, metadata = batch
+                vectors = await self.embed(texts)
+                job.chunks_embedded += len(ids)
+                await upsert_queue.put((ids, vectors, metadata))
+
+        async def upsert_worker() -> None:
+            nonlocal created
+            while (batch := await upsert_queue.get()) is not None:
+                ids, vectors, metadata = batch
+                async with collection_ready:
+                    if not created:
+                        # The dimension is only known once the first batch is embedded.
+                        try:
+                            await asyncio.to_thread(self.store.create_collection, job.collection, len(vectors[0]))
+                        except Exception:
+                            pass  # Already exists on backends without create-if-missing.
+                        created = True
+                await asyncio.to_thread(self.store.insert, job.collection, vectors, metadata, ids)
+                job.chunks_upserted += len(ids)
+                for meta in metadata:
+                    unfinished[meta["doc_id"]] -= 1
+                await complete({meta["doc_id"] for meta in metadata})
+
+        async def run() -> None:
+            await produce()
+            for stage, queue in ((embedders, embed_queue), (upserters, upsert_queue)):
+                for _ in stage:
+                    await queue.put(None)
+                await asyncio.gather(*stage)
+
+        embedders = [asyncio.create_task(embed_worker()) for _ in range(self.embed_workers)]
+        upserters = [asyncio.create_task(upsert_worker()) for _ in range(self.upsert_workers)]
+        tasks = [asyncio.create_task(run()), *embedders, *upserters]
+        try:
+            # Watch the workers too: a failed one must stop the job even while
+            # produce() is blocked on the queue it no longer drains.
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                if task.exception() is not None:
+                    raise task.exception()
+        finally:
+            for task in tasks:
+                task.cancel()
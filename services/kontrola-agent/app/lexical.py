@@ -0,0 +1,304 @@
+"""
+BM25 lexical index and hybrid search for /vector/search (mode="hybrid").
+
+LexicalIndex keeps one SQLite FTS5 inverted index per (collection, metadata
+field) for the fields listed in LEXICAL_INDEX_FIELDS, ranked with FTS5's
+bm25() (k1=1.2, b=0.75). Terms are lower-cased, stripped of diacritics and
+Porter-stemmed. The file at LEXICAL_INDEX_PATH is shared by all workers.
+
+LexicalIndexedStore wraps the configured VectorStore and mirrors every insert,
+delete and drop into the index, so both legs see the same writes (including
+/vector/ingest). Rows written before a field was enabled are not indexed;
+re-ingest them with incremental=false to backfill.
+
+hybrid_search() runs the ANN leg and the BM25 leg concurrently and fuses the
+two rankings with reciprocal rank fusion:
+
+    score(d) = sum over legs of 1 / (rrf_k + rank of d in that leg)
+
+RRF only looks at ranks, so nothing has to reconcile backend-specific vector
+distances with unbounded BM25 scores.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+from app.vector_filter import matches, parse_filter
+from app.vector_store import Matrix, Vector, VectorStore
+
+# Results each leg contributes to the fusion when the request does not say, and the cap.
+DEFAULT_CANDIDATES = 50
+MAX_CANDIDATES = 1000
+# Query terms beyond this are ignored; keeps the FTS5 OR-query bounded.
+MAX_QUERY_TERMS = 32
+
+_TERM = re.compile(r"\w+")
+
+
+class LexicalIndex:
+    """BM25 search over metadata text fields, one FTS5 table per (collection, field)."""
+
+    def __init__(self, path: str | os.PathLike[str], fields: list[str], executor: Executor | None = None):
+        self.path = Path(path)
+        self.fields = list(fields)
+        # Runs the BM25 leg of hybrid_search() alongside the vector leg; None runs it after, inline.
+        self.executor = executor
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+
+    @classmethod
+    def from_env(cls) -> "LexicalIndex | None":
+        """Index for LEXICAL_INDEX_FIELDS; None (hybrid search off) when no field is configured."""
+        fields = [f.strip() for f in os.getenv("LEXICAL_INDEX_FIELDS", "").split(",") if f.strip()]
+        if not fields:
+            return None
+        executor = ThreadPoolExecutor(max_workers=int(os.getenv("LEXICAL_SEARCH_WORKERS", "4")), thread_name_prefix="lexical")
+        return cls(os.getenv("LEXICAL_INDEX_PATH", "/app/data/lexical/lexical.sqlite3"), fields, executor)
+
+    def close(self) -> None:
+        """Stop the search executor; SQLite connections are per call, none stay open."""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _table(collection: str, field: str) -> str:
+        # Hashed: collection and field names are caller-supplied and end up in DDL.
+        return "lex_" + hashlib.sha256(f"{collection}\0{field}".encode()).hexdigest()[:24]
+
+    @staticmethod
+    def _ensure(conn: sqlite3.Connection, table: str) -> None:
+        # Every write, not cached: another worker may have dropped the collection.
+        # {table}_docs.rowid is the FTS5 rowid of the document's text.
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {table}_docs (doc_id TEXT PRIMARY KEY, metadata TEXT NOT NULL)")
+        conn.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5(body, tokenize='porter unicode61 remove_diacritics 2')")
+
+    def add(self, collection: str, ids: list[str], metadata: list[dict[str, Any]]) -> None:
+        """Index (or re-index) rows; a row without a string value for a field leaves that field's index."""
+        with self._connect() as conn:
+            for field in self.fields:
+                table = self._table(collection, field)
+                self._ensure(conn, table)
+                for id_, meta in zip(ids, metadata):
+                    text = meta.get(field)
+                    if not isinstance(text, str):
+                        self._remove(conn, table, id_)
+                        continue
+                    rowid = conn.execute(
+                        f"INSERT INTO {table}_docs (doc_id, metadata) VALUES (?, ?) "
+                        "ON CONFLICT (doc_id) DO UPDATE SET metadata = excluded.metadata RETURNING rowid",
+                        (id_, json.dumps(meta, default=str)),
+                    ).fetchone()[0]
+                    conn.execute(f"DELETE FROM {table} WHERE rowid = ?", (rowid,))
+                    conn.execute(f"INSERT INTO {table} (rowid, body) VALUES (?, ?)", (rowid, text))
+
+    def remove(self, collection: str, ids: list[str]) -> None:
+        with self._connect() as conn:
+            for field in self.fields:
+                table = self._table(collection, field)
+                self._ensure(conn, table)
+                for id_ in ids:
+                    self._remove(conn, table, id_)
+
+    @staticmethod
+    def _remove(conn: sqlite3.Connection, table: str, id_: str) -> None:
+        row = conn.execute(f"DELETE FROM {table}_docs WHERE doc_id = ? RETURNING rowid", (id_,)).fetchone()
+        if row is not None:
+            conn.execute(f"DELETE FROM {table} WHERE rowid = ?", (row[0],))
+
+    def drop(self, collection: str) -> None:
+        with self._connect() as conn:
+            for field in self.fields:
+                table = self._table(collection, field)
+                conn.execute(f"DROP TABLE IF EXISTS {table}")
+                conn.execute(f"DROP TABLE IF EXISTS {table}_docs")
+
+    def search(self, collection: str, field: str, text: str, limit: int = 10, filter_dict: dict[str, Any] | None = None) -> list[dict[str, Any]]:
+        """Best BM25 matches for any term of text (higher score is better), after filter_dict."""
+        if field not in self.fields:
+            raise ValueError(f"Field {field!r} has no lexical index; indexed fields: {self.fields}")
+        terms = list(dict.fromkeys(t.lower() for t in _TERM.findall(text)))[:MAX_QUERY_TERMS]
+        if not terms or limit <= 0:
+            return []
+        # Quoted terms are plain tokens to FTS5, never query syntax.
+        query = " OR ".join(f'"{t}"' for t in terms)
+        expr = parse_filter(filter_dict)
+        table = self._table(collection, field)
+        hits: list[dict[str, Any]] = []
+        with self._connect() as conn:
+            # Read-only: a collection nothing was indexed into (or that was dropped) has no tables.
+            if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone() is None:
+                return []
+            # bm25() is lower-is-better; a filter reads matches in rank order until `limit` pass it.
+            sql = (
+                f"SELECT d.doc_id, -bm25({table}) AS score, d.metadata FROM {table} "
+                f"JOIN {table}_docs d ON d.rowid = {table}.rowid WHERE {table} MATCH ? ORDER BY bm25({table})"
+            )
+            cursor = conn.execute(sql + " LIMIT ?", (query, limit)) if expr is None else conn.execute(sql, (query,))
+            for doc_id, score, meta in cursor:
+                meta = json.loads(meta)
+                if expr is not None and not matches(expr, meta):
+                    continue
+                hits.append({"id": doc_id, "score": score, "metadata": meta})
+                if len(hits) >= limit:
+                    break
+        return hits
+
+    def stats(self) -> dict[str, Any]:
+        return {"path": str(self.path), "fields": self.fields}
+
+
+def reciprocal_rank_fusion(rankings: dict[str, list[dict[str, Any]]], k: int = 60) -> list[dict[str, Any]]:
+    """
+    Fuse ranked hit lists (leg name -> hits, best first) by RRF. Each fused hit
+    carries its rank in every leg that returned it; ties keep the order of legs.
+    """
+    fused: dict[str, dict[str, Any]] = {}
+    for leg, hits in rankings.items():
+        for rank, hit in enumerate(hits, 1):
+            # str(): Qdrant returns int/UUID ids, the lexical index strings.
+            entry = fused.setdefault(str(hit["id"]), {"id": hit["id"], "score": 0.0, "metadata": hit.get("metadata"), "ranks": {}})
+            entry["score"] += 1.0 / (k + rank)
+            entry["ranks"][leg] = rank
+    return sorted(fused.values(), key=lambda e: e["score"], reverse=True)
+
+
+def _timed(fn: Callable[[], Any]) -> tuple[Any, float]:
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def hybrid_search(
+    store: VectorStore,
+    index: LexicalIndex,
+    collection: str,
+    query_vector: Vector,
+    query_text: str,
+    top_k: int = 10,
+    *,
+    text_field: str,
+    filter_dict: dict[str, Any] | None = None,
+    search_params: dict[str, Any] | None = None,
+    rrf_k: int = 60,
+    candidates: int | None = None,
+) -> tuple[list[dict[str, Any]], dict[str, float]]:
+    """
+    ANN and BM25 legs run concurrently (BM25 on the index's executor, if
+    it has one), each
+    returning `candidates` hits; returns the top_k fused hits and per-leg
+    latency in milliseconds.
+    """
+    if rrf_k < 1:
+        raise ValueError(f"rrf_k must be >= 1, got {rrf_k}")
+    if candidates is not None and not 1 <= candidates <= MAX_CANDIDATES:
+        raise ValueError(f"candidates must be between 1 and {MAX_CANDIDATES}, got {candidates}")
+    depth = max(top_k, candidates or DEFAULT_CANDIDATES)
+
+    def search_lexical() -> list[dict[str, Any]]:
+        return index.search(collection, text_field, query_text, depth, filter_dict)
+
+    def search_vector() -> list[dict[str, Any]]:
+        return store.search(collection, query_vector, depth, filter_dict, search_params)
+
+    if index.executor is None:
+        vector_hits, vector_ms = _timed(search_vector)
+        lexical_hits, lexical_ms = _timed(search_lexical)
+    else:
+        lexical = index.executor.submit(_timed, search_lexical)
+        try:
+            vector_hits, vector_ms = _timed(search_vector)
+        finally:
+            # Always collect the lexical leg, so its errors are not lost with the vector leg's.
+            lexical_hits, lexical_ms = lexical.result()
+    fused, fusion_ms = _timed(lambda: reciprocal_rank_fusion({"vector": vector_hits, "lexical": lexical_hits}, rrf_k)[:top_k])
+    latency = {"vector_ms": vector_ms, "lexical_ms": lexical_ms, "fusion_ms": fusion_ms}
+    return fused, {name: round(ms, 3) for name, ms in latency.items()}
+
+
+class LexicalIndexedStore(VectorStore):
+    """VectorStore decorator keeping a LexicalIndex in step with the store's writes."""
+
+    def __init__(self, inner: VectorStore, index: LexicalIndex):
+        super().__init__()
+        self.inner = inner
+        self.index = index
+
+    @classmethod
+    def wrap(cls, inner: VectorStore, index: LexicalIndex | None) -> VectorStore:
+        """inner wrapped when lexical indexing is configured, unchanged otherwise."""
+        return inner if index is None else cls(inner, index)
+
+    # -- writes: the vector store first, then the index ----------------------
+
+    def create_collection(self, name: str, dimension: int, **kwargs) -> None:
+        self.inner.create_collection(name, dimension, **kwargs)
+
+    def insert(self, collection: str, vectors: Matrix, metadata: list[dict[str, Any]], ids: list[str] | None = None) -> None:
+        self.inner.insert(collection, vectors, metadata, ids)
+        # Same default ids as the backends.
+        self.index.add(collection, ids or [str(i) for i in range(len(metadata))], metadata)
+
+    def delete(self, collection: str, ids: list[str]) -> None:
+        self.inner.delete(collection, ids)
+        self.index.remove(collection, ids)
+
+    def drop_collection(self, name: str) -> None:
+        self.inner.drop_collection(name)
+        self.index.drop(name)
+
+    # -- passthrough ---------------------------------------------------------
+
+    def search(self, collection: str, query_vector: Vector, top_k: int = 10, filter_dict: dict[str, Any] | None = None, search_params: dict[str, Any] | None = None) -> list[dict[str, Any]]:
+        return self.inner.search(collection, query_vector, top_k, filter_dict, search_params)
+
+    def search_batch(self, collection: str, query_vectors: Matrix, top_k: int = 10, filter_dict: dict[str, Any] | None = None, search_params: dict[str, Any] | None = None) -> list[list[dict[str, Any]]]:
+        return self.inner.search_batch(collection, query_vectors, top_k, filter_dict, search_params)
+
+    def create_index(self, collection: str, index_type: str = "hnsw", **params: Any) -> dict[str, Any]:
+        return self.inner.create_index(collection, index_type, **params)
+
+    def tune(self, collection: str, **params: Any) -> dict[str, Any]:
+        return self.inner.tune(collection, **params)
+
+    def health_check(self) -> dict[str, Any]:
+        return {**self.inner.health_check(), "lexical_index": self.index.stats()}
+
+    def close(self) -> None:
+        self.inner.close()
+
+    def score_to_similarity(self, score: float) -> float:
+        return self.inner.score_to_similarity(score)
+
+    def footprint(self, collection: str) -> dict[str, Any]:
+        return self.inner.footprint(collection)
+
+    def exact_search_batch(self, collection: str, query_vectors: Matrix, top_k: int = 10) -> list[list[dict[str, Any]]]:
+        return self.inner.exact_search_batch(collection, query_vectors, top_k)
+
+    def recall_at_k(self, collection: str, query_vectors: Matrix, top_k: int = 10, search_params: dict[str, Any] | None = None) -> dict[str, Any]:
+        return self.inner.recall_at_k(collection, query_vectors, top_k, search_params)
+
+    def __getattr__(self, name: str) -> Any:
+        if name == "inner":
+            raise AttributeError(name)
+        return getattr(self.inner, name)
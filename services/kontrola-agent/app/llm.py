@@ -0,0 +1,316 @@
+"""
+Upstream LLM client for Kontrola Agent.
+
+A single httpx.AsyncClient is shared for the process lifetime (created in the
+app lifespan), so /generate reuses pooled keep-alive connections instead of
+paying a TCP + TLS handshake per request. With the `h2` package installed,
+requests are multiplexed over HTTP/2.
+
+OPENAI_BASE_URL points the client at any OpenAI-compatible server, e.g. a
+local stand-in for tests and benchmarks.
+
+UpstreamScheduler sits in front of the client: identical in-flight requests
+share one upstream call, a token bucket and a concurrency cap keep bursts
+(e.g. WP-Cron bulk generation) under the provider's rate limits, and 429/5xx
+responses are retried with jittered exponential backoff.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, TypeVar
+
+import httpx
+
+from app.caching import SingleFlight
+
+T = TypeVar("T")
+
+
+class UpstreamError(Exception):
+    """Non-2xx or malformed response from the upstream LLM API."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: float | None = None):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self) -> bool:
+        return self.status_code == 429 or self.status_code >= 500
+
+
+def _retry_after(response: httpx.Response) -> float | None:
+    try:
+        return float(response.headers["retry-after"])
+    except (KeyError, ValueError):
+        return None
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class OpenAICompatibleClient:
+    """Pooled client for an OpenAI-compatible Chat Completions API."""
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        *,
+        timeout: float = 30.0,
+        connect_timeout: float = 5.0,
+        max_connections: int = 20,
+        max_keepalive: int = 10,
+        keepalive_expiry: float = 30.0,
+        http2: bool = True,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.http2 = http2 and _http2_available()
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers={"Authorization": f"Bearer {api_key}"} if api_key else {},
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive,
+                keepalive_expiry=keepalive_expiry,
+            ),
+            http2=self.http2,
+            transport=transport,
+        )
+
+    @classmethod
+    def from_env(cls) -> "OpenAICompatibleClient":
+        return cls(
+            base_url=os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1"),
+            api_key=os.getenv("OPENAI_API_KEY", "").strip(),
+            timeout=float(os.getenv("OPENAI_TIMEOUT", "30")),
+            connect_timeout=float(os.getenv("OPENAI_CONNECT_TIMEOUT", "5")),
+            max_connections=int(os.getenv("OPENAI_MAX_CONNECTIONS", "20")),
+            max_keepalive=int(os.getenv("OPENAI_MAX_KEEPALIVE", "10")),
+            keepalive_expiry=float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "30")),
+            http2=os.getenv("OPENAI_HTTP2", "true").lower() in {"1", "true", "yes"},
+        )
+
+    async def chat_completion(self, payload: dict[str, Any]) -> str:
+        """POST /chat/completions and return the first choice's message content."""
+        r = await self._client.post("/chat/completions", json=payload)
+        if r.status_code >= 400:
+            raise UpstreamError(r.status_code, f"Upstream OpenAI error: {r.text}", _retry_after(r))
+
+        data = r.json()
+        try:
+            return data["choices"][0]["message"]["content"]
+        except Exception:
+            raise UpstreamError(r.status_code, "Unexpected OpenAI response format")
+
+    async def stream_chat_completion(self, payload: dict[str, Any]) -> AsyncIterator[str]:
+        """
+        POST /chat/completions with stream=true and yield content deltas as
+        they arrive. Closing the generator early closes the upstream response,
+        which cancels generation on the provider side.
+        """
+        async with self._client.stream("POST", "/chat/completions", json={**payload, "stream": True}) as r:
+            if r.status_code >= 400:
+                body = (await r.aread()).decode(errors="replace")
+                raise UpstreamError(r.status_code, f"Upstream OpenAI error: {body}", _retry_after(r))
+
+            async for line in r.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    return
+                try:
+                    delta = json.loads(data)["choices"][0].get("delta", {}).get("content")
+                except Exception:
+                    raise UpstreamError(r.status_code, "Unexpected OpenAI stream format")
+                if delta:
+                    yield delta
+
+    async def embeddings(self, texts: list[str], model: str) -> list[list[float]]:
+        """POST /embeddings for a batch of texts; vectors are returned in input order."""
+        r = await self._client.post("/embeddings", json={"model": model, "input": texts})
+        if r.status_code >= 400:
+            raise UpstreamError(r.status_code, f"Upstream embeddings error: {r.text}", _retry_after(r))
+
+        try:
+            data = sorted(r.json()["data"], key=lambda d: d["index"])
+            return [d["embedding"] for d in data]
+        except Exception:
+            raise UpstreamError(r.status_code, "Unexpected embeddings response format")
+
+    def info(self) -> dict[str, Any]:
+        return {"base_url": self.base_url, "http2": self.http2}
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+class TokenBucket:
+    """
+    Async token bucket with AIMD adaptation: the refill rate is halved on
+    each rate-limit response (down to min_rate) and recovers additively on
+    success, so the agent settles just under the provider's real limit.
+    """
+
+    def __init__(self, rate: float, burst: int, min_rate: float | None = None):
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min_rate if min_rate is not None else rate / 16
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def penalize(self) -> None:
+        self.rate = max(self.min_rate, self.rate / 2)
+
+    def reward(self) -> None:
+        self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+
+class UpstreamScheduler:
+    """Single-flight, rate limiting, concurrency cap and retries for one upstream provider."""
+
+    def __init__(
+        self,
+        provider: str,
+        *,
+        rate: float = 5.0,
+        burst: int = 10,
+        max_concurrency: int = 8,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_cap: float = 20.0,
+    ):
+        self.provider = provider
+        self.bucket = TokenBucket(rate, burst)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._flight = SingleFlight()
+        self._queued = 0
+        self._in_flight = 0
+        self._counters = {"requests": 0, "deduplicated": 0, "retries": 0, "rate_limited": 0, "failures": 0}
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._admitted = 0
+
+    @classmethod
+    def from_env(cls, provider: str = "openai") -> "UpstreamScheduler":
+        return cls(
+            provider,
+            rate=float(os.getenv("OPENAI_RATE_LIMIT_RPS", "5")),
+            burst=int(os.getenv("OPENAI_RATE_LIMIT_BURST", "10")),
+            max_concurrency=int(os.getenv("OPENAI_MAX_CONCURRENCY", "8")),
+            max_retries=int(os.getenv("OPENAI_MAX_RETRIES", "3")),
+        )
+
+    async def run(self, key: str | None, call: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run call() under the rate limit and concurrency cap, retrying
+        transient failures. Concurrent runs with the same key share one call.
+        """
+        self._counters["requests"] += 1
+        if key is None:
+            return await self._with_retries(call)
+        result, shared = await self._flight.do(key, lambda: self._with_retries(call))
+        if shared:
+            self._counters["deduplicated"] += 1
+        return result
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Admission only (no retries), for calls such as streams that cannot be replayed."""
+        await self._admit()
+        try:
+            yield
+        finally:
+            self._in_flight -= 1
+            self._slots.release()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "provider": self.provider,
+            "queue_depth": self._queued,
+            "in_flight": self._in_flight,
+            "max_concurrency": self.max_concurrency,
+            "rate_limit_rps": round(self.bucket.rate, 3),
+            "configured_rps": self.bucket.max_rate,
+            **self._counters,
+            "avg_wait_ms": round(self._wait_total * 1000 / self._admitted, 1) if self._admitted else 0.0,
+            "max_wait_ms": round(self._wait_max * 1000, 1),
+        }
+
+    async def _admit(self) -> None:
+        started = time.monotonic()
+        self._queued += 1
+        try:
+            await self._slots.acquire()
+            try:
+                await self.bucket.acquire()
+            except BaseException:
+                self._slots.release()
+                raise
+        finally:
+            self._queued -= 1
+        waited = time.monotonic() - started
+        self._admitted += 1
+        self._wait_total += waited
+        self._wait_max = max(self._wait_max, waited)
+        self._in_flight += 1
+
+    async def _with_retries(self, call: Callable[[], Awaitable[T]]) -> T:
+        attempt = 0
+        while True:
+            async with self.slot():
+                try:
+                    result = await call()
+                except UpstreamError as e:
+                    error: Exception = e
+                    retryable = e.retryable
+                    retry_after = e.retry_after
+                    if e.status_code == 429:
+                        self._counters["rate_limited"] += 1
+                        self.bucket.penalize()
+                except httpx.TransportError as e:
+                    error, retryable, retry_after = e, True, None
+                else:
+                    self.bucket.reward()
+                    return result
+
+            if not retryable or attempt >= self.max_retries:
+                self._counters["failures"] += 1
+                raise error
+            attempt += 1
+            self._counters["retries"] += 1
+            # Full jitter spreads retries from a burst instead of re-synchronising them.
+            delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+            await asyncio.sleep(max(delay, retry_after or 0))
@@ -1,11 +1,38 @@
 from __future__ import annotations
 
+import asyncio
+import base64
+import hashlib
+import heapq
+import json
+import logging
 import os
-from typing import Any
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import date as date_type, datetime, time as time_type, timedelta
+from itertools import islice
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Literal, TypeVar
 
 import httpx
-from fastapi import FastAPI, Header, HTTPException
-from pydantic import BaseModel
+import numpy as np
+from fastapi import Depends, FastAPI, Header, HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel, ConfigDict, ValidationError
+
+from app import vector_wire
+from app.caching import ReadThroughCache, SemanticCache
+from app.db_pool import ConnectionPool, PoolError
+from app.embeddings import EmbeddingService
+from app.ingest import Document, IngestManager, IngestManifest
+from app.lexical import LexicalIndex, LexicalIndexedStore, hybrid_search
+from app.llm import OpenAICompatibleClient, UpstreamError, UpstreamScheduler
+from app.trends_sqlite import DayFileIndex, SQLiteConnectionCache, TrendRadarSchemaError, query_latest_items
+from app.vector_wire import VectorDecodeError, as_matrix, decode_matrix
 
 try:
     import mysql.connector
@@ -25,12 +52,142 @@ except ImportError:
     redis_client = None
 
 try:
+    # BM25 index for hybrid /vector/search; None unless LEXICAL_INDEX_FIELDS is set.
+    lexical_index = LexicalIndex.from_env()
+except Exception:
+    lexical_index = None
+
+try:
+    from app.vector_cache import CachedVectorStore
     from app.vector_store import get_vector_store
-    vector_store = get_vector_store()
+    vector_store = CachedVectorStore.from_env(LexicalIndexedStore.wrap(get_vector_store(), lexical_index), redis_client)
 except Exception:
     vector_store = None
 
-app = FastAPI(title="Kontrola Agent", version="0.2.0")
+# Read-through cache for /trends responses. Keys embed the newest created_at of
+# the TrendRadar tables, so a fresh crawl naturally invalidates earlier entries.
+trends_cache = ReadThroughCache(
+    redis_client,
+    namespace="kontrola:trends",
+    ttl=int(os.getenv("TRENDS_CACHE_TTL", "300")),
+)
+
+logger = logging.getLogger("kontrola-agent")
+
+# Response cache for /generate: exact tier in Redis, optional semantic tier in the vector store.
+generate_cache = ReadThroughCache(
+    redis_client,
+    namespace="kontrola:generate",
+    ttl=int(os.getenv("GENERATE_CACHE_TTL", "86400")),
+)
+semantic_generate_cache: SemanticCache | None = None
+
+# Content-hash cache for /embed vectors; created lazily with the embedding service.
+embed_cache = ReadThroughCache(
+    redis_client,
+    namespace="kontrola:embed",
+    ttl=int(os.getenv("EMBED_CACHE_TTL", "2592000")),
+)
+embedding_service: EmbeddingService | None = None
+# Background /vector/ingest jobs; created on first use.
+ingest_manager: IngestManager | None = None
+
+# Shared upstream LLM client; created in lifespan() (or lazily outside it).
+llm_client: OpenAICompatibleClient | None = None
+# Single-flight, rate limit, concurrency cap and retries in front of llm_client.
+llm_scheduler: UpstreamScheduler | None = None
+
+# Created in lifespan(); None when mysql-connector is not installed.
+trendradar_pool: ConnectionPool | None = None
+# Dedicated, bounded worker threads for TrendRadar queries so blocking MySQL I/O
+# never occupies the shared threadpool that serves /generate and /vector/*.
+trendradar_executor: ThreadPoolExecutor | None = None
+# /trends/stream exports open their own connections, at most this many at once,
+# so long-running exports never hold connections the pooled endpoints need.
+trendradar_stream_slots = asyncio.Semaphore(int(os.getenv("TRENDRADAR_STREAM_MAX_CONCURRENCY", "2")))
+# Result of the startup index check, surfaced on /trends/status.
+trendradar_index_report: dict[str, Any] | None = None
+
+TRENDRADAR_TABLES = ("news_items", "rss_items")
+# Columns trends_latest maps into items; only those present in a table are selected.
+TRENDRADAR_ITEM_COLUMNS = (
+    "id", "title", "url", "link", "rank", "position",
+    "platform_id", "source_id", "platform_name", "created_at",
+)
+# Serves both the newest-first scan (ORDER BY created_at DESC, rank) and the
+# half-open day ranges; created_at DESC matches the dominant sort direction.
+TRENDRADAR_INDEX_NAME = "idx_kontrola_created_at_rank"
+TRENDRADAR_INDEX_COLUMNS = ("created_at", "rank")
+
+# File backend (TRENDRADAR_STORAGE_BACKEND=local): read-only handles per day file.
+trendradar_sqlite = SQLiteConnectionCache(max_open=int(os.getenv("TRENDRADAR_SQLITE_MAX_OPEN", "32")))
+_day_file_indexes: dict[tuple[Path, str], DayFileIndex] = {}
+
+T = TypeVar("T")
+
+
+def _trends_backend() -> str:
+    """'sqlite' when TrendRadar writes local SQLite files, otherwise 'mysql'."""
+    backend = os.getenv("TRENDRADAR_STORAGE_BACKEND", "mysql").strip().lower()
+    return "sqlite" if backend in {"local", "sqlite"} else "mysql"
+
+
+def _connect_trendradar_mysql():
+    return mysql.connector.connect(
+        host=os.getenv("TRENDRADAR_MYSQL_HOST", "wp-db"),
+        port=int(os.getenv("TRENDRADAR_MYSQL_PORT", "3306")),
+        user=os.getenv("TRENDRADAR_MYSQL_USER", "wordpressdb"),
+        password=os.getenv("TRENDRADAR_MYSQL_PASSWORD", ""),
+        database=os.getenv("TRENDRADAR_MYSQL_DATABASE", "trendradar"),
+        connection_timeout=5,
+        # Pooled connections are long-lived: without autocommit each one would
+        # keep reading from the REPEATABLE READ snapshot of its first query.
+        autocommit=True,
+    )
+
+
+def _create_trendradar_pool() -> ConnectionPool | None:
+    """Build the TrendRadar MySQL connection pool (connections open lazily)."""
+    if not mysql:
+        return None
+
+    return ConnectionPool(
+        _connect_trendradar_mysql,
+        size=int(os.getenv("TRENDRADAR_MYSQL_POOL_SIZE", "5")),
+        max_lifetime=float(os.getenv("TRENDRADAR_MYSQL_POOL_MAX_LIFETIME", "1800")),
+        acquire_timeout=float(os.getenv("TRENDRADAR_MYSQL_POOL_TIMEOUT", "2")),
+        ping=lambda conn: conn.is_connected(),
+        name="trendradar-mysql",
+    )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global llm_client, llm_scheduler, trendradar_pool, trendradar_executor
+    llm_client = OpenAICompatibleClient.from_env()
+    llm_scheduler = UpstreamScheduler.from_env()
+    if _trends_backend() == "mysql":
+        trendradar_pool = _create_trendradar_pool()
+    workers = int(os.getenv("TRENDRADAR_QUERY_WORKERS", str(trendradar_pool.size if trendradar_pool else 5)))
+    trendradar_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="trendradar")
+    if trendradar_pool:
+        # Off the startup path: a down database must not delay the agent booting.
+        asyncio.get_running_loop().run_in_executor(trendradar_executor, _startup_index_check)
+    try:
+        yield
+    finally:
+        await llm_client.aclose()
+        trendradar_executor.shutdown(wait=False, cancel_futures=True)
+        if trendradar_pool:
+            trendradar_pool.close()
+        trendradar_sqlite.close()
+        if vector_store:
+            vector_store.close()
+        if lexical_index:
+            lexical_index.close()
+
+
+app = FastAPI(title="Kontrola Agent", version="0.2.0", lifespan=lifespan)
 
 
 class GenerateRequest(BaseModel):
@@ -51,22 +208,537 @@ def _require_shared_secret(x_kontrola_secret: str | None) -> None:
             raise HTTPException(status_code=401, detail="Invalid X-Kontrola-Secret")
 
 
-def _get_trendradar_mysql_conn():
-    """Connect to the TrendRadar MySQL database."""
-    if not mysql:
-        return None
+def _get_llm_client() -> OpenAICompatibleClient:
+    global llm_client
+    if llm_client is None:
+        llm_client = OpenAICompatibleClient.from_env()
+    return llm_client
+
+
+def _get_llm_scheduler() -> UpstreamScheduler:
+    global llm_scheduler
+    if llm_scheduler is None:
+        llm_scheduler = UpstreamScheduler.from_env()
+    return llm_scheduler
+
+
+async def _openai_embeddings(texts: list[str], model: str) -> list[list[float]]:
+    # No single-flight key: the micro-batcher already merges identical pending texts.
+    return await _get_llm_scheduler().run(None, lambda: _get_llm_client().embeddings(texts, model))
+
+
+def _get_embedding_service() -> EmbeddingService:
+    global embedding_service
+    if embedding_service is None:
+        embedding_service = EmbeddingService.from_env(_openai_embeddings, embed_cache)
+    return embedding_service
+
+
+async def _embed_text(text: str) -> list[float]:
+    vectors, _ = await _get_embedding_service().embed([text])
+    return vectors[0]
+
 
+async def _embed_texts(texts: list[str]) -> list[list[float]]:
+    vectors, _ = await _get_embedding_service().embed(texts)
+    return vectors
+
+
+if vector_store and os.getenv("GENERATE_SEMANTIC_CACHE", "false").lower() in {"1", "true", "yes"}:
+    semantic_generate_cache = SemanticCache(
+        vector_store,
+        _embed_text,
+        collection=os.getenv("GENERATE_SEMANTIC_COLLECTION", "kontrola_generate_cache"),
+        threshold=float(os.getenv("GENERATE_SEMANTIC_THRESHOLD", "0.95")),
+        ttl=int(os.getenv("GENERATE_CACHE_TTL", "86400")),
+    )
+
+
+def _require_trendradar_pool() -> ConnectionPool:
+    if not trendradar_pool:
+        raise HTTPException(
+            status_code=503, detail="TrendRadar MySQL backend unavailable"
+        )
+    return trendradar_pool
+
+
+def _require_mysql_backend(feature: str) -> None:
+    if _trends_backend() != "mysql":
+        raise HTTPException(status_code=400, detail=f"{feature} requires the MySQL TrendRadar backend")
+
+
+def _trendradar_query_timeout() -> float:
+    return float(os.getenv("TRENDRADAR_QUERY_TIMEOUT", "10"))
+
+
+def _max_execution_hint() -> str:
+    """Optimizer hint so MySQL itself aborts SELECTs that outlive the client-side timeout."""
+    return f"/*+ MAX_EXECUTION_TIME({int(_trendradar_query_timeout() * 1000)}) */"
+
+
+def _kill_trendradar_query(connection_id: int | None) -> None:
+    """Abort a running statement from a side connection (the pooled one is blocked in it)."""
+    if not connection_id or not mysql:
+        return
     try:
-        return mysql.connector.connect(
-            host=os.getenv("TRENDRADAR_MYSQL_HOST", "wp-db"),
-            port=int(os.getenv("TRENDRADAR_MYSQL_PORT", "3306")),
-            user=os.getenv("TRENDRADAR_MYSQL_USER", "wordpressdb"),
-            password=os.getenv("TRENDRADAR_MYSQL_PASSWORD", ""),
-            database=os.getenv("TRENDRADAR_MYSQL_DATABASE", "trendradar"),
-            connection_timeout=5,
+        conn = _connect_trendradar_mysql()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f"KILL QUERY {int(connection_id)}")
+            cursor.close()
+        finally:
+            conn.close()
+    except Exception:
+        pass
+
+
+async def _wait_for_disconnect(request: Request) -> None:
+    while not await request.is_disconnected():
+        await asyncio.sleep(0.25)
+
+
+async def _run_trends_job(request: Request, work: Callable[[], T], interrupt: Callable[[], None]) -> T:
+    """
+    Run work() on the TrendRadar executor, bounded by TRENDRADAR_QUERY_TIMEOUT
+    and by the client staying connected. interrupt() is called to stop a job
+    that is already running when either limit is hit.
+    """
+    executor = trendradar_executor
+    if executor is None:
+        raise HTTPException(status_code=503, detail="TrendRadar query executor not started")
+
+    loop = asyncio.get_running_loop()
+    started = loop.create_future()
+
+    def mark_started() -> None:
+        if not started.done():
+            started.set_result(None)
+
+    def run() -> T:
+        try:
+            loop.call_soon_threadsafe(mark_started)
+        except RuntimeError:
+            pass  # Loop closed during shutdown; nobody is waiting.
+        return work()
+
+    future = loop.run_in_executor(executor, run)
+    # An abandoned job may still finish or fail later; retrieve its outcome so
+    # asyncio does not log "exception was never retrieved".
+    future.add_done_callback(lambda f: f.cancelled() or f.exception())
+    disconnect = asyncio.ensure_future(_wait_for_disconnect(request))
+    timeout = _trendradar_query_timeout()
+
+    def abort() -> None:
+        # Drops the job if it is still queued; a running worker thread cannot be
+        # cancelled, so ask the database to stop its statement instead.
+        future.cancel()
+        interrupt()
+
+    try:
+        # Queue wait and run time are bounded separately, so a /trends/range job
+        # queued behind its siblings still gets the full timeout once it runs.
+        done, _ = await asyncio.wait({started, future, disconnect}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        running = started in done or future in done
+        if running and future not in done and disconnect not in done:
+            done, _ = await asyncio.wait({future, disconnect}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+    except asyncio.CancelledError:
+        abort()
+        raise
+    finally:
+        disconnect.cancel()
+        started.cancel()
+
+    if future in done:
+        return future.result()
+
+    abort()
+    if disconnect in done:
+        raise HTTPException(status_code=499, detail="Client disconnected")
+    if not running:
+        raise HTTPException(status_code=503, detail=f"TrendRadar query did not start within {timeout:g}s; executor busy")
+    raise HTTPException(status_code=504, detail=f"TrendRadar query timed out after {timeout:g}s")
+
+
+async def _run_trendradar_query(request: Request, query: Callable[[Any], T]) -> T:
+    """
+    Run query(conn) with a pooled MySQL connection on the TrendRadar executor.
+    On timeout or disconnect the statement is killed server-side; the errored
+    connection is then discarded by the pool.
+    """
+    pool = _require_trendradar_pool()
+    running: dict[str, int | None] = {}
+
+    def work() -> T:
+        with pool.connection() as conn:
+            running["connection_id"] = getattr(conn, "connection_id", None)
+            try:
+                return query(conn)
+            finally:
+                running["connection_id"] = None
+
+    def interrupt() -> None:
+        threading.Thread(target=_kill_trendradar_query, args=(running.get("connection_id"),), daemon=True).start()
+
+    return await _run_trends_job(request, work, interrupt)
+
+
+def _trendradar_output_dir() -> Path:
+    return Path(os.getenv("TRENDRADAR_OUTPUT_DIR", "/app/trendradar/output"))
+
+
+def _iter_db_files(kind: str) -> list[tuple[str, Path]]:
+    """(YYYY-MM-DD, path) pairs of TrendRadar SQLite files for kind, oldest first."""
+    key = (_trendradar_output_dir(), kind)
+    if key not in _day_file_indexes:
+        _day_file_indexes[key] = DayFileIndex(*key)
+    return _day_file_indexes[key].files()
+
+
+def _query_latest_items(db_path: Path, kind: str, limit: int, owner: object | None = None) -> list[dict[str, Any]]:
+    try:
+        rows = query_latest_items(trendradar_sqlite, db_path, kind, limit, TRENDRADAR_ITEM_COLUMNS, owner)
+    except TrendRadarSchemaError as e:
+        raise HTTPException(status_code=500, detail=f"Unrecognized TrendRadar SQLite schema: {str(e)}")
+    return [_trend_item(row) for row in rows]
+
+
+async def _run_sqlite_query(request: Request, db_path: Path, query: Callable[[object], T]) -> T:
+    """Run query(owner) on the TrendRadar executor; owner scopes the interrupt to this job's statement."""
+    owner = object()
+    return await _run_trends_job(request, lambda: query(owner), lambda: trendradar_sqlite.interrupt(db_path, owner))
+
+
+def _fetch_trends_version(conn: Any) -> str:
+    cursor = conn.cursor()
+    cursor.execute("SELECT (SELECT MAX(created_at) FROM news_items), (SELECT MAX(created_at) FROM rss_items)")
+    row = cursor.fetchone()
+    cursor.close()
+    return hashlib.sha1(repr(row).encode()).hexdigest()[:12]
+
+
+async def _trends_cache_version(request: Request) -> str:
+    """Fingerprint of the newest TrendRadar rows, itself cached for a few seconds."""
+    if _trends_backend() == "sqlite":
+        # Newest day files and their mtimes; stat() calls are cheap enough to skip caching.
+        newest = [files[-1] for files in (_iter_db_files("news"), _iter_db_files("rss")) if files]
+        state = []
+        for _, path in newest:
+            try:
+                state.append((str(path), path.stat().st_mtime_ns))
+            except FileNotFoundError:
+                # Day file removed since it was listed: no data for it, like a missing day.
+                continue
+        return hashlib.sha1(repr(state).encode()).hexdigest()[:12]
+
+    async def load() -> str:
+        return await _run_trendradar_query(request, _fetch_trends_version)
+
+    return await trends_cache.get_or_load(
+        "version", load, ttl=int(os.getenv("TRENDS_CACHE_VERSION_TTL", "30"))
+    )
+
+
+def _parse_trends_date(value: str) -> date_type:
+    try:
+        return date_type.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="date must be YYYY-MM-DD")
+
+
+def _day_bounds(day: date_type) -> tuple[datetime, datetime]:
+    """Half-open [start, end) range for a calendar day, usable by an index on created_at."""
+    start = datetime.combine(day, time_type.min)
+    return start, start + timedelta(days=1)
+
+
+# Column lists per table; TrendRadar's schema only changes across upgrades.
+_trendradar_columns_cache: dict[str, list[str]] = {}
+
+
+def _trendradar_columns(conn: Any, table: str) -> list[str]:
+    if table not in _trendradar_columns_cache:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT COLUMN_NAME FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+            (table,),
         )
+        columns = [row[0] for row in cursor.fetchall()]
+        cursor.close()
+        if not columns:
+            # Not created yet (TrendRadar has not run); look again next time.
+            return []
+        _trendradar_columns_cache[table] = columns
+    return _trendradar_columns_cache[table]
+
+
+def _item_projection(conn: Any, table: str) -> str:
+    available = set(_trendradar_columns(conn, table))
+    columns = [c for c in TRENDRADAR_ITEM_COLUMNS if c in available]
+    return ", ".join(f"`{c}`" for c in columns) if columns else "*"
+
+
+def _encode_trends_cursor(row: dict[str, Any]) -> str:
+    """Opaque keyset cursor for the (created_at, rank, id) position of a row."""
+    created_at = row.get("created_at")
+    payload = {
+        "c": created_at.isoformat() if isinstance(created_at, datetime) else created_at,
+        "r": row.get("rank"),
+        "i": row.get("id"),
+    }
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+def _decode_trends_cursor(cursor: str) -> tuple[datetime, Any, Any]:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return datetime.fromisoformat(payload["c"]), payload["r"], payload["i"]
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _latest_rows_sql(
+    table: str,
+    projection: str,
+    day: date_type | None,
+    limit: int | None,
+    after: tuple[datetime, Any, Any] | None = None,
+    hint: bool = True,
+) -> tuple[str, tuple[Any, ...]]:
+    """
+    Build the /trends/latest query. `after` is a decoded keyset cursor; rows
+    strictly after it in the sort order are returned, so deep pages cost the
+    same as the first one. `id` breaks ties so every row has a unique position.
+    """
+    where: list[str] = []
+    params: list[Any] = []
+    if day:
+        # Query for a specific date
+        where.append("created_at >= %s AND created_at < %s")
+        params.extend(_day_bounds(day))
+        # Unranked rows last (MySQL sorts NULL first): matches _merge_ranked_days' key.
+        order = "`rank` IS NULL, `rank` ASC, created_at DESC, id ASC"
+        if after:
+            created_at, rank, id_ = after
+            if rank is None:
+                where.append("(`rank` IS NULL AND (created_at < %s OR (created_at = %s AND id > %s)))")
+                params.extend([created_at, created_at, id_])
+            else:
+                where.append("(`rank` IS NULL OR `rank` > %s OR (`rank` = %s AND (created_at < %s OR (created_at = %s AND id > %s))))")
+                params.extend([rank, rank, created_at, created_at, id_])
+    else:
+        # Query the latest date's items
+        order = "created_at DESC, `rank` ASC, id ASC"
+        if after:
+            created_at, rank, id_ = after
+            where.append("(created_at < %s OR (created_at = %s AND (`rank` > %s OR (`rank` = %s AND id > %s))))")
+            params.extend([created_at, created_at, rank, rank, id_])
+
+    sql = f"SELECT {_max_execution_hint() if hint else ''} {projection} FROM `{table}`"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += f" ORDER BY {order}"
+    if limit is not None:
+        sql += " LIMIT %s"
+        params.append(limit)
+    return sql, tuple(params)
+
+
+def _recent_dates(cursor: Any, table: str, max_days: int = 30) -> list[str]:
+    """
+    Distinct days with data, newest first.
+    Walks backwards with one MAX(created_at) index probe per day instead of
+    grouping DATE(created_at) over the whole table.
+    """
+    dates: list[str] = []
+    before: datetime | None = None
+    while len(dates) < max_days:
+        if before is None:
+            cursor.execute(f"SELECT MAX(created_at) FROM `{table}`")
+        else:
+            cursor.execute(f"SELECT MAX(created_at) FROM `{table}` WHERE created_at < %s", (before,))
+        row = cursor.fetchone()
+        newest = row[0] if row else None
+        if newest is None:
+            break
+        day = newest.date() if isinstance(newest, datetime) else date_type.fromisoformat(str(newest)[:10])
+        dates.append(day.isoformat())
+        before = datetime.combine(day, time_type.min)
+    return dates
+
+
+def _fetch_available_dates(conn: Any) -> dict[str, list[str]]:
+    cursor = conn.cursor()
+    news_dates = _recent_dates(cursor, "news_items")
+    rss_dates = _recent_dates(cursor, "rss_items")
+    cursor.close()
+    return {"news": news_dates, "rss": rss_dates}
+
+
+def _fetch_latest_rows(
+    conn: Any,
+    table: str,
+    day: date_type | None,
+    limit: int,
+    after: tuple[datetime, Any, Any] | None = None,
+) -> list[dict[str, Any]]:
+    sql, params = _latest_rows_sql(table, _item_projection(conn, table), day, limit, after)
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute(sql, params)
+    rows = cursor.fetchall()
+    cursor.close()
+    return rows
+
+
+def _trend_item(row: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "id": row.get("id"),
+        "title": row.get("title"),
+        "url": row.get("url") or row.get("link"),
+        "rank": row.get("rank") or row.get("position"),
+        "platform_id": row.get("platform_id") or row.get("source_id"),
+        "platform_name": row.get("platform_name"),
+        "created_at": row.get("created_at"),
+    }
+
+
+async def _stream_trend_items(
+    request: Request,
+    table: str,
+    day: date_type | None,
+    after: tuple[datetime, Any, Any] | None,
+    batch_size: int,
+) -> AsyncIterator[bytes]:
+    """
+    Yield NDJSON lines from an unbuffered (server-side) cursor, one fetchmany()
+    batch at a time, so memory stays flat however many rows match.
+    All blocking calls run on the TrendRadar executor. The stream uses its own
+    connection, not one from the pool, because a slow client can hold it for
+    as long as the export takes.
+    """
+    executor = trendradar_executor
+    if executor is None:
+        raise HTTPException(status_code=503, detail="TrendRadar query executor not started")
+
+    # Headers are already sent once streaming starts; report errors in-band.
+    if trendradar_stream_slots.locked():
+        yield (json.dumps({"error": "Too many concurrent TrendRadar exports; retry later"}) + "\n").encode()
+        return
+    async with trendradar_stream_slots:
+        loop = asyncio.get_running_loop()
+        try:
+            conn = await loop.run_in_executor(executor, _connect_trendradar_mysql)
+        except Exception as e:
+            yield (json.dumps({"error": f"TrendRadar MySQL backend unavailable: {str(e)}"}) + "\n").encode()
+            return
+        try:
+            def execute() -> Any:
+                # No MAX_EXECUTION_TIME hint: exports legitimately run long.
+                sql, params = _latest_rows_sql(table, _item_projection(conn, table), day, None, after, hint=False)
+                cursor = conn.cursor(dictionary=True, buffered=False)
+                cursor.execute(sql, params)
+                return cursor
+
+            try:
+                cursor = await loop.run_in_executor(executor, execute)
+            except Exception as e:
+                yield (json.dumps({"error": f"Database query failed: {str(e)}"}) + "\n").encode()
+                return
+
+            while True:
+                rows = await loop.run_in_executor(executor, cursor.fetchmany, batch_size)
+                if not rows:
+                    break
+                yield "".join(json.dumps(jsonable_encoder(_trend_item(row))) + "\n" for row in rows).encode()
+                if await request.is_disconnected():
+                    return
+            await loop.run_in_executor(executor, cursor.close)
+        finally:
+            # Also drops a half-read unbuffered result, which would leave the connection unusable.
+            conn.close()
+
+
+def _merge_ranked_days(per_day: list[tuple[date_type, list[dict[str, Any]]]], limit: int) -> list[dict[str, Any]]:
+    """
+    k-way merge of per-day item lists (each already in rank order) by rank,
+    newer day first on ties. heapq.merge is lazy, so only `limit` items are
+    pulled through the heap.
+    """
+
+    def keyed(day: date_type, items: list[dict[str, Any]]):
+        newer_first = -day.toordinal()
+        for item in items:
+            rank = item.get("rank")
+            yield (rank if rank is not None else float("inf"), newer_first), day, item
+
+    merged = heapq.merge(*(keyed(day, items) for day, items in per_day), key=lambda entry: entry[0])
+    return [{**item, "date": day.isoformat()} for _, day, item in islice(merged, limit)]
+
+
+def _check_trendradar_indexes(conn: Any, create: bool = False) -> dict[str, Any]:
+    """
+    Report whether each TrendRadar table has an index leading with
+    (created_at, rank), optionally creating the missing ones.
+    """
+    cursor = conn.cursor()
+    report: dict[str, Any] = {}
+    for table in TRENDRADAR_TABLES:
+        cursor.execute(
+            "SELECT INDEX_NAME, SEQ_IN_INDEX, COLUMN_NAME FROM information_schema.STATISTICS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s ORDER BY INDEX_NAME, SEQ_IN_INDEX",
+            (table,),
+        )
+        indexes: dict[str, list[str]] = {}
+        for index_name, _, column in cursor.fetchall():
+            indexes.setdefault(index_name, []).append(column)
+
+        want = list(TRENDRADAR_INDEX_COLUMNS)
+        matching = [name for name, cols in indexes.items() if cols[: len(want)] == want]
+        entry: dict[str, Any] = {
+            "indexes": indexes,
+            "recommended": f"CREATE INDEX {TRENDRADAR_INDEX_NAME} ON `{table}` (created_at DESC, `rank`)",
+            "ok": bool(matching),
+            "matching": matching,
+        }
+        if not indexes and not _trendradar_columns(conn, table):
+            entry["error"] = "table not found"
+        elif not matching and create:
+            try:
+                cursor.execute(entry["recommended"])
+                entry.update(ok=True, created=True, matching=[TRENDRADAR_INDEX_NAME])
+            except Exception as e:
+                entry["error"] = f"index creation failed: {str(e)}"
+        report[table] = entry
+    cursor.close()
+    return report
+
+
+def _explain_trends_queries(conn: Any, table: str, day: date_type | None, limit: int) -> dict[str, Any]:
+    cursor = conn.cursor(dictionary=True)
+    plans: dict[str, Any] = {}
+    sql, params = _latest_rows_sql(table, _item_projection(conn, table), day, limit)
+    cursor.execute(f"EXPLAIN {sql}", params)
+    plans["latest"] = {"sql": sql, "plan": cursor.fetchall()}
+    probe = f"SELECT MAX(created_at) FROM `{table}` WHERE created_at < %s"
+    cursor.execute(f"EXPLAIN {probe}", (datetime.now(),))
+    plans["available_dates_probe"] = {"sql": probe, "plan": cursor.fetchall()}
+    cursor.close()
+    return plans
+
+
+def _startup_index_check() -> None:
+    global trendradar_index_report
+    if not trendradar_pool:
+        return
+    create = os.getenv("TRENDRADAR_CREATE_INDEXES", "false").lower() in {"1", "true", "yes"}
+    try:
+        with trendradar_pool.connection() as conn:
+            trendradar_index_report = _check_trendradar_indexes(conn, create=create)
     except Exception as e:
-        return None
+        trendradar_index_report = {"error": str(e)}
+        return
+    for table, entry in trendradar_index_report.items():
+        if not entry.get("ok"):
+            logger.warning("TrendRadar table %s lacks a (created_at, rank) index; run: %s", table, entry["recommended"])
 
 
 @app.get("/health")
@@ -75,80 +747,95 @@ def health() -> dict[str, Any]:
 
 
 @app.get("/trends/status")
-def trends_status(
+async def trends_status(
+    request: Request,
     x_kontrola_secret: str | None = Header(default=None, convert_underscores=False),
 ) -> dict[str, Any]:
-    """Report TrendRadar MySQL integration status."""
+    """Report TrendRadar integration status (MySQL or local SQLite files)."""
     _require_shared_secret(x_kontrola_secret)
 
-    conn = _get_trendradar_mysql_conn()
-    if not conn:
+    if _trends_backend() == "sqlite":
+        output_dir = _trendradar_output_dir()
+        files = {kind: _iter_db_files(kind) for kind in ("news", "rss")} if output_dir.is_dir() else {}
+        return {
+            "ok": bool(files) and any(files.values()),
+            "backend": "sqlite",
+            "output_dir": str(output_dir),
+            "days": {kind: len(found) for kind, found in files.items()},
+            "latest": {kind: found[-1][0] for kind, found in files.items() if found},
+        }
+
+    if not trendradar_pool:
         return {
             "ok": False,
             "error": "TrendRadar MySQL backend not configured or unavailable",
             "mysql_available": mysql is not None,
         }
 
-    try:
+    def probe(conn: Any) -> None:
         cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM news_items LIMIT 1")
+        cursor.execute("SELECT 1 FROM news_items LIMIT 1")
         cursor.fetchone()
         cursor.close()
-        conn.close()
+
+    try:
+        await _run_trendradar_query(request, probe)
         return {
             "ok": True,
             "backend": "mysql",
             "database": os.getenv("TRENDRADAR_MYSQL_DATABASE", "trendradar"),
             "host": os.getenv("TRENDRADAR_MYSQL_HOST", "wp-db"),
+            "pool": trendradar_pool.stats(),
+            "indexes": trendradar_index_report,
         }
     except Exception as e:
         return {
             "ok": False,
             "error": f"Failed to query TrendRadar database: {str(e)}",
+            "pool": trendradar_pool.stats(),
         }
 
 
 @app.get("/trends/available-dates")
-def trends_available_dates(
+async def trends_available_dates(
+    request: Request,
     x_kontrola_secret: str | None = Header(default=None, convert_underscores=False),
 ) -> dict[str, Any]:
-    """List available news/RSS data dates from TrendRadar MySQL."""
+    """List available news/RSS data dates from TrendRadar."""
     _require_shared_secret(x_kontrola_secret)
 
-    conn = _get_trendradar_mysql_conn()
-    if not conn:
-        raise HTTPException(
-            status_code=503, detail="TrendRadar MySQL backend unavailable"
-        )
-
-    try:
-        cursor = conn.cursor(dictionary=True)
-        # Try to get distinct dates from the news_items table (adjust column names if needed).
-        cursor.execute("SELECT DISTINCT DATE(created_at) as date FROM news_items ORDER BY date DESC LIMIT 30")
-        news_dates = [row["date"].isoformat() if row["date"] else "" for row in cursor.fetchall()]
-
-        cursor.execute("SELECT DISTINCT DATE(created_at) as date FROM rss_items ORDER BY date DESC LIMIT 30")
-        rss_dates = [row["date"].isoformat() if row["date"] else "" for row in cursor.fetchall()]
+    if _trends_backend() == "sqlite":
+        # Served straight from the in-memory day-file index.
+        return {kind: [d for d, _ in reversed(_iter_db_files(kind))][:30] for kind in ("news", "rss")}
 
-        cursor.close()
-        conn.close()
+    async def load() -> dict[str, list[str]]:
+        return await _run_trendradar_query(request, _fetch_available_dates)
 
-        return {
-            "news": news_dates,
-            "rss": rss_dates,
-        }
+    try:
+        version = await _trends_cache_version(request)
+        return await trends_cache.get_or_load(f"available-dates:{version}", load)
+    except HTTPException:
+        raise
+    except PoolError as e:
+        raise HTTPException(status_code=503, detail=f"TrendRadar MySQL backend unavailable: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database query failed: {str(e)}")
 
 
 @app.get("/trends/latest")
-def trends_latest(
+async def trends_latest(
+    request: Request,
     kind: str = "news",
     date: str | None = None,
     limit: int = 50,
+    cursor: str | None = None,
     x_kontrola_secret: str | None = Header(default=None, convert_underscores=False),
 ) -> dict[str, Any]:
-    """Return latest news/RSS items from TrendRadar MySQL."""
+    """
+    Return latest news/RSS items from TrendRadar.
+    Pass the returned next_cursor back as `cursor` to fetch the following page
+    (MySQL backend only).
+    """
     _require_shared_secret(x_kontrola_secret)
 
     kind = kind.strip().lower()
@@ -160,89 +847,233 @@ def trends_latest(
     if limit > 200:
         limit = 200
 
-    conn = _get_trendradar_mysql_conn()
-    if not conn:
-        raise HTTPException(
-            status_code=503, detail="TrendRadar MySQL backend unavailable"
-        )
-
-    try:
-        table = "news_items" if kind == "news" else "rss_items"
-        cursor = conn.cursor(dictionary=True)
+    table = "news_items" if kind == "news" else "rss_items"
+    day = _parse_trends_date(date) if date else None
+    after = _decode_trends_cursor(cursor) if cursor else None
+    if after:
+        _require_mysql_backend("Cursor pagination")
 
-        if date:
-            # Query for a specific date
-            sql = f"SELECT * FROM {table} WHERE DATE(created_at) = %s ORDER BY rank ASC LIMIT %s"
-            cursor.execute(sql, (date, limit))
-        else:
-            # Query the latest date's items
-            sql = f"SELECT * FROM {table} ORDER BY created_at DESC, rank ASC LIMIT %s"
-            cursor.execute(sql, (limit,))
+    async def load_sqlite() -> dict[str, Any]:
+        files = dict(_iter_db_files(kind))
+        path = files.get(day.isoformat()) if day else files[max(files)] if files else None
+        if path is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"No TrendRadar {kind} SQLite data found under {_trendradar_output_dir()} for {date or 'any date'}.",
+            )
+        items = await _run_sqlite_query(request, path, lambda owner: _query_latest_items(path, kind, limit, owner))
+        return jsonable_encoder({
+            "ok": True,
+            "kind": kind,
+            "date": date or "latest",
+            "count": len(items),
+            "items": items,
+            "next_cursor": None,
+        })
 
-        rows = cursor.fetchall()
-        cursor.close()
-        conn.close()
+    async def load() -> dict[str, Any]:
+        rows = await _run_trendradar_query(request, lambda conn: _fetch_latest_rows(conn, table, day, limit, after))
 
-        if not rows:
+        if not rows and not after:
             raise HTTPException(
                 status_code=404,
                 detail=f"No TrendRadar {kind} data found. Ensure the `trends` profile is running and TrendRadar has populated the MySQL database.",
             )
 
-        items = []
-        for row in rows:
-            items.append(
-                {
-                    "id": row.get("id"),
-                    "title": row.get("title"),
-                    "url": row.get("url") or row.get("link"),
-                    "rank": row.get("rank") or row.get("position"),
-                    "platform_id": row.get("platform_id") or row.get("source_id"),
-                    "platform_name": row.get("platform_name"),
-                    "created_at": row.get("created_at"),
-                }
-            )
+        items = [_trend_item(row) for row in rows]
 
-        return {
+        return jsonable_encoder({
             "ok": True,
             "kind": kind,
             "date": date or "latest",
             "count": len(items),
             "items": items,
-        }
+            "next_cursor": _encode_trends_cursor(rows[-1]) if len(rows) == limit else None,
+        })
+
+    try:
+        version = await _trends_cache_version(request)
+        return await trends_cache.get_or_load(
+            f"latest:{_trends_backend()}:{kind}:{date or 'latest'}:{limit}:{cursor or ''}:{version}",
+            load_sqlite if _trends_backend() == "sqlite" else load,
+        )
     except HTTPException:
         raise
+    except PoolError as e:
+        raise HTTPException(status_code=503, detail=f"TrendRadar MySQL backend unavailable: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database query failed: {str(e)}")
 
 
-@app.post("/generate", response_model=GenerateResponse)
-async def generate(
-    req: GenerateRequest,
+@app.get("/trends/range")
+async def trends_range(
+    request: Request,
+    start: str,
+    end: str | None = None,
+    kind: str = "news",
+    limit: int = 50,
     x_kontrola_secret: str | None = Header(default=None, convert_underscores=False),
-) -> GenerateResponse:
+) -> dict[str, Any]:
+    """
+    Top news/RSS items across a date range (inclusive; `end` defaults to today).
+    Days are queried in parallel on the TrendRadar executor and merged by rank.
+    """
     _require_shared_secret(x_kontrola_secret)
 
-    # Minimal implementation:
-    # - If OPENAI_API_KEY is present, call OpenAI Chat Completions.
-    # - Otherwise return a deterministic stub.
-    openai_key = os.getenv("OPENAI_API_KEY", "").strip()
-    if not openai_key:
-        return GenerateResponse(
-            text=(
-                "[kontrola-agent stub] OPENAI_API_KEY is not configured. "
-                "Set OPENAI_API_KEY in .env to enable real generation.\n\n"
-                f"Prompt was: {req.prompt}"
-            ),
-            provider="stub",
+    kind = kind.strip().lower()
+    if kind not in {"news", "rss"}:
+        raise HTTPException(status_code=400, detail="kind must be 'news' or 'rss'")
+    limit = min(max(limit, 1), 200)
+
+    first = _parse_trends_date(start)
+    last = _parse_trends_date(end) if end else date_type.today()
+    max_days = int(os.getenv("TRENDS_RANGE_MAX_DAYS", "31"))
+    if last < first:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+    if (last - first).days + 1 > max_days:
+        raise HTTPException(status_code=400, detail=f"Date range may span at most {max_days} days")
+
+    table = "news_items" if kind == "news" else "rss_items"
+    files = dict(_iter_db_files(kind)) if _trends_backend() == "sqlite" else {}
+
+    async def fetch_day(day: date_type) -> tuple[date_type, list[dict[str, Any]]]:
+        if _trends_backend() == "sqlite":
+            path = files[day.isoformat()]
+            return day, await _run_sqlite_query(request, path, lambda owner: _query_latest_items(path, kind, limit, owner))
+        rows = await _run_trendradar_query(request, lambda conn: _fetch_latest_rows(conn, table, day, limit))
+        return day, [_trend_item(row) for row in rows]
+
+    async def load() -> dict[str, Any]:
+        if _trends_backend() == "sqlite":
+            days = [date_type.fromisoformat(d) for d in files if first.isoformat() <= d <= last.isoformat()]
+        else:
+            days = [first + timedelta(days=n) for n in range((last - first).days + 1)]
+        # Each day is its own executor job; the executor size bounds the fan-out.
+        per_day = await asyncio.gather(*(fetch_day(day) for day in days))
+        items = _merge_ranked_days(list(per_day), limit)
+        return jsonable_encoder({
+            "ok": True,
+            "kind": kind,
+            "start": first.isoformat(),
+            "end": last.isoformat(),
+            "days": {day.isoformat(): len(rows) for day, rows in per_day},
+            "count": len(items),
+            "items": items,
+        })
+
+    try:
+        version = await _trends_cache_version(request)
+        return await trends_cache.get_or_load(
+            f"range:{_trends_backend()}:{kind}:{first}:{last}:{limit}:{version}", load
         )
+    except HTTPException:
+        raise
+    except PoolError as e:
+        raise HTTPException(status_code=503, detail=f"TrendRadar MySQL backend unavailable: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database query failed: {str(e)}")
 
-    # NOTE: This uses the OpenAI public endpoint. If you later want GitHub Models / Azure,
-    # adjust base_url + auth accordingly.
-    url = "https://api.openai.com/v1/chat/completions"
-    model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
 
-    payload = {
+@app.get("/trends/stream")
+async def trends_stream(
+    request: Request,
+    kind: str = "news",
+    date: str | None = None,
+    cursor: str | None = None,
+    batch_size: int = 500,
+    x_kontrola_secret: str | None = Header(default=None, convert_underscores=False),
+) -> StreamingResponse:
+    """Stream every matching news/RSS item as NDJSON, in /trends/latest order."""
+    _require_shared_secret(x_kontrola_secret)
+
+    kind = kind.strip().lower()
+    if kind not in {"news", "rss"}:
+        raise HTTPException(status_code=400, detail="kind must be 'news' or 'rss'")
+    table = "news_items" if kind == "news" else "rss_items"
+    day = _parse_trends_date(date) if date else None
+    after = _decode_trends_cursor(cursor) if cursor else None
+    batch_size = min(max(batch_size, 1), 5000)
+
+    _require_mysql_backend("Streaming")
+    _require_trendradar_pool()
+    return StreamingResponse(
+        _stream_trend_items(request, table, day, after, batch_size),
+        media_type="application/x-ndjson",
+    )
+
+
+@app.get("/trends/indexes")
+async def trends_indexes(
+    request: Request,
+    kind: str = "news",
+    date: str | None = None,
+    limit: int = 50,
+    x_kontrola_secret: str | None = Header(default=None, convert_underscores=False),
+) -> dict[str, Any]:
+    """Report TrendRadar index coverage and EXPLAIN plans for the /trends queries."""
+    _require_shared_secret(x_kontrola_secret)
+    _require_mysql_backend("Index inspection")
+
+    kind = kind.strip().lower()
+    if kind not in {"news", "rss"}:
+        raise HTTPException(status_code=400, detail="kind must be 'news' or 'rss'")
+    table = "news_items" if kind == "news" else "rss_items"
+    day = _parse_trends_date(date) if date else None
+
+    def inspect(conn: Any) -> dict[str, Any]:
+        return {
+            "indexes": _check_trendradar_indexes(conn),
+            "explain": _explain_trends_queries(conn, table, day, limit),
+        }
+
+    try:
+        return jsonable_encoder({"ok": True, **await _run_trendradar_query(request, inspect)})
+    except HTTPException:
+        raise
+    except PoolError as e:
+        raise HTTPException(status_code=503, detail=f"TrendRadar MySQL backend unavailable: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database query failed: {str(e)}")
+
+
+@app.post("/trends/indexes")
+async def trends_create_indexes(
+    request: Request,
+    x_kontrola_secret: str | None = Header(default=None, convert_underscores=False),
+) -> dict[str, Any]:
+    """Create the (created_at, rank) indexes the /trends queries rely on, where missing."""
+    _require_shared_secret(x_kontrola_secret)
+    _require_mysql_backend("Index creation")
+
+    global trendradar_index_report
+    try:
+        # Index builds on large tables outlive the query timeout, so bypass it.
+        pool = _require_trendradar_pool()
+
+        def create() -> dict[str, Any]:
+            with pool.connection() as conn:
+                return _check_trendradar_indexes(conn, create=True)
+
+        trendradar_index_report = await asyncio.to_thread(create)
+        return {"ok": all(e.get("ok") for e in trendradar_index_report.values()), "indexes": trendradar_index_report}
+    except HTTPException:
+        raise
+    except PoolError as e:
+        raise HTTPException(status_code=503, detail=f"TrendRadar MySQL backend unavailable: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Index creation failed: {str(e)}")
+
+
+def _stub_generate_text(prompt: str) -> str:
+    return (
+        "[kontrola-agent stub] OPENAI_API_KEY is not configured. "
+        "Set OPENAI_API_KEY in .env to enable real generation.\n\n"
+        f"Prompt was: {prompt}"
+    )
+
+
+def _generate_payload(req: GenerateRequest, model: str) -> dict[str, Any]:
+    return {
         "model": model,
         "messages": [
             {
@@ -257,53 +1088,376 @@ async def generate(
         "temperature": 0.7,
     }
 
-    async with httpx.AsyncClient(timeout=30) as client:
-        r = await client.post(
-            url,
-            headers={
-                "Authorization": f"Bearer {openai_key}",
-                "Content-Type": "application/json",
-            },
-            json=payload,
-        )
 
-    if r.status_code >= 400:
-        raise HTTPException(status_code=502, detail=f"Upstream OpenAI error: {r.text}")
+def _generate_cache_enabled() -> bool:
+    return os.getenv("GENERATE_CACHE_ENABLED", "true").lower() in {"1", "true", "yes"}
+
+
+def _generate_cache_scope(payload: dict[str, Any]) -> str:
+    """Everything except the user prompt that shapes the answer: model, system prompt, temperature."""
+    system = next((m["content"] for m in payload["messages"] if m["role"] == "system"), "")
+    return hashlib.sha256(json.dumps([payload["model"], system, payload["temperature"]]).encode()).hexdigest()[:16]
+
+
+def _generate_cache_key(payload: dict[str, Any], prompt: str) -> str:
+    return hashlib.sha256(f"{_generate_cache_scope(payload)}\0{prompt}".encode()).hexdigest()
+
+
+async def _generate_cached(req: GenerateRequest, payload: dict[str, Any]) -> tuple[dict[str, Any] | None, list[float] | None]:
+    """
+    Exact then semantic lookup. Returns ({"text", "provider"} with a cache:*
+    provider on a hit, else None) and the prompt embedding the semantic lookup
+    computed, for _generate_remember() to reuse on a miss.
+    """
+    if not _generate_cache_enabled():
+        return None, None
+    cached = await generate_cache.lookup(_generate_cache_key(payload, req.prompt))
+    if cached is not None:
+        return {"text": cached["text"], "provider": "cache:exact"}, None
+    if semantic_generate_cache:
+        value, vector = await semantic_generate_cache.lookup(_generate_cache_scope(payload), req.prompt)
+        if value is not None:
+            return {"text": value["text"], "provider": "cache:semantic"}, vector
+        return None, vector
+    return None, None
+
+
+async def _generate_remember(req: GenerateRequest, payload: dict[str, Any], text: str, provider: str, vector: list[float] | None = None) -> None:
+    if not _generate_cache_enabled():
+        return
+    value = {"text": text, "provider": provider}
+    await generate_cache.store(_generate_cache_key(payload, req.prompt), value)
+    if semantic_generate_cache:
+        await semantic_generate_cache.remember(_generate_cache_scope(payload), req.prompt, value, vector=vector)
+
+
+def _sse(event: str, data: dict[str, Any]) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n".encode()
+
+
+@app.post("/generate", response_model=GenerateResponse)
+async def generate(
+    req: GenerateRequest,
+    x_kontrola_secret: str | None = Header(default=None, convert_underscores=False),
+) -> GenerateResponse:
+    _require_shared_secret(x_kontrola_secret)
+
+    # Minimal implementation:
+    # - If OPENAI_API_KEY is present, call OpenAI Chat Completions.
+    # - Otherwise return a deterministic stub.
+    openai_key = os.getenv("OPENAI_API_KEY", "").strip()
+    if not openai_key:
+        return GenerateResponse(text=_stub_generate_text(req.prompt), provider="stub")
+
+    # OPENAI_BASE_URL selects the endpoint (OpenAI by default); any OpenAI-compatible
+    # server works, including GitHub Models / Azure-style gateways and local stand-ins.
+    model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+    payload = _generate_payload(req, model)
+
+    cached, prompt_vector = await _generate_cached(req, payload)
+    if cached:
+        return GenerateResponse(**cached)
 
-    data = r.json()
     try:
-        text = data["choices"][0]["message"]["content"]
-    except Exception:
-        raise HTTPException(status_code=502, detail="Unexpected OpenAI response format")
+        # Identical prompts already in flight share one upstream call.
+        text = await _get_llm_scheduler().run(
+            _generate_cache_key(payload, req.prompt),
+            lambda: _get_llm_client().chat_completion(payload),
+        )
+    except UpstreamError as e:
+        raise HTTPException(status_code=502, detail=e.detail)
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=502, detail=f"Upstream OpenAI request failed: {str(e)}")
 
+    await _generate_remember(req, payload, text, f"openai:{model}", prompt_vector)
     return GenerateResponse(text=text, provider=f"openai:{model}")
 
 
+@app.post("/generate/stream")
+async def generate_stream(
+    req: GenerateRequest,
+    request: Request,
+    x_kontrola_secret: str | None = Header(default=None, convert_underscores=False),
+) -> StreamingResponse:
+    """
+    Stream generated text as Server-Sent Events: `token` events carry deltas,
+    a final `done` event carries the assembled text, provider and timings.
+    """
+    _require_shared_secret(x_kontrola_secret)
+
+    openai_key = os.getenv("OPENAI_API_KEY", "").strip()
+    model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+    payload = _generate_payload(req, model)
+
+    async def events() -> AsyncIterator[bytes]:
+        started = time.perf_counter()
+        ttft_ms: float | None = None
+        parts: list[str] = []
+
+        if not openai_key:
+            text = _stub_generate_text(req.prompt)
+            yield _sse("token", {"text": text})
+            yield _sse("done", {"text": text, "provider": "stub", "ttft_ms": 0.0, "total_ms": 0.0})
+            return
+
+        cached, prompt_vector = await _generate_cached(req, payload)
+        if cached:
+            total_ms = round((time.perf_counter() - started) * 1000, 1)
+            yield _sse("token", {"text": cached["text"]})
+            yield _sse("done", {**cached, "ttft_ms": total_ms, "total_ms": total_ms})
+            return
+
+        try:
+            # Streams hold a scheduler slot for their whole duration but are not
+            # retried or shared: tokens already sent cannot be replayed.
+            async with _get_llm_scheduler().slot():
+                # Leaving this loop early (client gone, task cancelled) closes the
+                # upstream response, so the provider stops generating too.
+                async for delta in _get_llm_client().stream_chat_completion(payload):
+                    if ttft_ms is None:
+                        ttft_ms = (time.perf_counter() - started) * 1000
+                        logger.info("generate stream first token after %.1f ms (model=%s)", ttft_ms, model)
+                    parts.append(delta)
+                    yield _sse("token", {"text": delta})
+                    if await request.is_disconnected():
+                        logger.info("generate stream cancelled by client after %d chunks", len(parts))
+                        return
+        except UpstreamError as e:
+            yield _sse("error", {"detail": e.detail})
+            return
+        except httpx.HTTPError as e:
+            yield _sse("error", {"detail": f"Upstream OpenAI request failed: {str(e)}"})
+            return
+
+        total_ms = (time.perf_counter() - started) * 1000
+        text = "".join(parts)
+        await _generate_remember(req, payload, text, f"openai:{model}", prompt_vector)
+        yield _sse("done", {
+            "text": text,
+            "provider": f"openai:{model}",
+            "ttft_ms": round(ttft_ms or total_ms, 1),
+            "total_ms": round(total_ms, 1),
+        })
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Keep reverse proxies from buffering the stream.
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/generate/status")
+def generate_status(
+    x_kontrola_secret: str | None = Header(default=None, convert_underscores=False),
+) -> dict[str, Any]:
+    """Upstream scheduler metrics: queue depth, wait times, retries, current rate limit."""
+    _require_shared_secret(x_kontrola_secret)
+    return {
+        "client": _get_llm_client().info(),
+        "scheduler": _get_llm_scheduler().stats(),
+    }
+
+
+class EmbedRequest(BaseModel):
+    texts: list[str]
+    # "base64": one little-endian float32 row-major matrix, the same layout
+    # /vector/insert accepts as vectors_bin.
+    encoding_format: Literal["float", "base64"] = "float"
+
+
+@app.post("/embed")
+async def embed(
+    req: EmbedRequest,
+    x_kontrola_secret: str | None = Header(default=None, convert_underscores=False),
+) -> dict[str, Any]:
+    """Embed a batch of texts; `embeddings[i]` answers `texts[i]`."""
+    _require_shared_secret(x_kontrola_secret)
+
+    max_texts = int(os.getenv("EMBED_MAX_TEXTS", "256"))
+    if not req.texts:
+        raise HTTPException(status_code=400, detail="texts must not be empty")
+    if len(req.texts) > max_texts:
+        raise HTTPException(status_code=400, detail=f"At most {max_texts} texts per request")
+
+    try:
+        service = _get_embedding_service()
+    except ValueError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    if service.backend == "openai" and not os.getenv("OPENAI_API_KEY", "").strip():
+        raise HTTPException(status_code=503, detail="Embeddings need OPENAI_API_KEY or EMBEDDING_BACKEND=local")
+
+    try:
+        vectors, cached = await service.embed(req.texts)
+    except UpstreamError as e:
+        raise HTTPException(status_code=502, detail=e.detail)
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=502, detail=f"Upstream embeddings request failed: {str(e)}")
+    except ImportError as e:
+        raise HTTPException(status_code=503, detail=f"Local embedding model unavailable: {str(e)}")
+
+    dimension = len(vectors[0])
+    if req.encoding_format == "base64":
+        data: Any = base64.b64encode(np.asarray(vectors, dtype="<f4").tobytes()).decode()
+    else:
+        data = vectors
+    return {
+        "ok": True,
+        "model": service.model,
+        "dimension": dimension,
+        "count": len(vectors),
+        "cached": cached,
+        "embeddings": data,
+    }
+
+
+@app.get("/embed/status")
+def embed_status(
+    x_kontrola_secret: str | None = Header(default=None, convert_underscores=False),
+) -> dict[str, Any]:
+    """Embedding backend, micro-batching and cache metrics."""
+    _require_shared_secret(x_kontrola_secret)
+    try:
+        return _get_embedding_service().stats()
+    except ValueError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
 # ============================================================================
 # VECTOR STORE ENDPOINTS (RAG functionality)
 # ============================================================================
 
 
+# The *_bin fields are the compact alternative to float lists: little-endian
+# float32/float16 bytes, row-major, base64-encoded in JSON bodies and native
+# binary in MessagePack bodies (see app/vector_wire.py).
+VectorDType = Literal["float32", "float16"]
+
+
 class VectorInsertRequest(BaseModel):
+    model_config = ConfigDict(val_json_bytes="base64")
+
     collection: str
-    vectors: list[list[float]]
+    vectors: list[list[float]] | None = None
+    vectors_bin: bytes | None = None
+    dtype: VectorDType = "float32"
+    dimension: int | None = None
     metadata: list[dict[str, Any]]
     ids: list[str] | None = None
 
 
 class VectorSearchRequest(BaseModel):
+    model_config = ConfigDict(val_json_bytes="base64")
+
     collection: str
-    query_vector: list[float]
+    query_vector: list[float] | None = None
+    query_vector_bin: bytes | None = None
+    dtype: VectorDType = "float32"
     top_k: int = 10
     filter: dict[str, Any] | None = None
+    # Search-time ANN knobs for this request: ef (HNSW), nprobe (IVF), rerank (quantized collections).
+    search_params: dict[str, int] | None = None
+    # hybrid: BM25 over `text_field` (one of LEXICAL_INDEX_FIELDS) fused with the
+    # vector results by reciprocal rank fusion; each leg contributes `candidates` hits.
+    mode: Literal["vector", "hybrid"] = "vector"
+    query_text: str | None = None
+    text_field: str = "text"
+    rrf_k: int = 60
+    candidates: int | None = None
+
+
+class VectorBatchSearchRequest(BaseModel):
+    model_config = ConfigDict(val_json_bytes="base64")
+
+    collection: str
+    query_vectors: list[list[float]] | None = None
+    query_vectors_bin: bytes | None = None
+    dtype: VectorDType = "float32"
+    dimension: int | None = None
+    top_k: int = 10
+    filter: dict[str, Any] | None = None
+    search_params: dict[str, int] | None = None
+
+
+class VectorIndexRequest(BaseModel):
+    collection: str
+    index_type: str = "hnsw"
+    # Build parameters: m and ef_construction (hnsw) or nlist (ivf).
+    params: dict[str, int] = {}
+    # Default search-time parameters for the collection (ef, nprobe).
+    search_params: dict[str, int] | None = None
+
+
+class VectorCollectionRequest(BaseModel):
+    collection: str
+    dimension: int
+    # Opt-in compressed vectors; which values a backend supports is listed in app/vector_store.py.
+    quantization: Literal["int8", "float16", "pq"] | None = None
+
+
+class VectorReportRequest(BaseModel):
+    model_config = ConfigDict(val_json_bytes="base64")
+
+    collection: str
+    # Sample queries for recall@k; without them only the footprint is reported.
+    query_vectors: list[list[float]] | None = None
+    query_vectors_bin: bytes | None = None
+    dtype: VectorDType = "float32"
+    dimension: int | None = None
+    top_k: int = 10
+    search_params: dict[str, int] | None = None
+
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+def _vector_body(model: type[ModelT]) -> Callable[[Request], Any]:
+    """Dependency parsing a JSON or MessagePack request body into `model`."""
+
+    async def parse(request: Request) -> ModelT:
+        body = await request.body()
+        try:
+            if not vector_wire.is_msgpack(request.headers.get("content-type")):
+                return model.model_validate_json(body)
+            if vector_wire.msgpack is None:
+                raise HTTPException(status_code=415, detail="MessagePack bodies need the msgpack package")
+            try:
+                data = vector_wire.unpack_msgpack(body)
+            except Exception as e:
+                raise HTTPException(status_code=400, detail=f"Invalid MessagePack body: {str(e)}")
+            return model.model_validate(data)
+        except ValidationError as e:
+            raise RequestValidationError(e.errors())
+
+    return parse
+
+
+def _request_matrix(values: Any, binary: bytes | None, dtype: str, dimension: int | None) -> np.ndarray:
+    """Float lists or packed bytes from a request -> (n, d) float32 array; 400 when malformed."""
+    try:
+        if binary is not None:
+            return decode_matrix(binary, dtype, dimension)
+        if values is None:
+            raise VectorDecodeError("No vectors given")
+        return as_matrix(values)
+    except VectorDecodeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _vector_response(request: Request, payload: dict[str, Any]) -> Any:
+    """MessagePack when the client asks for it (and msgpack is installed), JSON otherwise."""
+    if vector_wire.msgpack is not None and vector_wire.is_msgpack(request.headers.get("accept")):
+        return Response(vector_wire.pack_msgpack(jsonable_encoder(payload)), media_type="application/msgpack")
+    return payload
 
 
 @app.post("/vector/insert")
 def vector_insert(
-    req: VectorInsertRequest,
+    request: Request,
+    req: VectorInsertRequest = Depends(_vector_body(VectorInsertRequest)),
     x_kontrola_secret: str | None = Header(default=None, convert_underscores=False),
-) -> dict[str, Any]:
-    """Insert vectors with metadata into a collection."""
+) -> Any:
+    """Insert vectors with metadata into a collection (JSON or MessagePack body)."""
     _require_shared_secret(x_kontrola_secret)
 
     if not vector_store:
@@ -312,19 +1466,26 @@ def vector_insert(
             detail=f"Vector store backend '{os.getenv('VECTOR_DB_BACKEND', 'lancedb')}' is not configured or unavailable",
         )
 
+    vectors = _request_matrix(req.vectors, req.vectors_bin, req.dtype, req.dimension)
+    if len(vectors) != len(req.metadata):
+        raise HTTPException(status_code=400, detail=f"Got {len(vectors)} vectors but {len(req.metadata)} metadata entries")
+    if req.ids is not None and len(req.ids) != len(vectors):
+        raise HTTPException(status_code=400, detail=f"Got {len(vectors)} vectors but {len(req.ids)} ids")
+
     try:
-        vector_store.insert(req.collection, req.vectors, req.metadata, req.ids)
-        return {"ok": True, "inserted": len(req.vectors)}
+        vector_store.insert(req.collection, vectors, req.metadata, req.ids)
+        return _vector_response(request, {"ok": True, "inserted": len(vectors)})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Vector insert failed: {str(e)}")
 
 
 @app.post("/vector/search")
 def vector_search(
-    req: VectorSearchRequest,
+    request: Request,
+    req: VectorSearchRequest = Depends(_vector_body(VectorSearchRequest)),
     x_kontrola_secret: str | None = Header(default=None, convert_underscores=False),
-) -> dict[str, Any]:
-    """Search for similar vectors in a collection."""
+) -> Any:
+    """Search for similar vectors in a collection (JSON or MessagePack body and response)."""
     _require_shared_secret(x_kontrola_secret)
 
     if not vector_store:
@@ -333,13 +1494,283 @@ def vector_search(
             detail=f"Vector store backend '{os.getenv('VECTOR_DB_BACKEND', 'lancedb')}' is not configured or unavailable",
         )
 
+    query = _request_matrix(req.query_vector, req.query_vector_bin, req.dtype, None)
+    if len(query) != 1:
+        raise HTTPException(status_code=400, detail="Expected exactly one query vector")
+
+    if req.mode == "hybrid":
+        if lexical_index is None:
+            raise HTTPException(status_code=400, detail="Hybrid search needs a lexical index; set LEXICAL_INDEX_FIELDS")
+        if not req.query_text:
+            raise HTTPException(status_code=400, detail="Hybrid search needs query_text")
+        try:
+            start = time.perf_counter()
+            results, latency = hybrid_search(
+                vector_store,
+                lexical_index,
+                req.collection,
+                query[0],
+                req.query_text,
+                req.top_k,
+                text_field=req.text_field,
+                filter_dict=req.filter,
+                search_params=req.search_params,
+                rrf_k=req.rrf_k,
+                candidates=req.candidates,
+            )
+            latency["total_ms"] = round((time.perf_counter() - start) * 1000, 3)
+            return _vector_response(request, {"ok": True, "mode": "hybrid", "results": results, "latency_ms": latency})
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Hybrid search failed: {str(e)}")
+
     try:
-        results = vector_store.search(req.collection, req.query_vector, req.top_k, req.filter)
-        return {"ok": True, "results": results}
+        results = vector_store.search(
+            req.collection, query[0], req.top_k, req.filter, search_params=req.search_params
+        )
+        return _vector_response(request, {"ok": True, "results": results})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Vector search failed: {str(e)}")
 
 
+@app.post("/vector/search/batch")
+def vector_search_batch(
+    request: Request,
+    req: VectorBatchSearchRequest = Depends(_vector_body(VectorBatchSearchRequest)),
+    x_kontrola_secret: str | None = Header(default=None, convert_underscores=False),
+) -> Any:
+    """Search several query vectors in one call; `results[i]` answers `query_vectors[i]`."""
+    _require_shared_secret(x_kontrola_secret)
+
+    if not vector_store:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Vector store backend '{os.getenv('VECTOR_DB_BACKEND', 'lancedb')}' is not configured or unavailable",
+        )
+
+    queries = _request_matrix(req.query_vectors, req.query_vectors_bin, req.dtype, req.dimension)
+    max_queries = int(os.getenv("VECTOR_BATCH_MAX_QUERIES", "256"))
+    if len(queries) > max_queries:
+        raise HTTPException(status_code=400, detail=f"At most {max_queries} query vectors per batch")
+
+    try:
+        results = vector_store.search_batch(
+            req.collection, queries, req.top_k, req.filter, search_params=req.search_params
+        )
+        return _vector_response(request, {"ok": True, "results": results})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Vector batch search failed: {str(e)}")
+
+
+@app.post("/vector/index")
+def vector_index(
+    req: VectorIndexRequest,
+    x_kontrola_secret: str | None = Header(default=None, convert_underscores=False),
+) -> dict[str, Any]:
+    """Build (or rebuild) an ANN index on a collection and optionally set its default search parameters."""
+    _require_shared_secret(x_kontrola_secret)
+
+    if not vector_store:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Vector store backend '{os.getenv('VECTOR_DB_BACKEND', 'lancedb')}' is not configured or unavailable",
+        )
+
+    try:
+        index = vector_store.create_index(req.collection, req.index_type, **req.params)
+        search_params = vector_store.tune(req.collection, **req.search_params) if req.search_params else None
+        return {"ok": True, "index": index, "search_params": search_params}
+    except NotImplementedError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Vector index creation failed: {str(e)}")
+
+
+@app.post("/vector/collection")
+def vector_collection(
+    req: VectorCollectionRequest,
+    x_kontrola_secret: str | None = Header(default=None, convert_underscores=False),
+) -> dict[str, Any]:
+    """Create a collection, optionally quantized (int8, float16 or pq, as the backend supports)."""
+    _require_shared_secret(x_kontrola_secret)
+
+    if not vector_store:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Vector store backend '{os.getenv('VECTOR_DB_BACKEND', 'lancedb')}' is not configured or unavailable",
+        )
+
+    try:
+        vector_store.create_collection(req.collection, req.dimension, quantization=req.quantization)
+        return {"ok": True, "collection": req.collection, "dimension": req.dimension, "quantization": req.quantization}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Vector collection creation failed: {str(e)}")
+
+
+@app.delete("/vector/collection/{name}")
+def vector_collection_drop(
+    name: str,
+    x_kontrola_secret: str | None = Header(default=None, convert_underscores=False),
+) -> dict[str, Any]:
+    """Drop a collection and its ingest manifest, so the next ingest re-indexes every document."""
+    _require_shared_secret(x_kontrola_secret)
+
+    if not vector_store:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Vector store backend '{os.getenv('VECTOR_DB_BACKEND', 'lancedb')}' is not configured or unavailable",
+        )
+
+    try:
+        # Manifest first: if the store drop then fails, the next ingest merely re-embeds.
+        manifest = ingest_manager.manifest if ingest_manager is not None else IngestManifest.from_env()
+        if manifest is not None:
+            manifest.drop(name)
+        vector_store.drop_collection(name)
+        return {"ok": True, "collection": name}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Vector collection drop failed: {str(e)}")
+
+
+@app.post("/vector/collection/report")
+def vector_collection_report(
+    request: Request,
+    req: VectorReportRequest = Depends(_vector_body(VectorReportRequest)),
+    x_kontrola_secret: str | None = Header(default=None, convert_underscores=False),
+) -> Any:
+    """
+    Memory footprint of a collection and, given sample queries, recall@k of
+    its search (index, quantization, rerank) against exact search. Either is
+    null when the backend cannot report it.
+    """
+    _require_shared_secret(x_kontrola_secret)
+
+    if not vector_store:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Vector store backend '{os.getenv('VECTOR_DB_BACKEND', 'lancedb')}' is not configured or unavailable",
+        )
+
+    queries = None
+    if req.query_vectors is not None or req.query_vectors_bin is not None:
+        queries = _request_matrix(req.query_vectors, req.query_vectors_bin, req.dtype, req.dimension)
+        max_queries = int(os.getenv("VECTOR_BATCH_MAX_QUERIES", "256"))
+        if len(queries) > max_queries:
+            raise HTTPException(status_code=400, detail=f"At most {max_queries} query vectors per report")
+
+    try:
+        try:
+            footprint = vector_store.footprint(req.collection)
+        except NotImplementedError:
+            footprint = None
+        recall = None
+        if queries is not None:
+            try:
+                recall = vector_store.recall_at_k(req.collection, queries, req.top_k, req.search_params)
+            except NotImplementedError:
+                pass
+        return _vector_response(request, {"ok": True, "collection": req.collection, "footprint": footprint, "recall": recall})
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=f"Unknown collection: {str(e)}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Vector collection report failed: {str(e)}")
+
+
+class IngestDocument(BaseModel):
+    id: str
+    text: str
+    metadata: dict[str, Any] = {}
+
+
+class VectorIngestRequest(BaseModel):
+    collection: str
+    documents: list[IngestDocument]
+    chunk_size: int = 1000
+    chunk_overlap: int = 100
+    # Skip documents whose content hash and embedding model match the manifest.
+    incremental: bool = True
+    # `documents` is the complete set: delete previously indexed documents not in it.
+    prune: bool = False
+
+
+def _get_ingest_manager() -> IngestManager:
+    global ingest_manager
+    if not vector_store:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Vector store backend '{os.getenv('VECTOR_DB_BACKEND', 'lancedb')}' is not configured or unavailable",
+        )
+    if ingest_manager is None:
+        try:
+            model = _get_embedding_service().model
+        except ValueError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        ingest_manager = IngestManager.from_env(vector_store, _embed_texts, model=model)
+    return ingest_manager
+
+
+@app.post("/vector/ingest", status_code=202)
+async def vector_ingest(
+    req: VectorIngestRequest,
+    x_kontrola_secret: str | None = Header(default=None, convert_underscores=False),
+) -> dict[str, Any]:
+    """
+    Start a background job that chunks, embeds and upserts raw documents,
+    skipping those unchanged since the last run. Chunk ids are
+    "<document id>:<chunk index>"; poll /vector/ingest/{job_id}.
+    """
+    _require_shared_secret(x_kontrola_secret)
+    manager = _get_ingest_manager()
+
+    max_documents = int(os.getenv("INGEST_MAX_DOCUMENTS", "10000"))
+    if len(req.documents) > max_documents:
+        raise HTTPException(status_code=400, detail=f"At most {max_documents} documents per job")
+
+    documents = [Document(d.id, d.text, d.metadata) for d in req.documents]
+    try:
+        job = manager.submit(
+            req.collection, documents, req.chunk_size, req.chunk_overlap, incremental=req.incremental, prune=req.prune
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"ok": True, "job_id": job.id, "status_url": f"/vector/ingest/{job.id}"}
+
+
+@app.get("/vector/ingest")
+def vector_ingest_jobs(
+    x_kontrola_secret: str | None = Header(default=None, convert_underscores=False),
+) -> dict[str, Any]:
+    """Recent ingestion jobs, oldest first."""
+    _require_shared_secret(x_kontrola_secret)
+    return {"ok": True, "jobs": [job.progress() for job in _get_ingest_manager().jobs()]}
+
+
+@app.get("/vector/ingest/{job_id}")
+def vector_ingest_status(
+    job_id: str,
+    x_kontrola_secret: str | None = Header(default=None, convert_underscores=False),
+) -> dict[str, Any]:
+    """Progress and throughput of one ingestion job."""
+    _require_shared_secret(x_kontrola_secret)
+    job = _get_ingest_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown ingestion job")
+    return {"ok": True, **job.progress()}
+
+
 @app.get("/vector/health")
 def vector_health(
     x_kontrola_secret: str | None = Header(default=None, convert_underscores=False),
@@ -369,6 +1800,16 @@ def vector_health(
 # ============================================================================
 
 
+def _read_through_stats() -> dict[str, Any]:
+    return {
+        "trends": trends_cache.stats(),
+        "generate": generate_cache.stats(),
+        "generate_semantic": semantic_generate_cache.stats() if semantic_generate_cache else None,
+        "embed": embed_cache.stats(),
+        "vector_search": vector_store.stats() if isinstance(vector_store, CachedVectorStore) else None,
+    }
+
+
 @app.get("/cache/status")
 def cache_status(
     x_kontrola_secret: str | None = Header(default=None, convert_underscores=False),
@@ -396,12 +1837,14 @@ def cache_status(
             "total_commands_processed": info.get("total_commands_processed", 0),
             "keyspace_hits": info.get("keyspace_hits", 0),
             "keyspace_misses": info.get("keyspace_misses", 0),
+            "read_through": _read_through_stats(),
         }
     except Exception as e:
         return {
             "ok": False,
             "error": f"Redis connection failed: {str(e)}",
             "redis_available": True,
+            "read_through": _read_through_stats(),
         }
 
 
@@ -0,0 +1,502 @@
+"""
+In-process NumPy vector store (VECTOR_DB_BACKEND=numpy).
+
+Exact nearest-neighbour search for small and medium collections without
+running a vector database. Each collection is a directory under
+NUMPY_STORE_PATH:
+- meta.json      dimension, quantization, tune() defaults
+- vectors.f32    append-only float32 rows, memory-mapped for search
+- norms.f32      append-only squared L2 norm per row, memory-mapped
+- records.jsonl  append-only log: {"id", "metadata"} per inserted row,
+                 {"delete": id} per delete
+- codes.*        quantized collections only: codes.i8 + scales.f32 (int8,
+                 one scale per row) or codes.f16 (float16), row-aligned
+                 with vectors.f32
+
+Nothing is rewritten in place: an upsert appends a new row and retires the
+previous one, a delete appends a tombstone. Opening a collection maps the two
+binary files and replays the record log (no vector is read until a search
+touches it); compact() rewrites the collection without retired rows once
+they dominate.
+
+Scores are squared L2 distances, like LanceDB and Milvus. Metadata filters
+are applied before ranking, so top_k counts only matching rows. Pure
+equality filters are answered from per-field postings (value -> rows) that
+are built on the first filter on a field and kept up to date by inserts;
+other expressions are evaluated against each row's metadata.
+
+A quantized collection is searched by scanning its codes (a quarter or half
+the bytes of vectors.f32) for `rerank` x top_k candidates, which are then
+re-scored against the full-precision rows, so only the shortlist's pages of
+vectors.f32 are touched. Scores stay exact unless rerank is 0.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator
+
+import numpy as np
+
+from app.vector_filter import equalities, matches, parse_filter
+from app.vector_store import DEFAULT_RERANK, Matrix, Vector, VectorStore, _quantization
+
+# Upper bound on the (queries x rows) distance block computed at once by search_batch().
+_BATCH_CELLS = 1 << 24
+# Rows of quantized codes decoded to float32 at a time while scanning.
+_ROW_BLOCK = 1 << 14
+
+QUANTIZATIONS = {"int8", "float16"}
+
+
+def _posting_key(value: Any) -> Any:
+    """Hashable key for a metadata value; lists/dicts compare by their JSON form."""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return json.dumps(value, sort_keys=True)
+
+
+def _encode(matrix: np.ndarray, quantization: str | None) -> dict[str, np.ndarray]:
+    """Code files' rows for matrix: int8 with a per-row max-abs scale, or float16."""
+    if quantization == "int8":
+        scales = np.abs(matrix).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.rint(matrix / scales[:, None]).clip(-127, 127).astype(np.int8)
+        return {"codes.i8": codes, "scales.f32": scales.astype(np.float32)}
+    if quantization == "float16":
+        return {"codes.f16": matrix.astype(np.float16)}
+    return {}
+
+
+def _code_dot(q: np.ndarray, codes: np.ndarray, scales: np.ndarray | None) -> np.ndarray:
+    """q . decoded(codes).T, decoding _ROW_BLOCK rows at a time."""
+    out = np.empty((len(q), len(codes)), dtype=np.float32)
+    for start in range(0, len(codes), _ROW_BLOCK):
+        block = np.asarray(codes[start:start + _ROW_BLOCK], dtype=np.float32)
+        out[:, start:start + len(block)] = q @ block.T
+    if scales is not None:
+        out *= scales[None, :]
+    return out
+
+
+class _Collection:
+    """In-memory view of one collection directory. Mutations hold `lock`."""
+
+    def __init__(self, path: Path, dimension: int, quantization: str | None = None):
+        self.path = path
+        self.dimension = dimension
+        self.quantization = quantization
+        self.lock = threading.RLock()
+        self.ids: list[str] = []
+        self.metadata: list[dict[str, Any]] = []
+        self.id_rows: dict[str, int] = {}
+        self._alive = np.zeros(0, dtype=bool)
+        self.postings: dict[str, dict[Any, list[int]]] = {}
+        self._maps: dict[str, np.ndarray] | None = None
+        # Set (under `lock`) once compact() or drop_collection() has replaced this view.
+        self.retired = False
+
+    @property
+    def rows(self) -> int:
+        return len(self.ids)
+
+    @property
+    def alive(self) -> np.ndarray:
+        return self._alive[: self.rows]
+
+    @property
+    def live_count(self) -> int:
+        return len(self.id_rows)
+
+    def files(self) -> list[tuple[str, type, bool]]:
+        """(name, dtype, one vector per row?) for each row-aligned binary file."""
+        files = [("vectors.f32", np.float32, True), ("norms.f32", np.float32, False)]
+        if self.quantization == "int8":
+            files += [("codes.i8", np.int8, True), ("scales.f32", np.float32, False)]
+        elif self.quantization == "float16":
+            files.append(("codes.f16", np.float16, True))
+        return files
+
+    def load(self) -> None:
+        records = self.path / "records.jsonl"
+        if records.exists():
+            with records.open() as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    rec = json.loads(line)
+                    if "delete" in rec:
+                        self.retire(rec["delete"])
+                    else:
+                        self.append(rec["id"], rec["metadata"])
+        # A crash between writing vectors and their records leaves orphan rows at the
+        # end of the binary files; cut them so row numbers stay aligned with the log.
+        for name, dtype, vector in self.files():
+            path = self.path / name
+            size = self.rows * (self.dimension if vector else 1) * np.dtype(dtype).itemsize
+            if path.exists() and path.stat().st_size > size:
+                os.truncate(path, size)
+
+    def append(self, id_: str, meta: dict[str, Any]) -> int:
+        row = self.rows
+        if row >= len(self._alive):
+            grown = np.zeros(max(1024, 2 * len(self._alive)), dtype=bool)
+            grown[: len(self._alive)] = self._alive
+            self._alive = grown
+        self.retire(id_)
+        self.ids.append(id_)
+        self.metadata.append(meta)
+        self.id_rows[id_] = row
+        self._alive[row] = True
+        for field, postings in self.postings.items():
+            if field in meta:
+                postings.setdefault(_posting_key(meta[field]), []).append(row)
+        return row
+
+    def retire(self, id_: str) -> None:
+        row = self.id_rows.pop(id_, None)
+        if row is not None:
+            self._alive[row] = False
+
+    def remapped(self) -> None:
+        """Drop the current maps after an append; the next search maps the grown files."""
+        self._maps = None
+
+    def maps(self) -> tuple[dict[str, np.ndarray], np.ndarray]:
+        """({file name: array}, alive) covering the same rows, safe to use after the lock is released."""
+        with self.lock:
+            n = self.rows
+            if n == 0:
+                empty = {name: np.zeros((0, self.dimension) if vector else 0, dtype=dtype) for name, dtype, vector in self.files()}
+                return empty, self.alive
+            if self._maps is None or len(self._maps["vectors.f32"]) != n:
+                self._maps = {
+                    name: np.memmap(self.path / name, dtype=dtype, mode="r", shape=(n, self.dimension) if vector else (n,))
+                    for name, dtype, vector in self.files()
+                }
+            return self._maps, self.alive.copy()
+
+    def arrays(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(vectors, norms, alive) covering the same rows."""
+        maps, alive = self.maps()
+        return maps["vectors.f32"], maps["norms.f32"], alive
+
+    def candidates(self, filter_dict: dict[str, Any] | None) -> np.ndarray | None:
+        """Rows matching filter_dict (sorted), or None for no filter."""
+        expr = parse_filter(filter_dict)
+        if expr is None:
+            return None
+        equal = equalities(expr)
+        with self.lock:
+            if equal is None:
+                return np.asarray([row for row, meta in enumerate(self.metadata) if matches(expr, meta)], dtype=np.int64)
+            rows: np.ndarray | None = None
+            for field, value in equal.items():
+                if field not in self.postings:
+                    postings: dict[Any, list[int]] = {}
+                    for row, meta in enumerate(self.metadata):
+                        if field in meta:
+                            postings.setdefault(_posting_key(meta[field]), []).append(row)
+                    self.postings[field] = postings
+                matched = np.asarray(self.postings[field].get(_posting_key(value), []), dtype=np.int64)
+                rows = matched if rows is None else np.intersect1d(rows, matched, assume_unique=True)
+                if rows.size == 0:
+                    break
+            return rows
+
+
+def _top_k(dist: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k smallest distances along the last axis, ascending."""
+    if k <= 0:
+        return np.zeros(dist.shape[:-1] + (0,), dtype=np.int64)
+    if k < dist.shape[-1]:
+        part = np.argpartition(dist, k - 1, axis=-1)[..., :k]
+    else:
+        part = np.broadcast_to(np.arange(dist.shape[-1]), dist.shape).copy()
+    order = np.take_along_axis(dist, part, axis=-1).argsort(axis=-1, kind="stable")
+    return np.take_along_axis(part, order, axis=-1)
+
+
+class NumpyVectorStore(VectorStore):
+    """Exact search over memory-mapped float32 matrices, one per collection."""
+
+    def __init__(self, root: str | os.PathLike[str] | None = None):
+        super().__init__()
+        self.root = Path(root or os.getenv("NUMPY_STORE_PATH", "/app/data/numpy"))
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._collections: dict[str, _Collection] = {}
+
+    def _dir(self, name: str) -> Path:
+        if not name or "/" in name or name.startswith("."):
+            raise ValueError(f"Invalid collection name: {name!r}")
+        return self.root / name
+
+    def _open(self, name: str, dimension: int | None = None, quantization: str | None = None) -> _Collection:
+        """Open (loading from disk once) or, when dimension is given, create a collection."""
+        with self._lock:
+            col = self._collections.get(name)
+            if col is not None:
+                return col
+            path = self._dir(name)
+            self._recover_compaction(name, path)
+            meta_path = path / "meta.json"
+            if meta_path.exists():
+                meta = json.loads(meta_path.read_text())
+                col = _Collection(path, int(meta["dimension"]), meta.get("quantization"))
+                col.load()
+            elif dimension is not None:
+                path.mkdir(parents=True, exist_ok=True)
+                meta_path.write_text(json.dumps({"dimension": dimension, "quantization": quantization}))
+                col = _Collection(path, dimension, quantization)
+            else:
+                raise KeyError(f"Collection {name!r} does not exist")
+            self._collections[name] = col
+            return col
+
+    def _recover_compaction(self, name: str, path: Path) -> None:
+        tmp, old = self.root / f".{name}.compact", self.root / f".{name}.old"
+        if not path.exists():
+            if (tmp / "meta.json").exists():
+                os.replace(tmp, path)
+            elif old.exists():
+                os.replace(old, path)
+        shutil.rmtree(tmp, ignore_errors=True)
+        shutil.rmtree(old, ignore_errors=True)
+
+    @contextmanager
+    def _locked(self, name: str, dimension: int | None = None) -> Iterator[_Collection]:
+        """
+        The collection with its lock held, for writers. A writer that opened the
+        collection just before compact() or drop_collection() replaced it would
+        otherwise record rows only in the discarded view; retry on the current one.
+        """
+        while True:
+            col = self._open(name, dimension)
+            with col.lock:
+                if not col.retired:
+                    yield col
+                    return
+
+    def _load_settings(self, collection: str) -> dict[str, Any]:
+        meta_path = self._dir(collection) / "meta.json"
+        if not meta_path.exists():
+            return {}
+        meta = json.loads(meta_path.read_text())
+        return {"tuning": meta["tuning"]} if "tuning" in meta else {}
+
+    def _save_settings(self, collection: str, settings: dict[str, Any]) -> None:
+        # Quantization is fixed at creation and kept in meta.json already; only tuning changes.
+        with self._locked(collection) as col:
+            meta_path = col.path / "meta.json"
+            meta = {**json.loads(meta_path.read_text()), "tuning": settings.get("tuning", {})}
+            tmp = col.path / "meta.json.tmp"
+            tmp.write_text(json.dumps(meta))
+            os.replace(tmp, meta_path)
+
+    def create_collection(self, name: str, dimension: int, **kwargs) -> None:
+        quantization = _quantization(kwargs.get("quantization"), QUANTIZATIONS)
+        col = self._open(name, dimension, quantization)
+        if quantization is not None and col.quantization != quantization:
+            raise ValueError(f"Collection {name!r} already exists with quantization {col.quantization}")
+
+    def insert(self, collection: str, vectors: Matrix, metadata: list[dict[str, Any]], ids: list[str] | None = None) -> None:
+        matrix = np.ascontiguousarray(vectors, dtype=np.float32)
+        if matrix.ndim != 2 or len(matrix) == 0:
+            return
+        if not ids:
+            ids = [str(i) for i in range(len(matrix))]
+        # Rows and records are matched by position: a short list would misalign every later row.
+        if len(ids) != len(matrix) or len(metadata) != len(matrix):
+            raise ValueError(f"Got {len(matrix)} vectors, {len(metadata)} metadata entries and {len(ids)} ids")
+        norms = np.einsum("ij,ij->i", matrix, matrix).astype(np.float32)
+
+        with self._locked(collection, matrix.shape[1]) as col:
+            if matrix.shape[1] != col.dimension:
+                raise ValueError(f"Collection {collection!r} has dimension {col.dimension}, got {matrix.shape[1]}")
+            # Vectors first, records last: the record log is what makes rows visible on reload.
+            with open(col.path / "vectors.f32", "ab") as f:
+                f.write(matrix.tobytes())
+            with open(col.path / "norms.f32", "ab") as f:
+                f.write(norms.tobytes())
+            for name, codes in _encode(matrix, col.quantization).items():
+                with open(col.path / name, "ab") as f:
+                    f.write(codes.tobytes())
+            with open(col.path / "records.jsonl", "a") as f:
+                f.write("".join(json.dumps({"id": id_, "metadata": meta}) + "\n" for id_, meta in zip(ids, metadata)))
+            for id_, meta in zip(ids, metadata):
+                col.append(id_, meta)
+            col.remapped()
+
+    def search(self, collection: str, query_vector: Vector, top_k: int = 10, filter_dict: dict[str, Any] | None = None, search_params: dict[str, Any] | None = None) -> list[dict[str, Any]]:
+        return self.search_batch(collection, [query_vector], top_k, filter_dict, search_params)[0]
+
+    def search_batch(self, collection: str, query_vectors: Matrix, top_k: int = 10, filter_dict: dict[str, Any] | None = None, search_params: dict[str, Any] | None = None) -> list[list[dict[str, Any]]]:
+        col = self._open(collection)
+        rerank = self._search_params(collection, search_params).get("rerank", DEFAULT_RERANK)
+        if rerank < 0:
+            raise ValueError(f"rerank must be >= 0, got {rerank}")
+        return self._search(col, query_vectors, top_k, filter_dict, rerank if col.quantization else None)
+
+    def exact_search_batch(self, collection: str, query_vectors: Matrix, top_k: int = 10) -> list[list[dict[str, Any]]]:
+        return self._search(self._open(collection), query_vectors, top_k, None, None)
+
+    def _search(self, col: _Collection, query_vectors: Matrix, top_k: int, filter_dict: dict[str, Any] | None, rerank: int | None) -> list[list[dict[str, Any]]]:
+        """Scan vectors.f32 (rerank None) or the codes, re-ranking rerank x top_k candidates."""
+        queries = np.asarray(query_vectors, dtype=np.float32).reshape(len(query_vectors), -1)
+        if queries.shape[1] != col.dimension:
+            raise ValueError(f"Collection {col.path.name!r} has dimension {col.dimension}, got {queries.shape[1]}")
+
+        maps, alive = col.maps()
+        vectors, norms = maps["vectors.f32"], maps["norms.f32"]
+        rows = col.candidates(filter_dict)
+        if rows is None:
+            rows = np.flatnonzero(alive)
+            if len(rows) == len(alive):
+                rows = None  # Every row is live: scan the mapped matrix without gathering.
+        else:
+            rows = rows[rows < len(alive)]
+            rows = rows[alive[rows]]
+
+        if rerank is None:
+            scanned, scales = vectors, None
+        else:
+            scanned = maps["codes.i8"] if col.quantization == "int8" else maps["codes.f16"]
+            scales = maps.get("scales.f32")
+        if rows is not None:
+            scanned = scanned[rows]
+            scales = None if scales is None else scales[rows]
+        subset_norms = norms if rows is None else norms[rows]
+        n = len(subset_norms)
+        k = min(top_k, n)
+        shortlist = k if not rerank else min(n, k * rerank)
+        query_norms = np.einsum("ij,ij->i", queries, queries)
+
+        results: list[list[dict[str, Any]]] = []
+        chunk = max(1, _BATCH_CELLS // max(1, n))
+        for start in range(0, len(queries), chunk):
+            q = queries[start:start + chunk]
+            # ||x - q||^2 = ||x||^2 - 2 x.q + ||q||^2, one matrix product for the whole chunk.
+            dot = q @ scanned.T if rerank is None else _code_dot(q, scanned, scales)
+            dist = subset_norms[None, :] - 2.0 * dot + query_norms[start:start + chunk, None]
+            np.maximum(dist, 0.0, out=dist)
+            best = _top_k(dist, shortlist)
+            scores = np.take_along_axis(dist, best, axis=-1)
+            if rerank:
+                best, scores = self._rerank(q, best, vectors, rows, k)
+            for qi in range(len(q)):
+                hits = []
+                for j, score in zip(best[qi], scores[qi]):
+                    row = int(j) if rows is None else int(rows[j])
+                    hits.append({"id": col.ids[row], "score": float(score), "metadata": col.metadata[row]})
+                results.append(hits)
+        return results
+
+    @staticmethod
+    def _rerank(q: np.ndarray, shortlist: np.ndarray, vectors: np.ndarray, rows: np.ndarray | None, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """Exact distances for each query's shortlist; the k best (positions, scores) per query."""
+        best = np.empty((len(q), k), dtype=np.int64)
+        scores = np.empty((len(q), k), dtype=np.float32)
+        for qi, candidates in enumerate(shortlist):
+            diff = vectors[candidates if rows is None else rows[candidates]] - q[qi]
+            exact = np.einsum("ij,ij->i", diff, diff)
+            order = _top_k(exact, k)
+            best[qi], scores[qi] = candidates[order], exact[order]
+        return best, scores
+
+    def delete(self, collection: str, ids: list[str]) -> None:
+        with self._locked(collection) as col:
+            with open(col.path / "records.jsonl", "a") as f:
+                f.write("".join(json.dumps({"delete": id_}) + "\n" for id_ in ids))
+            for id_ in ids:
+                col.retire(id_)
+            retired = col.rows - col.live_count
+            if retired > max(1024, col.rows // 2):
+                self.compact(collection)
+
+    def compact(self, collection: str) -> None:
+        """
+        Rewrite a collection without retired rows. The new files are built in a
+        side directory and swapped in with renames; _open() finishes or rolls
+        back a swap interrupted by a crash.
+        """
+        path = self._dir(collection)
+        tmp, old = self.root / f".{collection}.compact", self.root / f".{collection}.old"
+        with self._locked(collection) as col:
+            vectors, norms, alive = col.arrays()
+            keep = np.flatnonzero(alive)
+            shutil.rmtree(tmp, ignore_errors=True)
+            tmp.mkdir()
+            np.ascontiguousarray(vectors[keep]).tofile(tmp / "vectors.f32")
+            np.ascontiguousarray(norms[keep]).tofile(tmp / "norms.f32")
+            for name, codes in _encode(np.asarray(vectors[keep]), col.quantization).items():
+                codes.tofile(tmp / name)
+            with open(tmp / "records.jsonl", "w") as f:
+                f.write("".join(json.dumps({"id": col.ids[r], "metadata": col.metadata[r]}) + "\n" for r in keep))
+            # meta.json last: its presence marks the side directory as complete.
+            shutil.copyfile(col.path / "meta.json", tmp / "meta.json")
+
+            with self._lock:
+                os.replace(path, old)
+                os.replace(tmp, path)
+                fresh = _Collection(path, col.dimension, col.quantization)
+                fresh.load()
+                self._collections[collection] = fresh
+            col.retired = True
+            # Searches still holding the old maps keep reading the unlinked files.
+            shutil.rmtree(old, ignore_errors=True)
+
+    def drop_collection(self, name: str) -> None:
+        with self._lock:
+            col = self._collections.pop(name, None)
+        self._settings.pop(name, None)
+        if col is not None:
+            with col.lock:
+                col.retired = True
+        shutil.rmtree(self._dir(name), ignore_errors=True)
+
+    def footprint(self, collection: str) -> dict[str, Any]:
+        """
+        File sizes of a collection. scan_bytes is what a search reads in full
+        (vectors.f32 for exact collections, the codes for quantized ones) and
+        so what has to stay in the page cache for searches to be fast.
+        """
+        col = self._open(collection)
+        files = {}
+        for name, _, _ in col.files():
+            path = col.path / name
+            files[name] = path.stat().st_size if path.exists() else 0
+        full = files["vectors.f32"] + files["norms.f32"]
+        scan = full if col.quantization is None else sum(size for name, size in files.items() if name != "vectors.f32")
+        return {
+            "backend": "numpy",
+            "collection": collection,
+            "quantization": col.quantization,
+            "dimension": col.dimension,
+            "rows": col.live_count,
+            "retired": col.rows - col.live_count,
+            "files": files,
+            "total_bytes": sum(files.values()),
+            "scan_bytes": scan,
+            "compression": round(full / scan, 2) if scan else None,
+        }
+
+    def health_check(self) -> dict[str, Any]:
+        names = sorted(p.name for p in self.root.iterdir() if (p / "meta.json").exists())
+        with self._lock:
+            loaded = dict(self._collections)
+        return {
+            "ok": True,
+            "backend": "numpy",
+            "path": str(self.root),
+            "collections": names,
+            "loaded": {
+                name: {"dimension": col.dimension, "quantization": col.quantization, "rows": col.live_count, "retired": col.rows - col.live_count}
+                for name, col in loaded.items()
+            },
+        }
@@ -0,0 +1,238 @@
+"""
+File-based TrendRadar backend: TrendRadar's per-day SQLite output.
+
+Supported layouts under TRENDRADAR_OUTPUT_DIR:
+- output/<kind>/YYYY-MM-DD.db   (current)
+- output/YYYY-MM-DD/<kind>.db   (legacy; the current layout wins on conflicts)
+
+Hot-path costs are kept off the request:
+- DayFileIndex re-lists a directory only when its mtime changes
+- SQLiteConnectionCache keeps one read-only connection per day file, opened
+  with immutable=1 once the file has stopped changing (no locking, no
+  change checks), and reopened if the file's mtime moves
+- Table/column detection is memoized with the connection, i.e. per file
+  and mtime
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterator
+
+_DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+# Files untouched for this long are treated as finished days and opened immutable.
+IMMUTABLE_AFTER_SECONDS = 3600
+
+
+class TrendRadarSchemaError(LookupError):
+    """The SQLite file does not contain the expected TrendRadar tables."""
+
+
+def _mtime_ns(path: Path) -> int:
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return -1
+
+
+class DayFileIndex:
+    """Date -> SQLite file map for one kind, refreshed incrementally via directory mtimes."""
+
+    def __init__(self, root: Path, kind: str):
+        self.root = root
+        self.kind = kind
+        self._lock = threading.Lock()
+        self._flat: dict[str, Path] = {}
+        self._legacy: dict[str, Path] = {}
+        self._flat_mtime: int | None = None
+        self._root_mtime: int | None = None
+        # Legacy day directories without a <kind>.db yet; TrendRadar may still create it.
+        self._pending: dict[Path, int] = {}
+
+    def files(self) -> list[tuple[str, Path]]:
+        with self._lock:
+            self._refresh()
+            merged = {**self._legacy, **self._flat}
+        return sorted(merged.items())
+
+    def _refresh(self) -> None:
+        flat_dir = self.root / self.kind
+        flat_mtime = _mtime_ns(flat_dir)
+        if flat_mtime != self._flat_mtime:
+            self._flat = self._scan_flat(flat_dir) if flat_mtime >= 0 else {}
+            self._flat_mtime = flat_mtime
+
+        root_mtime = _mtime_ns(self.root)
+        pending_changed = any(_mtime_ns(d) != m for d, m in self._pending.items())
+        if root_mtime != self._root_mtime or pending_changed:
+            self._legacy, self._pending = self._scan_legacy() if root_mtime >= 0 else ({}, {})
+            self._root_mtime = root_mtime
+
+    def _scan_flat(self, flat_dir: Path) -> dict[str, Path]:
+        found: dict[str, Path] = {}
+        with os.scandir(flat_dir) as entries:
+            for entry in entries:
+                stem, ext = os.path.splitext(entry.name)
+                if ext == ".db" and _DATE_RE.match(stem) and entry.is_file():
+                    found[stem] = Path(entry.path)
+        return found
+
+    def _scan_legacy(self) -> tuple[dict[str, Path], dict[Path, int]]:
+        found: dict[str, Path] = {}
+        pending: dict[Path, int] = {}
+        with os.scandir(self.root) as entries:
+            for entry in entries:
+                if not (_DATE_RE.match(entry.name) and entry.is_dir()):
+                    continue
+                day_dir = Path(entry.path)
+                db_path = day_dir / f"{self.kind}.db"
+                if db_path.is_file():
+                    found[entry.name] = db_path
+                else:
+                    pending[day_dir] = _mtime_ns(day_dir)
+        return found, pending
+
+
+@dataclass
+class _DayConnection:
+    conn: sqlite3.Connection
+    mtime_ns: int
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    schema: dict[str, list[str]] | None = None
+    # Token of the job currently holding `lock`; changed and checked under `owner_lock`.
+    owner: object | None = None
+    owner_lock: threading.Lock = field(default_factory=threading.Lock)
+    # Set under `lock` when the entry is evicted and its connection closed.
+    closed: bool = False
+
+
+class SQLiteConnectionCache:
+    """Bounded LRU of read-only connections, one per day file."""
+
+    def __init__(self, max_open: int = 32):
+        self.max_open = max_open
+        self._lock = threading.Lock()
+        self._open: OrderedDict[Path, _DayConnection] = OrderedDict()
+
+    @contextmanager
+    def connect(self, path: Path, owner: object | None = None) -> Iterator[tuple[sqlite3.Connection, dict[str, list[str]]]]:
+        """
+        Yield (connection, schema) for path; schema maps table -> column names.
+        owner identifies the job to interrupt() while it holds the connection.
+        """
+        while True:
+            entry = self._entry(path)
+            with entry.lock:
+                # Evicted between _entry() and taking the lock: open the file again.
+                if entry.closed:
+                    continue
+                with entry.owner_lock:
+                    entry.owner = owner
+                try:
+                    if entry.schema is None:
+                        entry.schema = _read_schema(entry.conn)
+                    yield entry.conn, entry.schema
+                finally:
+                    with entry.owner_lock:
+                        entry.owner = None
+                return
+
+    def interrupt(self, path: Path, owner: object) -> None:
+        """
+        Abort owner's query against path (sqlite3 supports this cross-thread).
+        The connection is shared per file, so nothing happens unless owner is
+        the job using it: a job still waiting for the connection must not stop
+        another request's query.
+        """
+        with self._lock:
+            entry = self._open.get(path)
+        if entry is None or owner is None:
+            return
+        with entry.owner_lock:
+            if entry.owner is owner:
+                entry.conn.interrupt()
+
+    def close(self) -> None:
+        with self._lock:
+            entries = list(self._open.values())
+            self._open.clear()
+        for entry in entries:
+            with entry.lock:
+                entry.closed = True
+                entry.conn.close()
+
+    def _entry(self, path: Path) -> _DayConnection:
+        stat = path.stat()
+        evicted: list[_DayConnection] = []
+        with self._lock:
+            entry = self._open.get(path)
+            if entry and entry.mtime_ns == stat.st_mtime_ns:
+                self._open.move_to_end(path)
+                return entry
+            if entry:
+                evicted.append(self._open.pop(path))
+
+            immutable = time.time() - stat.st_mtime > IMMUTABLE_AFTER_SECONDS
+            uri = f"{path.resolve().as_uri()}?mode=ro" + ("&immutable=1" if immutable else "")
+            conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            entry = _DayConnection(conn=conn, mtime_ns=stat.st_mtime_ns)
+            self._open[path] = entry
+            while len(self._open) > self.max_open:
+                evicted.append(self._open.popitem(last=False)[1])
+
+        for old in evicted:
+            # Wait for any in-flight query on the old handle before closing it.
+            with old.lock:
+                old.closed = True
+                old.conn.close()
+        return entry
+
+
+def _read_schema(conn: sqlite3.Connection) -> dict[str, list[str]]:
+    tables = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+    return {t: [row[1] for row in conn.execute(f'PRAGMA table_info("{t}")')] for t in tables}
+
+
+def query_latest_items(
+    cache: SQLiteConnectionCache,
+    path: Path,
+    kind: str,
+    limit: int,
+    columns: tuple[str, ...],
+    owner: object | None = None,
+) -> list[dict[str, Any]]:
+    """
+    Return up to `limit` rows of <kind>_items ordered by rank, restricted to
+    `columns` that exist, with platform_name joined from `platforms` when
+    the file has one.
+    """
+    table = f"{kind}_items"
+    with cache.connect(path, owner) as (conn, schema):
+        if table not in schema:
+            raise TrendRadarSchemaError(f"{path} has no {table} table")
+
+        available = schema[table]
+        select = [f'i."{c}"' for c in columns if c in available and c != "platform_name"]
+        join = ""
+        platform_cols = schema.get("platforms", [])
+        if "platform_id" in available and {"id", "name"} <= set(platform_cols):
+            select.append('p."name" AS platform_name')
+            join = ' LEFT JOIN platforms p ON p."id" = i."platform_id"'
+        elif "platform_name" in available:
+            select.append('i."platform_name"')
+
+        # NULL ranks last, like the MySQL per-day query and the cross-day merge.
+        order = ['i."rank" IS NULL', 'i."rank" ASC'] if "rank" in available else []
+        order.append("i.rowid ASC")
+        sql = f'SELECT {", ".join(select) or "i.*"} FROM "{table}" i{join} ORDER BY {", ".join(order)} LIMIT ?'
+        return [dict(row) for row in conn.execute(sql, (limit,))]
@@ -0,0 +1,298 @@
+"""
+Search result cache in front of a VectorStore (VECTOR_SEARCH_CACHE).
+
+CachedVectorStore wraps the configured backend and answers repeated searches
+from a cache keyed on (collection, collection version, top_k, filter,
+search params, query vector). The query vector is quantized to float16
+before hashing, so float noise from re-embedding the same text does not
+defeat the cache.
+
+Every write that goes through the VectorStore interface (insert, delete,
+create/drop collection, create_index, tune) bumps the collection's version
+counter. The version is part of the key, so earlier entries are never served
+again and simply age out. With Redis the counter lives in Redis and is shared
+by every agent worker. With the in-process cache and no Redis, a worker only
+sees its own writes, so the TTL bounds staleness.
+
+Modes:
+- memory: bounded in-process LRU (VECTOR_SEARCH_CACHE_SIZE entries)
+- redis:  JSON results in Redis, shared across workers
+Both expire entries after VECTOR_SEARCH_CACHE_TTL seconds. If Redis is
+unreachable, searches go straight to the backend for a short back-off period.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+import numpy as np
+
+from app.vector_filter import parse_filter, to_mongo
+from app.vector_store import Matrix, Vector, VectorStore
+
+CACHE_MODES = {"off", "memory", "redis"}
+
+
+class _LRU:
+    """Thread-safe bounded LRU with per-entry expiry."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: Any, ttl: int) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+class CachedVectorStore(VectorStore):
+    """VectorStore decorator caching search results per collection version."""
+
+    def __init__(
+        self,
+        inner: VectorStore,
+        mode: str = "memory",
+        redis_client: Any = None,
+        *,
+        ttl: int = 300,
+        max_size: int = 4096,
+        namespace: str = "kontrola:vsearch",
+        retry_after: float = 30.0,
+    ):
+        if mode not in CACHE_MODES - {"off"}:
+            raise ValueError(f"Unknown search cache mode {mode!r}; supported: memory, redis")
+        if mode == "redis" and redis_client is None:
+            raise ValueError("Search cache mode 'redis' needs a Redis client")
+        super().__init__()
+        self.inner = inner
+        self.mode = mode
+        self.redis = redis_client
+        self.ttl = ttl
+        self.namespace = namespace
+        self.retry_after = retry_after
+        self._lru = _LRU(max_size)
+        self._lock = threading.Lock()
+        self._versions: dict[str, int] = {}
+        self._disabled_until = 0.0
+        self._counters = {"hits": 0, "misses": 0, "invalidations": 0, "errors": 0}
+
+    @classmethod
+    def from_env(cls, inner: VectorStore, redis_client: Any = None) -> VectorStore:
+        """Wrap inner as configured by VECTOR_SEARCH_CACHE; returns inner unchanged when off."""
+        mode = os.getenv("VECTOR_SEARCH_CACHE", "off").lower()
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown VECTOR_SEARCH_CACHE {mode!r}; supported: {sorted(CACHE_MODES)}")
+        if mode == "off" or (mode == "redis" and redis_client is None):
+            return inner
+        return cls(
+            inner,
+            mode,
+            redis_client,
+            ttl=int(os.getenv("VECTOR_SEARCH_CACHE_TTL", "300")),
+            max_size=int(os.getenv("VECTOR_SEARCH_CACHE_SIZE", "4096")),
+        )
+
+    # -- writes: delegate, then bump the collection version ------------------
+
+    def create_collection(self, name: str, dimension: int, **kwargs) -> None:
+        self.inner.create_collection(name, dimension, **kwargs)
+        self.invalidate(name)
+
+    def insert(self, collection: str, vectors: Matrix, metadata: list[dict[str, Any]], ids: list[str] | None = None) -> None:
+        try:
+            self.inner.insert(collection, vectors, metadata, ids)
+        finally:
+            # Also after a failure: part of the batch may have been written.
+            self.invalidate(collection)
+
+    def delete(self, collection: str, ids: list[str]) -> None:
+        try:
+            self.inner.delete(collection, ids)
+        finally:
+            self.invalidate(collection)
+
+    def drop_collection(self, name: str) -> None:
+        try:
+            self.inner.drop_collection(name)
+        finally:
+            self.invalidate(name)
+
+    def create_index(self, collection: str, index_type: str = "hnsw", **params: Any) -> dict[str, Any]:
+        try:
+            return self.inner.create_index(collection, index_type, **params)
+        finally:
+            self.invalidate(collection)
+
+    def tune(self, collection: str, **params: Any) -> dict[str, Any]:
+        effective = self.inner.tune(collection, **params)
+        self.invalidate(collection)
+        return effective
+
+    def invalidate(self, collection: str) -> None:
+        """Bump the collection's version so no earlier cached result is served again."""
+        self._count("invalidations")
+        if self.mode == "memory":
+            with self._lock:
+                self._versions[collection] = self._versions.get(collection, 0) + 1
+            return
+        try:
+            self.redis.incr(self._version_key(collection))
+        except Exception:
+            self._redis_failed()
+
+    # -- reads ---------------------------------------------------------------
+
+    def search(self, collection: str, query_vector: Vector, top_k: int = 10, filter_dict: dict[str, Any] | None = None, search_params: dict[str, Any] | None = None) -> list[dict[str, Any]]:
+        return self.search_batch(collection, [query_vector], top_k, filter_dict, search_params)[0]
+
+    def search_batch(self, collection: str, query_vectors: Matrix, top_k: int = 10, filter_dict: dict[str, Any] | None = None, search_params: dict[str, Any] | None = None) -> list[list[dict[str, Any]]]:
+        version = self._version(collection)
+        if version is None or not len(query_vectors):
+            return self.inner.search_batch(collection, query_vectors, top_k, filter_dict, search_params)
+
+        # Canonical forms, so equivalent filters and parameter orders share entries.
+        scope = json.dumps(
+            [collection, version, top_k, to_mongo(parse_filter(filter_dict)), search_params or {}],
+            sort_keys=True,
+            default=str,
+        )
+        queries = np.asarray(query_vectors, dtype=np.float32).reshape(len(query_vectors), -1)
+        keys = [self._result_key(scope, q) for q in queries]
+        results: list[list[dict[str, Any]] | None] = [self._get(k) for k in keys]
+
+        missing = [i for i, r in enumerate(results) if r is None]
+        self._count("hits", len(keys) - len(missing))
+        self._count("misses", len(missing))
+        if missing:
+            if len(missing) == 1:
+                fresh = [self.inner.search(collection, queries[missing[0]], top_k, filter_dict, search_params)]
+            else:
+                fresh = self.inner.search_batch(collection, queries[missing], top_k, filter_dict, search_params)
+            for i, hits in zip(missing, fresh):
+                results[i] = hits
+                self._set(keys[i], hits)
+        # Copy the outer lists: cached entries are shared between callers.
+        return [list(r) for r in results]
+
+    # -- passthrough ---------------------------------------------------------
+
+    def health_check(self) -> dict[str, Any]:
+        return {**self.inner.health_check(), "search_cache": self.stats()}
+
+    def close(self) -> None:
+        self.inner.close()
+
+    def score_to_similarity(self, score: float) -> float:
+        return self.inner.score_to_similarity(score)
+
+    def footprint(self, collection: str) -> dict[str, Any]:
+        return self.inner.footprint(collection)
+
+    def exact_search_batch(self, collection: str, query_vectors: Matrix, top_k: int = 10) -> list[list[dict[str, Any]]]:
+        return self.inner.exact_search_batch(collection, query_vectors, top_k)
+
+    def recall_at_k(self, collection: str, query_vectors: Matrix, top_k: int = 10, search_params: dict[str, Any] | None = None) -> dict[str, Any]:
+        # Measured on the backend: cached results would only report the recall of earlier searches.
+        return self.inner.recall_at_k(collection, query_vectors, top_k, search_params)
+
+    def __getattr__(self, name: str) -> Any:
+        # Backend-specific extras (e.g. NumpyVectorStore.compact) stay reachable.
+        if name == "inner":
+            raise AttributeError(name)
+        return getattr(self.inner, name)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+        lookups = counters["hits"] + counters["misses"]
+        return {
+            "mode": self.mode,
+            "ttl": self.ttl,
+            **counters,
+            "hit_rate": round(counters["hits"] / lookups, 4) if lookups else 0.0,
+            "size": len(self._lru) if self.mode == "memory" else None,
+            "redis_enabled": self._redis_usable(),
+        }
+
+    # -- internals -----------------------------------------------------------
+
+    def _version_key(self, collection: str) -> str:
+        return f"{self.namespace}:version:{collection}"
+
+    def _result_key(self, scope: str, query: np.ndarray) -> str:
+        digest = hashlib.sha256(scope.encode())
+        digest.update(query.astype("<f2").tobytes())
+        return f"{self.namespace}:result:{digest.hexdigest()}"
+
+    def _version(self, collection: str) -> str | None:
+        """Current version token, or None when the shared counter cannot be read (bypass)."""
+        if self.mode == "memory":
+            with self._lock:
+                return str(self._versions.get(collection, 0))
+        if not self._redis_usable():
+            return None
+        try:
+            return str(self.redis.get(self._version_key(collection)) or 0)
+        except Exception:
+            self._redis_failed()
+            return None
+
+    def _get(self, key: str) -> list[dict[str, Any]] | None:
+        if self.mode == "memory":
+            return self._lru.get(key)
+        if not self._redis_usable():
+            return None
+        try:
+            raw = self.redis.get(key)
+        except Exception:
+            self._redis_failed()
+            return None
+        return json.loads(raw) if raw is not None else None
+
+    def _set(self, key: str, hits: list[dict[str, Any]]) -> None:
+        if self.mode == "memory":
+            self._lru.set(key, hits, self.ttl)
+            return
+        if not self._redis_usable():
+            return
+        try:
+            self.redis.set(key, json.dumps(hits, default=float), ex=self.ttl)
+        except Exception:
+            self._redis_failed()
+
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += n
+
+    def _redis_usable(self) -> bool:
+        return self.redis is not None and time.monotonic() >= self._disabled_until
+
+    def _redis_failed(self) -> None:
+        with self._lock:
+            self._counters["errors"] += 1
+            self._disabled_until = time.monotonic() + self.retry_after
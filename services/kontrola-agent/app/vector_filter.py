@@ -0,0 +1,220 @@
+"""
+Metadata filter expressions for vector search, compiled per backend.
+
+Filters use the Mongo-style syntax Chroma and Pinecone already accept, so
+existing `{"field": value}` equality filters keep working:
+
+    {"lang": "en"}                                   equality
+    {"year": {"$gte": 2020, "$lt": 2024}}            $eq $ne $gt $gte $lt $lte
+    {"tag": {"$in": ["a", "b"]}}                     $in $nin
+    {"$or": [{"lang": "en"}, {"lang": "de"}]}        $and $or
+
+parse_filter() validates a filter into a small expression tree, and the
+to_* functions render it in each backend's native form so the backend
+applies it before ranking (top_k counts only matching rows) instead of the
+caller discarding results afterwards.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import dataclass
+from typing import Any, Union
+
+COMPARISONS = {"$eq", "$ne", "$gt", "$gte", "$lt", "$lte", "$in", "$nin"}
+
+_IDENTIFIER_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+@dataclass(frozen=True)
+class Condition:
+    field: str
+    op: str
+    value: Any
+
+
+@dataclass(frozen=True)
+class And:
+    children: tuple["Expr", ...]
+
+
+@dataclass(frozen=True)
+class Or:
+    children: tuple["Expr", ...]
+
+
+Expr = Union[Condition, And, Or]
+
+
+def parse_filter(filter_dict: dict[str, Any] | None) -> Expr | None:
+    """Validate a filter dict; ValueError on unknown operators or malformed operands."""
+    if not filter_dict:
+        return None
+    if not isinstance(filter_dict, dict):
+        raise ValueError("Filter must be an object")
+
+    parts: list[Expr] = []
+    for key, value in filter_dict.items():
+        if key in ("$and", "$or"):
+            if not isinstance(value, list) or not value:
+                raise ValueError(f"{key} takes a non-empty list of filters")
+            children = tuple(c for c in (parse_filter(v) for v in value) if c is not None)
+            if children:
+                parts.append(And(children) if key == "$and" else Or(children))
+        elif key.startswith("$"):
+            raise ValueError(f"Unknown filter operator {key}")
+        elif isinstance(value, dict):
+            if not value:
+                raise ValueError(f"Empty condition for field {key!r}")
+            for op, operand in value.items():
+                if op not in COMPARISONS:
+                    raise ValueError(f"Unknown filter operator {op} for field {key!r}")
+                if op in ("$in", "$nin") and not isinstance(operand, list):
+                    raise ValueError(f"{op} for field {key!r} takes a list")
+                if op in ("$gt", "$gte", "$lt", "$lte") and (isinstance(operand, bool) or not isinstance(operand, (int, float, str))):
+                    raise ValueError(f"{op} for field {key!r} takes a number or a string")
+                parts.append(Condition(key, op, operand))
+        else:
+            parts.append(Condition(key, "$eq", value))
+    if not parts:
+        return None
+    return parts[0] if len(parts) == 1 else And(tuple(parts))
+
+
+def equalities(expr: Expr | None) -> dict[str, Any] | None:
+    """{field: value} when expr is only ANDed equalities (an index fast path), else None."""
+    if expr is None:
+        return {}
+    if isinstance(expr, Condition):
+        return {expr.field: expr.value} if expr.op == "$eq" else None
+    if isinstance(expr, And):
+        merged: dict[str, Any] = {}
+        for child in expr.children:
+            sub = equalities(child)
+            if sub is None or any(k in merged and merged[k] != v for k, v in sub.items()):
+                return None
+            merged.update(sub)
+        return merged
+    return None
+
+
+def matches(expr: Expr | None, metadata: dict[str, Any]) -> bool:
+    """Evaluate expr against one metadata dict (missing fields never match a comparison)."""
+    if expr is None:
+        return True
+    if isinstance(expr, And):
+        return all(matches(c, metadata) for c in expr.children)
+    if isinstance(expr, Or):
+        return any(matches(c, metadata) for c in expr.children)
+    if expr.field not in metadata:
+        return expr.op in ("$ne", "$nin")
+    value = metadata[expr.field]
+    try:
+        if expr.op == "$eq":
+            return value == expr.value
+        if expr.op == "$ne":
+            return value != expr.value
+        if expr.op == "$in":
+            return value in expr.value
+        if expr.op == "$nin":
+            return value not in expr.value
+        if expr.op == "$gt":
+            return value > expr.value
+        if expr.op == "$gte":
+            return value >= expr.value
+        if expr.op == "$lt":
+            return value < expr.value
+        return value <= expr.value
+    except TypeError:
+        return False
+
+
+def to_mongo(expr: Expr | None) -> dict[str, Any] | None:
+    """Canonical Mongo-style form with one key per object, as Chroma requires."""
+    if expr is None:
+        return None
+    if isinstance(expr, (And, Or)):
+        children = [to_mongo(c) for c in expr.children]
+        if len(children) == 1:
+            return children[0]
+        return {"$and" if isinstance(expr, And) else "$or": children}
+    return {expr.field: {expr.op: expr.value}}
+
+
+# -- SQL-ish backends -------------------------------------------------------
+
+_SQL_OPS = {"$eq": "=", "$ne": "!=", "$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<="}
+
+
+def _sql_literal(value: Any) -> str:
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    raise ValueError(f"Unsupported filter value {value!r}")
+
+
+def to_lance_where(expr: Expr | None) -> str | None:
+    """DataFusion SQL predicate over LanceDB's top-level metadata columns."""
+    if expr is None:
+        return None
+    if isinstance(expr, (And, Or)):
+        joiner = " AND " if isinstance(expr, And) else " OR "
+        return "(" + joiner.join(to_lance_where(c) for c in expr.children) + ")"
+
+    column = expr.field if _IDENTIFIER_RE.match(expr.field) else "`" + expr.field.replace("`", "``") + "`"
+    if expr.op in ("$in", "$nin"):
+        values = ", ".join(_sql_literal(v) for v in expr.value) or "NULL"
+        return f"{column} {'IN' if expr.op == '$in' else 'NOT IN'} ({values})"
+    if expr.value is None and expr.op in ("$eq", "$ne"):
+        return f"{column} IS {'NOT ' if expr.op == '$ne' else ''}NULL"
+    return f"{column} {_SQL_OPS[expr.op]} {_sql_literal(expr.value)}"
+
+
+def to_milvus_expr(expr: Expr | None, json_field: str = "metadata") -> str | None:
+    """Milvus boolean expression over keys of the JSON metadata field."""
+    if expr is None:
+        return None
+    if isinstance(expr, (And, Or)):
+        joiner = " and " if isinstance(expr, And) else " or "
+        return "(" + joiner.join(to_milvus_expr(c, json_field) for c in expr.children) + ")"
+
+    column = f"{json_field}[{json.dumps(expr.field)}]"
+    if expr.op in ("$in", "$nin"):
+        return f"{column} {'in' if expr.op == '$in' else 'not in'} {json.dumps(expr.value)}"
+    op = "==" if expr.op == "$eq" else _SQL_OPS[expr.op]
+    return f"{column} {op} {json.dumps(expr.value)}"
+
+
+def to_pg_where(expr: Expr | None, column: str = "metadata") -> tuple[str, list[Any]]:
+    """
+    SQL predicate and parameters over a JSONB column. Equality and $in use
+    containment (`@>`), which a GIN (jsonb_path_ops) index serves; ranges
+    compare the extracted value as numeric, or as text for string operands.
+    """
+    if expr is None:
+        return "TRUE", []
+    if isinstance(expr, (And, Or)):
+        joiner = " AND " if isinstance(expr, And) else " OR "
+        parts = [to_pg_where(c, column) for c in expr.children]
+        return "(" + joiner.join(sql for sql, _ in parts) + ")", [p for _, params in parts for p in params]
+
+    if expr.op in ("$eq", "$ne"):
+        sql = f"{column} @> %s::jsonb"
+        return (sql if expr.op == "$eq" else f"NOT ({sql})"), [json.dumps({expr.field: expr.value})]
+    if expr.op in ("$in", "$nin"):
+        if not expr.value:
+            return ("FALSE" if expr.op == "$in" else "TRUE"), []
+        sql = "(" + " OR ".join([f"{column} @> %s::jsonb"] * len(expr.value)) + ")"
+        params = [json.dumps({expr.field: v}) for v in expr.value]
+        return (sql if expr.op == "$in" else f"NOT {sql}"), params
+    if isinstance(expr.value, str):
+        return f"({column} ->> %s) {_SQL_OPS[expr.op]} %s", [expr.field, expr.value]
+    # CASE guards the cast: non-numeric values yield NULL (no match) instead of an error.
+    sql = f"(CASE WHEN jsonb_typeof({column} -> %s) = 'number' THEN ({column} ->> %s)::numeric {_SQL_OPS[expr.op]} %s END)"
+    return sql, [expr.field, expr.field, expr.value]
@@ -8,40 +8,144 @@ Provides a unified interface to multiple vector database backends:
 - Qdrant: excellent filtering, web UI
 - PGVector: PostgreSQL extension for SQL-based vector search
 - Pinecone: managed cloud service (no self-hosting)
+- NumPy: in-process exact search over memory-mapped files (app/numpy_store.py)
 
 Backend selection is controlled by the VECTOR_DB_BACKEND environment variable.
+
+Stores that need a per-collection handle (LanceDB tables, Milvus collections,
+Chroma collections, Pinecone indexes) keep them in a bounded LRU so the
+lookup/open/load round trips happen once per collection rather than once per
+call; handles are dropped when the collection is created or dropped.
+
+Quantization is opt-in per collection: create_collection(..., quantization=)
+with "int8", "float16" or "pq", where the backend supports it. The search
+scans the compact codes and re-ranks a shortlist of `rerank` x top_k
+candidates against the full-precision vectors. The rerank search parameter
+sets that factor; 0 returns the approximate ranking. footprint() and
+recall_at_k() report what a setting costs in memory and in accuracy.
+
+Quantization and tune() defaults are stored with the collection where the
+backend has somewhere to put them (LanceDB schema metadata, Milvus collection
+properties, Qdrant collection metadata, the PGVector table comment), so every
+agent process sees the same settings.
 """
 
 from __future__ import annotations
 
+import json
 import os
+import threading
+import uuid
 from abc import ABC, abstractmethod
-from typing import Any
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
 
 import numpy as np
 
+from app.vector_filter import And, Condition, Or, parse_filter, to_lance_where, to_milvus_expr, to_mongo, to_pg_where
+
+
+# Vectors arrive as float lists (JSON) or float32 NumPy arrays (binary wire formats);
+# backends whose client libraries need plain lists convert with _as_list().
+Vector = list[float] | np.ndarray
+Matrix = list[list[float]] | np.ndarray
+
+
+def _as_list(vectors: Any) -> Any:
+    return vectors.tolist() if isinstance(vectors, np.ndarray) else vectors
+
+
+_batch_executor: ThreadPoolExecutor | None = None
+_batch_executor_lock = threading.Lock()
+
+
+def _get_batch_executor() -> ThreadPoolExecutor:
+    """Shared workers for search_batch() on backends without a native multi-query API."""
+    global _batch_executor
+    with _batch_executor_lock:
+        if _batch_executor is None:
+            workers = int(os.getenv("VECTOR_BATCH_WORKERS", "8"))
+            _batch_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="vector-batch")
+        return _batch_executor
+
+
+INDEX_TYPES = {"hnsw", "ivf"}
+SEARCH_PARAMS = {"ef", "nprobe", "rerank"}
+QUANTIZATIONS = {"int8", "float16", "pq"}
+
+# Shortlist size, as a multiple of top_k, re-ranked at full precision on quantized collections.
+DEFAULT_RERANK = 4
+
+
+def _quantization(value: str | None, supported: set[str]) -> str | None:
+    """Validate a create_collection() quantization against what the backend implements."""
+    if value is None:
+        return None
+    if value not in QUANTIZATIONS:
+        raise ValueError(f"Unknown quantization: {value}; supported: {sorted(QUANTIZATIONS)}")
+    if value not in supported:
+        raise ValueError(f"Quantization {value!r} is not supported by this backend; supported: {sorted(supported) or 'none'}")
+    return value
+
+
+def _index_params(index_type: str, params: dict[str, Any]) -> dict[str, int]:
+    """Validate create_index() arguments and fill in defaults."""
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type: {index_type}; supported: {sorted(INDEX_TYPES)}")
+    defaults = {"m": 16, "ef_construction": 64} if index_type == "hnsw" else {"nlist": 100}
+    unknown = set(params) - set(defaults)
+    if unknown:
+        raise ValueError(f"Unknown {index_type} parameters: {sorted(unknown)}; supported: {sorted(defaults)}")
+    return {**defaults, **{k: int(v) for k, v in params.items()}}
+
 
 class VectorStore(ABC):
     """Abstract base class for vector store implementations."""
 
+    def __init__(self) -> None:
+        # Per-collection settings ({"quantization": ..., "tuning": {...}}), cached
+        # from _load_settings() on first use.
+        self._settings: dict[str, dict[str, Any]] = {}
+
     @abstractmethod
     def create_collection(self, name: str, dimension: int, **kwargs) -> None:
-        """Create a new collection/table for vectors."""
+        """
+        Create a new collection/table for vectors. Backends that support it
+        accept quantization="int8" | "float16" | "pq" (default: none).
+        """
         pass
 
     @abstractmethod
-    def insert(self, collection: str, vectors: list[list[float]], metadata: list[dict[str, Any]], ids: list[str] | None = None) -> None:
+    def insert(self, collection: str, vectors: Matrix, metadata: list[dict[str, Any]], ids: list[str] | None = None) -> None:
         """Insert vectors with metadata into a collection."""
         pass
 
     @abstractmethod
-    def search(self, collection: str, query_vector: list[float], top_k: int = 10, filter_dict: dict[str, Any] | None = None) -> list[dict[str, Any]]:
+    def search(self, collection: str, query_vector: Vector, top_k: int = 10, filter_dict: dict[str, Any] | None = None, search_params: dict[str, Any] | None = None) -> list[dict[str, Any]]:
         """
         Search for similar vectors.
+        filter_dict is a metadata filter in app.vector_filter syntax, applied
+        before ranking so up to top_k matching results are returned.
+        search_params overrides the collection's tune() defaults for this call
+        (ef for HNSW indexes, nprobe for IVF indexes, rerank for quantized
+        collections).
         Returns list of dicts with keys: id, score, metadata
         """
         pass
 
+    def search_batch(self, collection: str, query_vectors: Matrix, top_k: int = 10, filter_dict: dict[str, Any] | None = None, search_params: dict[str, Any] | None = None) -> list[list[dict[str, Any]]]:
+        """
+        Search several query vectors at once; returns one result list per
+        query, in order. Backends with a multi-query API override this; the
+        default runs search() for each query on a shared thread pool.
+        """
+        if len(query_vectors) <= 1:
+            return [self.search(collection, q, top_k, filter_dict, search_params) for q in query_vectors]
+        return list(_get_batch_executor().map(
+            lambda q: self.search(collection, q, top_k, filter_dict, search_params), query_vectors
+        ))
+
     @abstractmethod
     def delete(self, collection: str, ids: list[str]) -> None:
         """Delete vectors by IDs."""
@@ -52,6 +156,139 @@ class VectorStore(ABC):
         """Check connection health."""
         pass
 
+    def drop_collection(self, name: str) -> None:
+        """Drop a collection and everything in it."""
+        raise NotImplementedError(f"{type(self).__name__} does not support dropping collections")
+
+    def close(self) -> None:
+        """Release pooled connections; called on agent shutdown."""
+        pass
+
+    def create_index(self, collection: str, index_type: str = "hnsw", **params: Any) -> dict[str, Any]:
+        """
+        Build an ANN index on the collection's vectors. index_type is "hnsw"
+        (params m, ef_construction) or "ivf" (param nlist); returns the
+        effective index settings.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support explicit index creation")
+
+    def tune(self, collection: str, **params: Any) -> dict[str, Any]:
+        """Set default search-time parameters (ef, nprobe, rerank) for a collection; returns the effective set."""
+        unknown = set(params) - SEARCH_PARAMS
+        if unknown:
+            raise ValueError(f"Unknown search parameters: {sorted(unknown)}; supported: {sorted(SEARCH_PARAMS)}")
+        tuning = {**self._collection_settings(collection).get("tuning", {}), **{k: int(v) for k, v in params.items()}}
+        self._update_settings(collection, tuning=tuning)
+        return dict(tuning)
+
+    def _search_params(self, collection: str, overrides: dict[str, Any] | None) -> dict[str, int]:
+        """tune() defaults for the collection merged with per-request overrides."""
+        merged = {**self._collection_settings(collection).get("tuning", {}), **(overrides or {})}
+        unknown = set(merged) - SEARCH_PARAMS
+        if unknown:
+            raise ValueError(f"Unknown search parameters: {sorted(unknown)}; supported: {sorted(SEARCH_PARAMS)}")
+        return {k: int(v) for k, v in merged.items()}
+
+    def _load_settings(self, collection: str) -> dict[str, Any]:
+        """Settings stored with the collection. Backends with collection metadata override this."""
+        return {}
+
+    def _save_settings(self, collection: str, settings: dict[str, Any]) -> None:
+        """Store settings with the collection; by default they only last for this process."""
+        pass
+
+    def _collection_settings(self, collection: str) -> dict[str, Any]:
+        settings = self._settings.get(collection)
+        if settings is None:
+            settings = self._settings[collection] = self._load_settings(collection)
+        return settings
+
+    def _update_settings(self, collection: str, **changes: Any) -> None:
+        settings = {**self._collection_settings(collection), **changes}
+        self._save_settings(collection, settings)
+        self._settings[collection] = settings
+
+    def _rerank(self, collection: str, params: dict[str, int]) -> int | None:
+        """Re-rank shortlist multiple: the rerank param, DEFAULT_RERANK for quantized collections, else None."""
+        quantized = self._collection_settings(collection).get("quantization") is not None
+        rerank = params.get("rerank", DEFAULT_RERANK if quantized else None)
+        if rerank is not None and rerank < 0:
+            raise ValueError(f"rerank must be >= 0, got {rerank}")
+        return rerank
+
+    def score_to_similarity(self, score: float) -> float:
+        """
+        Convert a search() score to cosine similarity, assuming unit-normalized
+        vectors. Default: squared L2 distance (LanceDB, Milvus L2, Chroma).
+        """
+        return 1.0 - score / 2.0
+
+    def footprint(self, collection: str) -> dict[str, Any]:
+        """Storage and memory used by a collection's vectors, codes and indexes, in bytes."""
+        raise NotImplementedError(f"{type(self).__name__} does not report collection footprints")
+
+    def exact_search_batch(self, collection: str, query_vectors: Matrix, top_k: int = 10) -> list[list[dict[str, Any]]]:
+        """Brute-force search over full-precision vectors: the ground truth for recall_at_k()."""
+        raise NotImplementedError(f"{type(self).__name__} does not support exact search")
+
+    def recall_at_k(self, collection: str, query_vectors: Matrix, top_k: int = 10, search_params: dict[str, Any] | None = None) -> dict[str, Any]:
+        """Recall@k of search_batch() (index, quantization, rerank) against exact_search_batch()."""
+        approx = self.search_batch(collection, query_vectors, top_k, None, search_params)
+        exact = self.exact_search_batch(collection, query_vectors, top_k)
+        recalls = [
+            len({h["id"] for h in a} & {h["id"] for h in e}) / len(e)
+            for a, e in zip(approx, exact)
+            if e
+        ]
+        return {
+            "k": top_k,
+            "queries": len(recalls),
+            "recall": round(sum(recalls) / len(recalls), 4) if recalls else None,
+            "min_recall": round(min(recalls), 4) if recalls else None,
+        }
+
+
+class HandleCache:
+    """Thread-safe bounded LRU of open collection handles, keyed by collection name."""
+
+    def __init__(self, max_size: int | None = None):
+        self.max_size = max_size or int(os.getenv("VECTOR_HANDLE_CACHE_SIZE", "64"))
+        self._lock = threading.Lock()
+        self._handles: OrderedDict[str, Any] = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def __contains__(self, name: str) -> bool:
+        with self._lock:
+            return name in self._handles
+
+    def get(self, name: str, open_handle: Callable[[], Any]) -> Any:
+        with self._lock:
+            if name in self._handles:
+                self._hits += 1
+                self._handles.move_to_end(name)
+                return self._handles[name]
+            self._misses += 1
+        # Opened outside the lock: this is network or disk I/O.
+        handle = open_handle()
+        self.put(name, handle)
+        return handle
+
+    def put(self, name: str, handle: Any) -> None:
+        with self._lock:
+            self._handles[name] = handle
+            self._handles.move_to_end(name)
+            while len(self._handles) > self.max_size:
+                self._handles.popitem(last=False)
+
+    def invalidate(self, name: str) -> None:
+        with self._lock:
+            self._handles.pop(name, None)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {"size": len(self._handles), "max_size": self.max_size, "hits": self._hits, "misses": self._misses}
+
 
 class LanceDBStore(VectorStore):
     """LanceDB: Embedded vector database (default, zero-config)."""
@@ -59,36 +296,160 @@ class LanceDBStore(VectorStore):
     def __init__(self):
         import lancedb
 
+        super().__init__()
         db_path = os.getenv("LANCEDB_PATH", "/app/data/lancedb")
         self.db = lancedb.connect(db_path)
+        self._tables = HandleCache()
+
+    # ANN index built by create_index() for each (index type, collection quantization).
+    # LanceDB's HNSW indexes all store compressed codes, even on unquantized collections.
+    INDEX_KINDS = {
+        ("hnsw", None): "IVF_HNSW_SQ",
+        ("hnsw", "int8"): "IVF_HNSW_SQ",
+        ("hnsw", "pq"): "IVF_HNSW_PQ",
+        ("ivf", None): "IVF_FLAT",
+        ("ivf", "pq"): "IVF_PQ",
+    }
+    # Index kinds that rank by lossy codes; searches on them re-rank by default.
+    LOSSY_INDEX_KINDS = {"IVF_HNSW_SQ", "IVF_HNSW_PQ", "IVF_PQ"}
+
+    # Schema metadata key holding the collection settings (quantization, tune() defaults).
+    SETTINGS_KEY = b"kontrola"
 
     def create_collection(self, name: str, dimension: int, **kwargs) -> None:
-        # LanceDB creates tables lazily on first insert
-        pass
-
-    def insert(self, collection: str, vectors: list[list[float]], metadata: list[dict[str, Any]], ids: list[str] | None = None) -> None:
-        table = self.db.open_table(collection) if collection in self.db.table_names() else None
-        data = []
+        # LanceDB creates tables lazily on first insert; quantization applies to the create_index() build.
+        quantization = _quantization(kwargs.get("quantization"), {"int8", "pq"})
+        self._tables.invalidate(name)
+        if quantization is not None:
+            self._update_settings(name, quantization=quantization)
+
+    def _table(self, collection: str) -> Any:
+        return self._tables.get(collection, lambda: self.db.open_table(collection))
+
+    def _exists(self, collection: str) -> bool:
+        # table_names() lists the whole database directory; only consult it on a cold handle.
+        return collection in self._tables or collection in self.db.table_names()
+
+    def _load_settings(self, collection: str) -> dict[str, Any]:
+        if not self._exists(collection):
+            return {}
+        raw = (self._table(collection).schema.metadata or {}).get(self.SETTINGS_KEY)
+        return json.loads(raw) if raw else {}
+
+    def _save_settings(self, collection: str, settings: dict[str, Any]) -> None:
+        # Until the first insert creates the table, settings are only held in _settings.
+        if self._exists(collection):
+            self._write_settings(self._table(collection), settings)
+            self._tables.invalidate(collection)
+
+    def _write_settings(self, table: Any, settings: dict[str, Any]) -> None:
+        metadata = {**(table.schema.metadata or {}), self.SETTINGS_KEY: json.dumps(settings).encode()}
+        table.to_lance().replace_schema_metadata(metadata)
+
+    def insert(self, collection: str, vectors: Matrix, metadata: list[dict[str, Any]], ids: list[str] | None = None) -> None:
+        # Keyed by id so a repeated id in one batch keeps its last row, as the other backends do.
+        rows: dict[str, dict[str, Any]] = {}
         for i, (vec, meta) in enumerate(zip(vectors, metadata)):
-            row = {"vector": vec, "id": ids[i] if ids else str(i), **meta}
-            data.append(row)
-        
-        if table:
-            table.add(data)
+            id_ = ids[i] if ids else str(i)
+            rows[id_] = {"vector": vec, "id": id_, **meta}
+        data = list(rows.values())
+
+        if self._exists(collection):
+            # Upsert on id: add() would append a second row for every re-indexed id.
+            self._table(collection).merge_insert("id").when_matched_update_all().when_not_matched_insert_all().execute(data)
+            return
+        table = self.db.create_table(collection, data=data)
+        settings = self._settings.get(collection)
+        if settings:
+            # Settings given before the table existed: store them with it now.
+            self._write_settings(table, settings)
         else:
-            self.db.create_table(collection, data=data)
+            self._tables.put(collection, table)
+
+    def _query(self, collection: str, query: Any, top_k: int, filter_dict: dict[str, Any] | None, search_params: dict[str, Any] | None) -> Any:
+        params = self._search_params(collection, search_params)
+        builder = self._table(collection).search(query).limit(top_k)
+        where = to_lance_where(parse_filter(filter_dict))
+        if where:
+            builder = builder.where(where, prefilter=True)
+        if "nprobe" in params:
+            builder = builder.nprobes(params["nprobe"])
+        if "ef" in params and hasattr(builder, "ef"):
+            builder = builder.ef(params["ef"])
+        rerank = self._rerank(collection, params)
+        if rerank:
+            # Fetch rerank x top_k candidates from the index and re-score them on the stored vectors.
+            builder = builder.refine_factor(rerank)
+        return builder
 
-    def search(self, collection: str, query_vector: list[float], top_k: int = 10, filter_dict: dict[str, Any] | None = None) -> list[dict[str, Any]]:
-        table = self.db.open_table(collection)
-        results = table.search(query_vector).limit(top_k).to_list()
-        return [{"id": r["id"], "score": r.get("_distance", 0.0), "metadata": {k: v for k, v in r.items() if k not in ("id", "vector", "_distance")}} for r in results]
+    @staticmethod
+    def _result(r: dict[str, Any]) -> dict[str, Any]:
+        return {"id": r["id"], "score": r.get("_distance", 0.0), "metadata": {k: v for k, v in r.items() if k not in ("id", "vector", "_distance", "query_index")}}
+
+    def search(self, collection: str, query_vector: Vector, top_k: int = 10, filter_dict: dict[str, Any] | None = None, search_params: dict[str, Any] | None = None) -> list[dict[str, Any]]:
+        results = self._query(collection, query_vector, top_k, filter_dict, search_params).to_list()
+        return [self._result(r) for r in results]
+
+    def search_batch(self, collection: str, query_vectors: Matrix, top_k: int = 10, filter_dict: dict[str, Any] | None = None, search_params: dict[str, Any] | None = None) -> list[list[dict[str, Any]]]:
+        # A list of vectors is one multi-vector query; rows carry the index of the query they answer.
+        rows = self._query(collection, list(query_vectors), top_k, filter_dict, search_params).to_list()
+        grouped: list[list[dict[str, Any]]] = [[] for _ in query_vectors]
+        for r in rows:
+            grouped[r.get("query_index", 0)].append(self._result(r))
+        return grouped
+
+    def exact_search_batch(self, collection: str, query_vectors: Matrix, top_k: int = 10) -> list[list[dict[str, Any]]]:
+        rows = self._table(collection).search(list(query_vectors)).limit(top_k).bypass_vector_index().to_list()
+        grouped: list[list[dict[str, Any]]] = [[] for _ in query_vectors]
+        for r in rows:
+            grouped[r.get("query_index", 0)].append(self._result(r))
+        return grouped
 
     def delete(self, collection: str, ids: list[str]) -> None:
-        table = self.db.open_table(collection)
-        table.delete(f"id IN {ids}")
+        if ids:
+            self._table(collection).delete(to_lance_where(Condition("id", "$in", list(ids))))
+
+    def drop_collection(self, name: str) -> None:
+        self._tables.invalidate(name)
+        self._settings.pop(name, None)
+        self.db.drop_table(name)
+
+    def create_index(self, collection: str, index_type: str = "hnsw", **params: Any) -> dict[str, Any]:
+        params = _index_params(index_type, params)
+        quantization = self._collection_settings(collection).get("quantization")
+        kind = self.INDEX_KINDS.get((index_type, quantization))
+        if kind is None:
+            raise ValueError(f"LanceDB has no {index_type} index with {quantization} quantization")
+        table = self._table(collection)
+        if index_type == "hnsw":
+            table.create_index(metric="L2", index_type=kind, m=params["m"], ef_construction=params["ef_construction"], replace=True)
+        else:
+            table.create_index(metric="L2", index_type=kind, num_partitions=params["nlist"], replace=True)
+        # Pick up the new index version on the next query.
+        self._tables.invalidate(collection)
+        self._update_settings(collection, index=kind)
+        return {"index_type": index_type, **params}
+
+    def _rerank(self, collection: str, params: dict[str, int]) -> int | None:
+        # An SQ/PQ index loses recall on a plain collection too: re-rank unless the request says otherwise.
+        if "rerank" not in params and self._collection_settings(collection).get("index") in self.LOSSY_INDEX_KINDS:
+            params = {**params, "rerank": DEFAULT_RERANK}
+        return super()._rerank(collection, params)
+
+    def footprint(self, collection: str) -> dict[str, Any]:
+        table = self._table(collection)
+        path = os.path.join(os.getenv("LANCEDB_PATH", "/app/data/lancedb"), f"{collection}.lance")
+        size = sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(path) for f in files)
+        return {
+            "backend": "lancedb",
+            "collection": collection,
+            "quantization": self._collection_settings(collection).get("quantization"),
+            "rows": table.count_rows(),
+            "total_bytes": size,
+        }
 
     def health_check(self) -> dict[str, Any]:
-        return {"ok": True, "backend": "lancedb", "tables": self.db.table_names()}
+        return {"ok": True, "backend": "lancedb", "tables": self.db.table_names(), "handle_cache": self._tables.stats()}
 
 
 class MilvusStore(VectorStore):
@@ -99,40 +460,121 @@ class MilvusStore(VectorStore):
 
         host = os.getenv("MILVUS_HOST", "milvus")
         port = int(os.getenv("MILVUS_PORT", "19530"))
+        super().__init__()
         connections.connect(host=host, port=port)
         self.Collection = Collection
+        # Handles are cached after load(), so a hit is a collection already in query memory.
+        self._collections = HandleCache()
+
+    # Collection property holding the collection settings (quantization, tune() defaults).
+    SETTINGS_PROPERTY = "kontrola.settings"
 
     def create_collection(self, name: str, dimension: int, **kwargs) -> None:
         from pymilvus import CollectionSchema, FieldSchema, DataType
 
+        # int8 selects the SQ8 variant of the index create_index() builds.
+        quantization = _quantization(kwargs.get("quantization"), {"int8"})
         fields = [
             FieldSchema(name="id", dtype=DataType.VARCHAR, is_primary=True, max_length=256),
             FieldSchema(name="vector", dtype=DataType.FLOAT_VECTOR, dim=dimension),
             FieldSchema(name="metadata", dtype=DataType.JSON),
         ]
         schema = CollectionSchema(fields, description="Kontrola collection")
+        self._collections.invalidate(name)
+        self._settings.pop(name, None)
         self.Collection(name=name, schema=schema)
+        if quantization is not None:
+            self._update_settings(name, quantization=quantization)
+
+    def _load_settings(self, collection: str) -> dict[str, Any]:
+        raw = (self.Collection(collection).describe().get("properties") or {}).get(self.SETTINGS_PROPERTY)
+        return json.loads(raw) if raw else {}
 
-    def insert(self, collection: str, vectors: list[list[float]], metadata: list[dict[str, Any]], ids: list[str] | None = None) -> None:
+    def _save_settings(self, collection: str, settings: dict[str, Any]) -> None:
+        self.Collection(collection).set_properties({self.SETTINGS_PROPERTY: json.dumps(settings)})
+
+    def _collection(self, collection: str) -> Any:
+        def open_loaded() -> Any:
+            col = self.Collection(collection)
+            col.load()
+            return col
+
+        return self._collections.get(collection, open_loaded)
+
+    def insert(self, collection: str, vectors: Matrix, metadata: list[dict[str, Any]], ids: list[str] | None = None) -> None:
+        # Writes need no load(), which Milvus refuses until create_index() has built an index.
         col = self.Collection(collection)
         if not ids:
             ids = [str(i) for i in range(len(vectors))]
-        col.insert([ids, vectors, metadata])
-
-    def search(self, collection: str, query_vector: list[float], top_k: int = 10, filter_dict: dict[str, Any] | None = None) -> list[dict[str, Any]]:
-        col = self.Collection(collection)
-        col.load()
-        results = col.search([query_vector], "vector", {"metric_type": "L2"}, limit=top_k, output_fields=["metadata"])
-        return [{"id": hit.id, "score": hit.distance, "metadata": hit.entity.get("metadata")} for hit in results[0]]
+        # upsert (Milvus >= 2.3) replaces entities with the same primary key instead of duplicating them.
+        col.upsert([ids, list(vectors), metadata])
+
+    def search(self, collection: str, query_vector: Vector, top_k: int = 10, filter_dict: dict[str, Any] | None = None, search_params: dict[str, Any] | None = None) -> list[dict[str, Any]]:
+        return self.search_batch(collection, [query_vector], top_k, filter_dict, search_params)[0]
+
+    def search_batch(self, collection: str, query_vectors: Matrix, top_k: int = 10, filter_dict: dict[str, Any] | None = None, search_params: dict[str, Any] | None = None) -> list[list[dict[str, Any]]]:
+        params = self._search_params(collection, search_params)
+        rerank = self._rerank(collection, params)
+        params.pop("rerank", None)
+        # Milvus evaluates expr before the ANN search, so the limit applies to matching entities.
+        expr = to_milvus_expr(parse_filter(filter_dict))
+        col = self._collection(collection)
+        limit = top_k * rerank if rerank else top_k
+        fields = ["metadata", "vector"] if rerank else ["metadata"]
+        try:
+            results = col.search(query_vectors, "vector", {"metric_type": "L2", "params": params}, limit=limit, expr=expr, output_fields=fields)
+        except Exception:
+            # Released or dropped behind our back; reopen (and reload) next time.
+            self._collections.invalidate(collection)
+            raise
+        hits = [[{"id": hit.id, "score": hit.distance, "metadata": hit.entity.get("metadata")} for hit in found] for found in results]
+        if rerank:
+            # The SQ8 index ranked the shortlist; re-score it against the raw float vectors.
+            for q, found, raw in zip(query_vectors, hits, results):
+                vectors = np.asarray([hit.entity.get("vector") for hit in raw], dtype=np.float32).reshape(len(found), -1)
+                exact = ((vectors - np.asarray(q, dtype=np.float32)) ** 2).sum(axis=1)
+                for hit, score in zip(found, exact):
+                    hit["score"] = float(score)
+                found.sort(key=lambda hit: hit["score"])
+                del found[top_k:]
+        return hits
 
     def delete(self, collection: str, ids: list[str]) -> None:
         col = self.Collection(collection)
         col.delete(f"id in {ids}")
 
+    def drop_collection(self, name: str) -> None:
+        from pymilvus import utility
+
+        self._collections.invalidate(name)
+        self._settings.pop(name, None)
+        utility.drop_collection(name)
+
+    def create_index(self, collection: str, index_type: str = "hnsw", **params: Any) -> dict[str, Any]:
+        params = _index_params(index_type, params)
+        sq8 = self._collection_settings(collection).get("quantization") == "int8"
+        if index_type == "hnsw" and sq8:
+            # Milvus >= 2.5
+            index = {"index_type": "HNSW_SQ", "metric_type": "L2", "params": {"M": params["m"], "efConstruction": params["ef_construction"], "sq_type": "SQ8"}}
+        elif index_type == "hnsw":
+            index = {"index_type": "HNSW", "metric_type": "L2", "params": {"M": params["m"], "efConstruction": params["ef_construction"]}}
+        else:
+            index = {"index_type": "IVF_SQ8" if sq8 else "IVF_FLAT", "metric_type": "L2", "params": {"nlist": params["nlist"]}}
+        self._collections.invalidate(collection)
+        col = self.Collection(collection)
+        # An index cannot be replaced while the collection is loaded.
+        col.release()
+        if col.has_index():
+            col.drop_index()
+        col.create_index("vector", index)
+        col.load()
+        self._collections.put(collection, col)
+        return {"index_type": index_type, **params}
+
     def health_check(self) -> dict[str, Any]:
         from pymilvus import utility
 
-        return {"ok": True, "backend": "milvus", "collections": utility.list_collections()}
+        return {"ok": True, "backend": "milvus", "collections": utility.list_collections(), "handle_cache": self._collections.stats()}
 
 
 class ChromaStore(VectorStore):
@@ -143,139 +585,502 @@ class ChromaStore(VectorStore):
 
         host = os.getenv("CHROMA_HOST", "chroma")
         port = int(os.getenv("CHROMA_PORT", "8000"))
+        super().__init__()
         self.client = chromadb.HttpClient(host=host, port=port)
+        self._collections = HandleCache()
 
     def create_collection(self, name: str, dimension: int, **kwargs) -> None:
-        self.client.get_or_create_collection(name)
+        _quantization(kwargs.get("quantization"), set())
+        self._collections.put(name, self.client.get_or_create_collection(name))
+
+    def _collection(self, collection: str) -> Any:
+        return self._collections.get(collection, lambda: self.client.get_collection(collection))
 
-    def insert(self, collection: str, vectors: list[list[float]], metadata: list[dict[str, Any]], ids: list[str] | None = None) -> None:
-        col = self.client.get_collection(collection)
+    def insert(self, collection: str, vectors: Matrix, metadata: list[dict[str, Any]], ids: list[str] | None = None) -> None:
+        col = self._collection(collection)
         if not ids:
             ids = [str(i) for i in range(len(vectors))]
-        col.add(embeddings=vectors, metadatas=metadata, ids=ids)
+        col.upsert(embeddings=vectors, metadatas=metadata, ids=ids)
 
-    def search(self, collection: str, query_vector: list[float], top_k: int = 10, filter_dict: dict[str, Any] | None = None) -> list[dict[str, Any]]:
-        col = self.client.get_collection(collection)
-        results = col.query(query_embeddings=[query_vector], n_results=top_k, where=filter_dict)
-        return [{"id": results["ids"][0][i], "score": results["distances"][0][i], "metadata": results["metadatas"][0][i]} for i in range(len(results["ids"][0]))]
+    def search(self, collection: str, query_vector: Vector, top_k: int = 10, filter_dict: dict[str, Any] | None = None, search_params: dict[str, Any] | None = None) -> list[dict[str, Any]]:
+        return self.search_batch(collection, [query_vector], top_k, filter_dict, search_params)[0]
+
+    def search_batch(self, collection: str, query_vectors: Matrix, top_k: int = 10, filter_dict: dict[str, Any] | None = None, search_params: dict[str, Any] | None = None) -> list[list[dict[str, Any]]]:
+        col = self._collection(collection)
+        results = col.query(query_embeddings=query_vectors, n_results=top_k, where=to_mongo(parse_filter(filter_dict)))
+        return [
+            [{"id": results["ids"][q][i], "score": results["distances"][q][i], "metadata": results["metadatas"][q][i]} for i in range(len(results["ids"][q]))]
+            for q in range(len(query_vectors))
+        ]
 
     def delete(self, collection: str, ids: list[str]) -> None:
-        col = self.client.get_collection(collection)
+        col = self._collection(collection)
         col.delete(ids=ids)
 
+    def drop_collection(self, name: str) -> None:
+        self._collections.invalidate(name)
+        self._settings.pop(name, None)
+        self.client.delete_collection(name)
+
     def health_check(self) -> dict[str, Any]:
-        return {"ok": True, "backend": "chroma", "collections": [c.name for c in self.client.list_collections()]}
+        return {"ok": True, "backend": "chroma", "collections": [c.name for c in self.client.list_collections()], "handle_cache": self._collections.stats()}
 
 
 class QdrantStore(VectorStore):
-    """Qdrant: Production vector search with excellent filtering."""
+    """
+    Qdrant: Production vector search with excellent filtering.
+
+    Qdrant point ids must be unsigned integers or UUIDs, so string ids (e.g.
+    ingest chunk ids "doc:3") are stored under a uuid5 of the id and the
+    original id is kept in the payload under ID_FIELD.
+    """
+
+    ID_NAMESPACE = uuid.UUID("6f3c1f0e-9a57-5d0b-8f57-3b4c2a9e0d11")
+    ID_FIELD = "_id"
+    # Collection metadata key holding the collection settings (quantization, tune() defaults).
+    # Collection metadata needs a recent Qdrant server and client; with older ones
+    # tune() defaults stay in this process and quantization is read from the config.
+    SETTINGS_KEY = "kontrola"
 
     def __init__(self):
         from qdrant_client import QdrantClient
 
         host = os.getenv("QDRANT_HOST", "qdrant")
         port = int(os.getenv("QDRANT_PORT", "6333"))
+        super().__init__()
         self.client = QdrantClient(host=host, port=port)
+        # False once the client turned out not to know collection metadata.
+        self._metadata_supported = True
 
     def create_collection(self, name: str, dimension: int, **kwargs) -> None:
-        from qdrant_client.models import Distance, VectorParams
-
-        self.client.create_collection(collection_name=name, vectors_config=VectorParams(size=dimension, distance=Distance.COSINE))
-
-    def insert(self, collection: str, vectors: list[list[float]], metadata: list[dict[str, Any]], ids: list[str] | None = None) -> None:
+        from qdrant_client.models import (
+            CompressionRatio,
+            Datatype,
+            Distance,
+            ProductQuantization,
+            ProductQuantizationConfig,
+            ScalarQuantization,
+            ScalarQuantizationConfig,
+            ScalarType,
+            VectorParams,
+        )
+
+        quantization = _quantization(kwargs.get("quantization"), {"int8", "float16", "pq"})
+        # Quantized codes stay in RAM; the original vectors are kept on disk for rescoring.
+        config = None
+        if quantization == "int8":
+            config = ScalarQuantization(scalar=ScalarQuantizationConfig(type=ScalarType.INT8, always_ram=True))
+        elif quantization == "pq":
+            config = ProductQuantization(product=ProductQuantizationConfig(compression=CompressionRatio.X16, always_ram=True))
+        vectors = VectorParams(
+            size=dimension,
+            distance=Distance.COSINE,
+            datatype=Datatype.FLOAT16 if quantization == "float16" else None,
+            on_disk=config is not None,
+        )
+        settings = {"quantization": quantization} if quantization is not None else {}
+        create = {"collection_name": name, "vectors_config": vectors, "quantization_config": config}
+        if self._metadata_supported:
+            try:
+                self.client.create_collection(**create, metadata={self.SETTINGS_KEY: settings})
+            except TypeError:
+                self._metadata_supported = False
+        if not self._metadata_supported:
+            self.client.create_collection(**create)
+        self._settings[name] = settings
+
+    def _load_settings(self, collection: str) -> dict[str, Any]:
+        config = self.client.get_collection(collection_name=collection).config
+        metadata = getattr(config, "metadata", None)
+        if metadata is None:
+            self._metadata_supported = self._metadata_supported and hasattr(config, "metadata")
+        elif self.SETTINGS_KEY in metadata:
+            return dict(metadata[self.SETTINGS_KEY] or {})
+        # No stored settings: derive the quantization from the collection config.
+        quantized = getattr(config, "quantization_config", None)
+        if getattr(quantized, "scalar", None) is not None:
+            return {"quantization": "int8"}
+        if getattr(quantized, "product", None) is not None:
+            return {"quantization": "pq"}
+        datatype = getattr(getattr(config.params, "vectors", None), "datatype", None)
+        return {"quantization": "float16"} if str(getattr(datatype, "value", datatype)) == "float16" else {}
+
+    def _save_settings(self, collection: str, settings: dict[str, Any]) -> None:
+        if not self._metadata_supported:
+            return
+        try:
+            self.client.update_collection(collection_name=collection, metadata={self.SETTINGS_KEY: settings})
+        except TypeError:
+            self._metadata_supported = False
+
+    def insert(self, collection: str, vectors: Matrix, metadata: list[dict[str, Any]], ids: list[str] | None = None) -> None:
         from qdrant_client.models import PointStruct
 
         if not ids:
             ids = [str(i) for i in range(len(vectors))]
-        points = [PointStruct(id=id_, vector=vec, payload=meta) for id_, vec, meta in zip(ids, vectors, metadata)]
+        points = [
+            PointStruct(id=self._point_id(id_), vector=vec, payload={**meta, self.ID_FIELD: id_})
+            for id_, vec, meta in zip(ids, _as_list(vectors), metadata)
+        ]
         self.client.upsert(collection_name=collection, points=points)
 
-    def search(self, collection: str, query_vector: list[float], top_k: int = 10, filter_dict: dict[str, Any] | None = None) -> list[dict[str, Any]]:
-        from qdrant_client.models import Filter, FieldCondition, MatchValue
+    @classmethod
+    def _point_id(cls, id_: str) -> str:
+        return str(uuid.uuid5(cls.ID_NAMESPACE, str(id_)))
+
+    @classmethod
+    def _hit(cls, hit: Any) -> dict[str, Any]:
+        payload = dict(hit.payload or {})
+        id_ = payload.pop(cls.ID_FIELD, None)
+        return {"id": id_ if id_ is not None else str(hit.id), "score": hit.score, "metadata": payload}
+
+    def _filter(self, filter_dict: dict[str, Any] | None) -> Any:
+        from qdrant_client.models import FieldCondition, Filter, MatchAny, MatchValue, Range
+
+        ranges = {"$gt": "gt", "$gte": "gte", "$lt": "lt", "$lte": "lte"}
+
+        def build(expr: Any) -> Any:
+            if isinstance(expr, And):
+                return Filter(must=[build(c) for c in expr.children])
+            if isinstance(expr, Or):
+                return Filter(should=[build(c) for c in expr.children])
+            if expr.op in ranges:
+                return Filter(must=[FieldCondition(key=expr.field, range=Range(**{ranges[expr.op]: expr.value}))])
+            match = MatchAny(any=expr.value) if expr.op in ("$in", "$nin") else MatchValue(value=expr.value)
+            condition = FieldCondition(key=expr.field, match=match)
+            return Filter(must_not=[condition]) if expr.op in ("$ne", "$nin") else Filter(must=[condition])
+
+        expr = parse_filter(filter_dict)
+        return build(expr) if expr is not None else None
+
+    def _params(self, collection: str, search_params: dict[str, Any] | None) -> Any:
+        from qdrant_client.models import QuantizationSearchParams, SearchParams
+
+        params = self._search_params(collection, search_params)
+        rerank = self._rerank(collection, params)
+        if "ef" not in params and rerank is None:
+            return None
+        quantization = None
+        if rerank is not None:
+            # oversampling x limit candidates from the quantized index, rescored on the originals.
+            quantization = QuantizationSearchParams(rescore=rerank > 0, oversampling=float(max(rerank, 1)))
+        return SearchParams(hnsw_ef=params.get("ef"), quantization=quantization)
+
+    def search(self, collection: str, query_vector: Vector, top_k: int = 10, filter_dict: dict[str, Any] | None = None, search_params: dict[str, Any] | None = None) -> list[dict[str, Any]]:
+        results = self.client.search(
+            collection_name=collection,
+            query_vector=_as_list(query_vector),
+            limit=top_k,
+            query_filter=self._filter(filter_dict),
+            search_params=self._params(collection, search_params),
+        )
+        return [self._hit(hit) for hit in results]
+
+    def search_batch(self, collection: str, query_vectors: Matrix, top_k: int = 10, filter_dict: dict[str, Any] | None = None, search_params: dict[str, Any] | None = None) -> list[list[dict[str, Any]]]:
+        from qdrant_client.models import SearchRequest
+
+        filter_obj = self._filter(filter_dict)
+        params = self._params(collection, search_params)
+        requests = [
+            SearchRequest(vector=vec, limit=top_k, filter=filter_obj, params=params, with_payload=True)
+            for vec in _as_list(query_vectors)
+        ]
+        results = self.client.search_batch(collection_name=collection, requests=requests)
+        return [[self._hit(hit) for hit in hits] for hits in results]
+
+    def exact_search_batch(self, collection: str, query_vectors: Matrix, top_k: int = 10) -> list[list[dict[str, Any]]]:
+        from qdrant_client.models import QuantizationSearchParams, SearchParams, SearchRequest
 
-        filter_obj = None
-        if filter_dict:
-            conditions = [FieldCondition(key=k, match=MatchValue(value=v)) for k, v in filter_dict.items()]
-            filter_obj = Filter(must=conditions)
-        
-        results = self.client.search(collection_name=collection, query_vector=query_vector, limit=top_k, query_filter=filter_obj)
-        return [{"id": hit.id, "score": hit.score, "metadata": hit.payload} for hit in results]
+        params = SearchParams(exact=True, quantization=QuantizationSearchParams(ignore=True))
+        requests = [SearchRequest(vector=vec, limit=top_k, params=params, with_payload=True) for vec in _as_list(query_vectors)]
+        results = self.client.search_batch(collection_name=collection, requests=requests)
+        return [[self._hit(hit) for hit in hits] for hits in results]
 
     def delete(self, collection: str, ids: list[str]) -> None:
-        self.client.delete(collection_name=collection, points_selector=ids)
+        self.client.delete(collection_name=collection, points_selector=[self._point_id(id_) for id_ in ids])
+
+    def drop_collection(self, name: str) -> None:
+        self._settings.pop(name, None)
+        self.client.delete_collection(collection_name=name)
+
+    def create_index(self, collection: str, index_type: str = "hnsw", **params: Any) -> dict[str, Any]:
+        from qdrant_client.models import HnswConfigDiff
+
+        if index_type != "hnsw":
+            raise ValueError("Qdrant only supports hnsw indexes")
+        params = _index_params(index_type, params)
+        # Qdrant always indexes with HNSW; this rebuilds it with the new graph parameters.
+        self.client.update_collection(collection_name=collection, hnsw_config=HnswConfigDiff(m=params["m"], ef_construct=params["ef_construction"]))
+        return {"index_type": index_type, **params}
 
     def health_check(self) -> dict[str, Any]:
         collections = self.client.get_collections().collections
         return {"ok": True, "backend": "qdrant", "collections": [c.name for c in collections]}
 
+    def score_to_similarity(self, score: float) -> float:
+        # Collections are created with Distance.COSINE; the score is the similarity.
+        return score
+
 
 class PGVectorStore(VectorStore):
     """PGVector: PostgreSQL extension for SQL-based vector search."""
 
+    # Per-session staging table for bulk loads; emptied at the end of every transaction.
+    STAGING_TABLE = "kontrola_vector_staging"
+
     def __init__(self):
         import psycopg
 
+        from app.db_pool import ConnectionPool
+
         host = os.getenv("PGVECTOR_HOST", "pgvector")
         port = int(os.getenv("PGVECTOR_PORT", "5432"))
         user = os.getenv("PGVECTOR_USER", "kontrola")
         password = os.getenv("PGVECTOR_PASSWORD", "kontrola")
         dbname = os.getenv("PGVECTOR_DB", "vectors")
 
+        super().__init__()
         self.conn_str = f"host={host} port={port} user={user} password={password} dbname={dbname}"
+        self.batch_size = int(os.getenv("PGVECTOR_INSERT_BATCH_SIZE", "1000"))
         # Enable pgvector extension on first connect
         with psycopg.connect(self.conn_str) as conn:
             with conn.cursor() as cur:
                 cur.execute("CREATE EXTENSION IF NOT EXISTS vector")
+                cur.execute("SELECT extversion FROM pg_extension WHERE extname = 'vector'")
+                version = tuple(int(p) for p in cur.fetchone()[0].split(".")[:2])
                 conn.commit()
-
-    def create_collection(self, name: str, dimension: int, **kwargs) -> None:
+        # pgvector >= 0.8 can keep scanning an HNSW/IVF index until enough rows pass a
+        # WHERE clause; older versions may return fewer than top_k filtered rows.
+        self.iterative_scan = version >= (0, 8)
+
+        self.pool = ConnectionPool(
+            self._connect,
+            size=int(os.getenv("PGVECTOR_POOL_MAX_SIZE", "10")),
+            min_size=int(os.getenv("PGVECTOR_POOL_MIN_SIZE", "2")),
+            max_lifetime=float(os.getenv("PGVECTOR_POOL_MAX_LIFETIME", "1800")),
+            acquire_timeout=float(os.getenv("PGVECTOR_POOL_TIMEOUT", "5")),
+            ping=lambda conn: conn.execute("SELECT 1").fetchone() is not None,
+            name="pgvector",
+        )
+        self.pool.warm()
+
+    def _connect(self) -> Any:
         import psycopg
 
-        with psycopg.connect(self.conn_str) as conn:
-            with conn.cursor() as cur:
-                cur.execute(f"CREATE TABLE IF NOT EXISTS {name} (id TEXT PRIMARY KEY, vector vector({dimension}), metadata JSONB)")
-                conn.commit()
+        # Autocommit: reads never leave a pooled session idle in transaction;
+        # writes that need atomicity open an explicit conn.transaction().
+        conn = psycopg.connect(self.conn_str, autocommit=True)
+        try:
+            from pgvector.psycopg import register_vector
+        except ImportError:
+            pass
+        else:
+            # Binary dumpers for numpy arrays, used by the bulk COPY path.
+            register_vector(conn)
+        return conn
 
-    def insert(self, collection: str, vectors: list[list[float]], metadata: list[dict[str, Any]], ids: list[str] | None = None) -> None:
-        import psycopg
-        import json
+    def _binary_vectors(self, conn: Any) -> bool:
+        return conn.adapters.types.get("vector") is not None
 
+    def create_collection(self, name: str, dimension: int, **kwargs) -> None:
+        """
+        quantization="float16" keeps full-precision rows in the table and
+        indexes them as halfvec (pgvector >= 0.7): create_index() builds the
+        ANN index on `vector::halfvec`, which halves its size, and search()
+        re-ranks the index's shortlist on the stored vectors.
+        """
+        quantization = _quantization(kwargs.get("quantization"), {"float16"})
+        with self.pool.connection() as conn:
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {name} (id TEXT PRIMARY KEY, vector vector({dimension}), metadata JSONB)")
+            # Serves the `metadata @> ...` containment predicates search() filters with.
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {name}_metadata_gin ON {name} USING gin (metadata jsonb_path_ops)")
+        self._settings.pop(name, None)
+        if quantization is not None:
+            self._update_settings(name, quantization=quantization, dimension=dimension)
+
+    def _read_settings(self, conn: Any, collection: str) -> dict[str, Any]:
+        row = conn.execute("SELECT obj_description(to_regclass(%s), 'pg_class')", (collection,)).fetchone()
+        try:
+            return json.loads(row[0]) if row and row[0] else {}
+        except ValueError:
+            return {}
+
+    def _load_settings(self, collection: str) -> dict[str, Any]:
+        with self.pool.connection() as conn:
+            return self._read_settings(conn, collection)
+
+    def _save_settings(self, collection: str, settings: dict[str, Any]) -> None:
+        # Kept in the table comment so every agent process sees it.
+        comment = json.dumps(settings).replace("'", "''")
+        with self.pool.connection() as conn:
+            conn.execute(f"COMMENT ON TABLE {collection} IS '{comment}'")
+
+    def _halfvec_dimension(self, conn: Any, collection: str) -> int | None:
+        """Dimension of a float16-quantized collection (from its table comment), None otherwise."""
+        settings = self._settings.get(collection)
+        if settings is None:
+            # Read on the caller's connection rather than borrowing a second one from the pool.
+            settings = self._settings[collection] = self._read_settings(conn, collection)
+        return settings.get("dimension") if settings.get("quantization") == "float16" else None
+
+    def insert(self, collection: str, vectors: Matrix, metadata: list[dict[str, Any]], ids: list[str] | None = None) -> None:
+        """
+        Upsert in batches of PGVECTOR_INSERT_BATCH_SIZE: each batch is COPYed
+        (binary when the pgvector adapter is installed, text otherwise) into
+        a temp staging table and merged with one INSERT ... ON CONFLICT.
+        """
         if not ids:
             ids = [str(i) for i in range(len(vectors))]
-        
-        with psycopg.connect(self.conn_str) as conn:
-            with conn.cursor() as cur:
-                for id_, vec, meta in zip(ids, vectors, metadata):
-                    vec_str = "[" + ",".join(map(str, vec)) + "]"
-                    cur.execute(f"INSERT INTO {collection} (id, vector, metadata) VALUES (%s, %s, %s) ON CONFLICT (id) DO UPDATE SET vector = EXCLUDED.vector, metadata = EXCLUDED.metadata", (id_, vec_str, json.dumps(meta)))
-                conn.commit()
-
-    def search(self, collection: str, query_vector: list[float], top_k: int = 10, filter_dict: dict[str, Any] | None = None) -> list[dict[str, Any]]:
-        import psycopg
-
-        vec_str = "[" + ",".join(map(str, query_vector)) + "]"
-        with psycopg.connect(self.conn_str) as conn:
-            with conn.cursor() as cur:
-                cur.execute(f"SELECT id, vector <-> %s AS distance, metadata FROM {collection} ORDER BY distance LIMIT %s", (vec_str, top_k))
+        rows = list(zip(ids, vectors, metadata))
+
+        with self.pool.connection() as conn:
+            binary = self._binary_vectors(conn)
+            conn.execute(
+                f"CREATE TEMP TABLE IF NOT EXISTS {self.STAGING_TABLE} "
+                "(ord INT, id TEXT, vector vector, metadata JSONB) ON COMMIT DELETE ROWS"
+            )
+            for start in range(0, len(rows), self.batch_size):
+                with conn.transaction():
+                    self._copy_batch(conn, rows[start:start + self.batch_size], start, binary)
+                    # DISTINCT ON keeps the last occurrence of an id repeated within the batch;
+                    # ON CONFLICT cannot touch the same row twice in one statement.
+                    conn.execute(
+                        f"INSERT INTO {collection} (id, vector, metadata) "
+                        f"SELECT DISTINCT ON (id) id, vector, metadata FROM {self.STAGING_TABLE} "
+                        "ORDER BY id, ord DESC "
+                        "ON CONFLICT (id) DO UPDATE SET vector = EXCLUDED.vector, metadata = EXCLUDED.metadata"
+                    )
+
+    def _copy_batch(self, conn: Any, rows: list[tuple[str, Any, dict[str, Any]]], offset: int, binary: bool) -> None:
+        columns = f"COPY {self.STAGING_TABLE} (ord, id, vector, metadata) FROM STDIN"
+        with conn.cursor() as cur:
+            if binary:
+                from psycopg.types.json import Jsonb
+
+                with cur.copy(columns + " (FORMAT BINARY)") as copy:
+                    copy.set_types(["int4", "text", "vector", "jsonb"])
+                    for i, (id_, vec, meta) in enumerate(rows, offset):
+                        copy.write_row((i, id_, np.asarray(vec, dtype=np.float32), Jsonb(meta)))
+            else:
+                with cur.copy(columns) as copy:
+                    for i, (id_, vec, meta) in enumerate(rows, offset):
+                        copy.write_row((i, id_, "[" + ",".join(map(str, vec)) + "]", json.dumps(meta)))
+
+    def search(self, collection: str, query_vector: Vector, top_k: int = 10, filter_dict: dict[str, Any] | None = None, search_params: dict[str, Any] | None = None) -> list[dict[str, Any]]:
+        params = self._search_params(collection, search_params)
+        where, where_params = to_pg_where(parse_filter(filter_dict))
+        with self.pool.connection() as conn:
+            if self._binary_vectors(conn):
+                query: Any = np.asarray(query_vector, dtype=np.float32)
+            else:
+                query = "[" + ",".join(map(str, query_vector)) + "]"
+            # SET LOCAL scopes the knobs to this transaction, so they never leak to
+            # the next borrower of the pooled connection.
+            with conn.transaction(), conn.cursor() as cur:
+                if "ef" in params:
+                    cur.execute(f"SET LOCAL hnsw.ef_search = {params['ef']}")
+                if "nprobe" in params:
+                    cur.execute(f"SET LOCAL ivfflat.probes = {params['nprobe']}")
+                if where_params and self.iterative_scan:
+                    cur.execute("SET LOCAL hnsw.iterative_scan = strict_order")
+                    cur.execute("SET LOCAL ivfflat.iterative_scan = relaxed_order")
+                half = self._halfvec_dimension(conn, collection)
+                # prepare=True: parsed and planned once per pooled connection and query shape,
+                # then executed by name (psycopg keeps up to prepared_max statements per session).
+                if half is None:
+                    cur.execute(
+                        f"SELECT id, vector <-> %s::vector AS distance, metadata FROM {collection} WHERE {where} ORDER BY distance LIMIT %s",
+                        (query, *where_params, top_k),
+                        prepare=True,
+                    )
+                else:
+                    # The halfvec index picks rerank x top_k candidates; the outer query
+                    # orders them by their exact distance.
+                    shortlist = top_k * max(self._rerank(collection, params) or 1, 1)
+                    cur.execute(
+                        f"SELECT id, vector <-> %s::vector AS distance, metadata FROM ("
+                        f"SELECT id, vector, metadata FROM {collection} WHERE {where} "
+                        f"ORDER BY vector::halfvec({half}) <-> %s::vector::halfvec({half}) LIMIT %s"
+                        ") shortlist ORDER BY distance LIMIT %s",
+                        (query, *where_params, query, shortlist, top_k),
+                        prepare=True,
+                    )
                 rows = cur.fetchall()
                 return [{"id": row[0], "score": row[1], "metadata": row[2]} for row in rows]
 
-    def delete(self, collection: str, ids: list[str]) -> None:
-        import psycopg
+    def exact_search_batch(self, collection: str, query_vectors: Matrix, top_k: int = 10) -> list[list[dict[str, Any]]]:
+        results = []
+        with self.pool.connection() as conn:
+            binary = self._binary_vectors(conn)
+            with conn.transaction(), conn.cursor() as cur:
+                # Sequential scan over the stored vectors: the ground truth the ANN index is measured against.
+                cur.execute("SET LOCAL enable_indexscan = off")
+                for q in query_vectors:
+                    query = np.asarray(q, dtype=np.float32) if binary else "[" + ",".join(map(str, q)) + "]"
+                    cur.execute(
+                        f"SELECT id, vector <-> %s::vector AS distance, metadata FROM {collection} ORDER BY distance LIMIT %s",
+                        (query, top_k),
+                    )
+                    results.append([{"id": row[0], "score": row[1], "metadata": row[2]} for row in cur.fetchall()])
+        return results
 
-        with psycopg.connect(self.conn_str) as conn:
-            with conn.cursor() as cur:
-                cur.execute(f"DELETE FROM {collection} WHERE id = ANY(%s)", (ids,))
-                conn.commit()
+    def delete(self, collection: str, ids: list[str]) -> None:
+        with self.pool.connection() as conn:
+            conn.execute(f"DELETE FROM {collection} WHERE id = ANY(%s)", (ids,))
+
+    def drop_collection(self, name: str) -> None:
+        with self.pool.connection() as conn:
+            conn.execute(f"DROP TABLE IF EXISTS {name}")
+        self._settings.pop(name, None)
+
+    def create_index(self, collection: str, index_type: str = "hnsw", **params: Any) -> dict[str, Any]:
+        params = _index_params(index_type, params)
+        with self.pool.connection() as conn:
+            half = self._halfvec_dimension(conn, collection)
+        # vector_l2_ops matches the `<->` operator used by search(); float16 collections
+        # index the halfvec expression their search() orders the shortlist by.
+        column = "vector vector_l2_ops" if half is None else f"(vector::halfvec({half})) halfvec_l2_ops"
+        if index_type == "hnsw":
+            method = f"hnsw ({column}) WITH (m = {params['m']}, ef_construction = {params['ef_construction']})"
+        else:
+            method = f"ivfflat ({column}) WITH (lists = {params['nlist']})"
+        with self.pool.connection() as conn:
+            # Replace any previous ANN index; CONCURRENTLY keeps inserts flowing during the build.
+            for other in ("hnsw", "ivf"):
+                conn.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {collection}_vector_{other}_idx")
+            conn.execute(f"CREATE INDEX CONCURRENTLY {collection}_vector_{index_type}_idx ON {collection} USING {method}")
+        return {"index_type": index_type, **params}
+
+    def footprint(self, collection: str) -> dict[str, Any]:
+        with self.pool.connection() as conn:
+            half = self._halfvec_dimension(conn, collection)
+            table_bytes, index_bytes = conn.execute("SELECT pg_table_size(%s), pg_indexes_size(%s)", (collection, collection)).fetchone()
+            rows = conn.execute(f"SELECT count(*) FROM {collection}").fetchone()[0]
+        return {
+            "backend": "pgvector",
+            "collection": collection,
+            "quantization": "float16" if half is not None else None,
+            "rows": rows,
+            "table_bytes": table_bytes,
+            "index_bytes": index_bytes,
+            "total_bytes": table_bytes + index_bytes,
+        }
 
     def health_check(self) -> dict[str, Any]:
-        import psycopg
-
-        with psycopg.connect(self.conn_str) as conn:
+        # Also tops the pool back up to min_size after recycling or a database restart.
+        self.pool.warm()
+        with self.pool.connection() as conn:
             with conn.cursor() as cur:
                 cur.execute("SELECT tablename FROM pg_tables WHERE schemaname = 'public'")
                 tables = [row[0] for row in cur.fetchall()]
-                return {"ok": True, "backend": "pgvector", "tables": tables}
+        return {"ok": True, "backend": "pgvector", "tables": tables, "pool": self.pool.stats()}
+
+    def close(self) -> None:
+        self.pool.close()
+
+    def score_to_similarity(self, score: float) -> float:
+        # `<->` is plain (not squared) Euclidean distance.
+        return 1.0 - score * score / 2.0
 
 
 class PineconeStore(VectorStore):
@@ -288,32 +1093,49 @@ class PineconeStore(VectorStore):
         if not api_key:
             raise ValueError("PINECONE_API_KEY environment variable is required")
         
+        super().__init__()
         self.pc = Pinecone(api_key=api_key)
+        self._indexes = HandleCache()
 
     def create_collection(self, name: str, dimension: int, **kwargs) -> None:
         from pinecone import ServerlessSpec
 
+        _quantization(kwargs.get("quantization"), set())
         environment = os.getenv("PINECONE_ENVIRONMENT", "us-east-1")
+        self._indexes.invalidate(name)
         self.pc.create_index(name=name, dimension=dimension, metric="cosine", spec=ServerlessSpec(cloud="aws", region=environment))
 
-    def insert(self, collection: str, vectors: list[list[float]], metadata: list[dict[str, Any]], ids: list[str] | None = None) -> None:
-        index = self.pc.Index(collection)
+    def _index(self, collection: str) -> Any:
+        # Index() resolves the index host via the control plane on construction.
+        return self._indexes.get(collection, lambda: self.pc.Index(collection))
+
+    def insert(self, collection: str, vectors: Matrix, metadata: list[dict[str, Any]], ids: list[str] | None = None) -> None:
+        index = self._index(collection)
         if not ids:
             ids = [str(i) for i in range(len(vectors))]
-        index.upsert(vectors=[(id_, vec, meta) for id_, vec, meta in zip(ids, vectors, metadata)])
+        index.upsert(vectors=[(id_, vec, meta) for id_, vec, meta in zip(ids, _as_list(vectors), metadata)])
 
-    def search(self, collection: str, query_vector: list[float], top_k: int = 10, filter_dict: dict[str, Any] | None = None) -> list[dict[str, Any]]:
-        index = self.pc.Index(collection)
-        results = index.query(vector=query_vector, top_k=top_k, filter=filter_dict, include_metadata=True)
+    def search(self, collection: str, query_vector: Vector, top_k: int = 10, filter_dict: dict[str, Any] | None = None, search_params: dict[str, Any] | None = None) -> list[dict[str, Any]]:
+        index = self._index(collection)
+        results = index.query(vector=_as_list(query_vector), top_k=top_k, filter=to_mongo(parse_filter(filter_dict)), include_metadata=True)
         return [{"id": match["id"], "score": match["score"], "metadata": match.get("metadata", {})} for match in results["matches"]]
 
     def delete(self, collection: str, ids: list[str]) -> None:
-        index = self.pc.Index(collection)
+        index = self._index(collection)
         index.delete(ids=ids)
 
+    def drop_collection(self, name: str) -> None:
+        self._indexes.invalidate(name)
+        self._settings.pop(name, None)
+        self.pc.delete_index(name)
+
     def health_check(self) -> dict[str, Any]:
         indexes = self.pc.list_indexes()
-        return {"ok": True, "backend": "pinecone", "indexes": [idx["name"] for idx in indexes]}
+        return {"ok": True, "backend": "pinecone", "indexes": [idx["name"] for idx in indexes], "handle_cache": self._indexes.stats()}
+
+    def score_to_similarity(self, score: float) -> float:
+        # Indexes are created with metric="cosine"; the score is the similarity.
+        return score
 
 
 class VectorStoreFactory:
@@ -335,8 +1157,12 @@ class VectorStoreFactory:
             return PGVectorStore()
         elif backend == "pinecone":
             return PineconeStore()
+        elif backend == "numpy":
+            from app.numpy_store import NumpyVectorStore
+
+            return NumpyVectorStore()
         else:
-            raise ValueError(f"Unknown vector database backend: {backend}. Supported: lancedb, milvus, chroma, qdrant, pgvector, pinecone")
+            raise ValueError(f"Unknown vector database backend: {backend}. Supported: lancedb, milvus, chroma, qdrant, pgvector, pinecone, numpy")
 
 
 # Convenience function for quick access
@@ -0,0 +1,84 @@
+"""
+Compact wire formats for the /vector/* endpoints.
+
+Besides JSON float lists, vectors can be sent as raw little-endian float32 or
+float16 bytes (row-major), either base64-encoded inside a JSON body or as
+native binary in a MessagePack body (Content-Type: application/msgpack).
+Both decode with a single np.frombuffer() into a float32 matrix that is
+handed to the vector store as-is, skipping per-float JSON parsing and Python
+list construction.
+
+MessagePack support needs the optional `msgpack` package; without it such
+requests get 415.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+import numpy as np
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Little-endian regardless of host byte order.
+DTYPES = {"float32": np.dtype("<f4"), "float16": np.dtype("<f2")}
+
+MSGPACK_CONTENT_TYPES = {"application/msgpack", "application/x-msgpack", "application/vnd.msgpack"}
+
+
+class VectorDecodeError(ValueError):
+    """The binary vector payload does not match its declared dtype/dimension."""
+
+
+def is_msgpack(content_type: str | None) -> bool:
+    return (content_type or "").split(";")[0].strip().lower() in MSGPACK_CONTENT_TYPES
+
+
+def unpack_msgpack(body: bytes) -> Any:
+    if msgpack is None:
+        raise RuntimeError("msgpack is not installed")
+    return msgpack.unpackb(body, raw=False)
+
+
+def pack_msgpack(payload: Any) -> bytes:
+    if msgpack is None:
+        raise RuntimeError("msgpack is not installed")
+    return msgpack.packb(payload, use_bin_type=True)
+
+
+def decode_matrix(data: bytes, dtype: str = "float32", dimension: int | None = None) -> np.ndarray:
+    """
+    Decode row-major little-endian vectors into an (n, dimension) float32
+    array. Without a dimension the payload is taken as a single vector.
+    """
+    try:
+        wire = DTYPES[dtype]
+    except KeyError:
+        raise VectorDecodeError(f"Unsupported dtype {dtype!r}; supported: {sorted(DTYPES)}")
+    if len(data) % wire.itemsize:
+        raise VectorDecodeError(f"{len(data)} bytes is not a whole number of {dtype} values")
+
+    flat = np.frombuffer(data, dtype=wire)
+    if dimension is None:
+        dimension = flat.size
+    if dimension <= 0 or flat.size % dimension:
+        raise VectorDecodeError(f"{flat.size} values do not divide into vectors of dimension {dimension}")
+    # astype() copies into native float32, so the result no longer aliases the request body.
+    return flat.reshape(-1, dimension).astype(np.float32)
+
+
+def as_matrix(vectors: Any) -> np.ndarray:
+    """JSON float lists -> (n, d) float32 array; ragged input is rejected."""
+    try:
+        matrix = np.asarray(vectors, dtype=np.float32)
+    except ValueError:
+        raise VectorDecodeError("All vectors must have the same dimension")
+    if matrix.ndim == 1:
+        # A single vector, or an empty list of vectors.
+        matrix = matrix.reshape(1, -1) if matrix.size else matrix.reshape(0, 0)
+    if matrix.ndim != 2:
+        raise VectorDecodeError("Vectors must be a list of equal-length float lists")
+    return matrix
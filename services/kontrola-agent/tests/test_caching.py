@@ -0,0 +1,140 @@
+import asyncio
+
+import numpy as np
+
+from app.caching import ReadThroughCache, SemanticCache, SingleFlight
+
+
+class FakeRedis:
+    def __init__(self) -> None:
+        self.data: dict[str, str] = {}
+
+    def get(self, key: str) -> str | None:
+        return self.data.get(key)
+
+    def set(self, key: str, value: str, ex: int | None = None) -> None:
+        self.data[key] = value
+
+
+class BrokenRedis:
+    def get(self, key: str) -> str | None:
+        raise ConnectionError("redis down")
+
+    def set(self, key: str, value: str, ex: int | None = None) -> None:
+        raise ConnectionError("redis down")
+
+
+def test_single_flight_runs_concurrent_calls_once() -> None:
+    calls = 0
+
+    async def load() -> str:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return "value"
+
+    async def run() -> list[tuple[str, bool]]:
+        flight = SingleFlight()
+        return await asyncio.gather(*(flight.do("k", load) for _ in range(5)))
+
+    results = asyncio.run(run())
+    assert calls == 1
+    assert [r for r, _ in results] == ["value"] * 5
+    assert sum(shared for _, shared in results) == 4
+
+
+def test_read_through_cache_hits_after_first_load() -> None:
+    redis = FakeRedis()
+    cache = ReadThroughCache(redis, namespace="test", ttl=60)
+    calls = 0
+
+    async def load() -> dict[str, int]:
+        nonlocal calls
+        calls += 1
+        return {"n": 1}
+
+    async def run() -> None:
+        assert await cache.get_or_load("a", load) == {"n": 1}
+        assert await cache.get_or_load("a", load) == {"n": 1}
+
+    asyncio.run(run())
+    assert calls == 1
+    assert "test:a" in redis.data
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_read_through_cache_coalesces_stampede() -> None:
+    cache = ReadThroughCache(FakeRedis(), namespace="test")
+    calls = 0
+
+    async def load() -> int:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return 42
+
+    async def run() -> list[int]:
+        return await asyncio.gather(*(cache.get_or_load("hot", load) for _ in range(10)))
+
+    assert asyncio.run(run()) == [42] * 10
+    assert calls == 1
+    assert cache.stats()["coalesced"] == 9
+
+
+def test_read_through_cache_falls_back_when_redis_fails() -> None:
+    cache = ReadThroughCache(BrokenRedis(), namespace="test", retry_after=60)
+
+    async def load() -> str:
+        return "fresh"
+
+    assert asyncio.run(cache.get_or_load("k", load)) == "fresh"
+    stats = cache.stats()
+    assert stats["errors"] == 1
+    assert stats["redis_enabled"] is False
+
+
+class FakeVectorStore:
+    """Brute-force cosine store standing in for a real backend."""
+
+    def __init__(self) -> None:
+        self.rows: list[tuple[list[float], dict]] = []
+
+    def create_collection(self, name: str, dimension: int, **kwargs) -> None:
+        pass
+
+    def insert(self, collection, vectors, metadata, ids=None) -> None:
+        self.rows.extend(zip(vectors, metadata))
+
+    def search(self, collection, query_vector, top_k=10, filter_dict=None):
+        scored = [
+            {"id": str(i), "score": float(np.dot(vec, query_vector)), "metadata": meta}
+            for i, (vec, meta) in enumerate(self.rows)
+        ]
+        return sorted(scored, key=lambda r: -r["score"])[:top_k]
+
+    def score_to_similarity(self, score: float) -> float:
+        return score
+
+
+def test_semantic_cache_reuses_answer_for_near_duplicate_text() -> None:
+    vectors = {"buy shoes": [1.0, 0.0], "buy shoes!": [0.99, 0.05], "weather": [0.0, 1.0]}
+
+    async def embed(text: str) -> list[float]:
+        return vectors[text]
+
+    cache = SemanticCache(FakeVectorStore(), embed, collection="c", threshold=0.95)
+
+    async def run() -> tuple:
+        await cache.remember("scope", "buy shoes", {"text": "answer"})
+        near, _ = await cache.lookup("scope", "buy shoes!")
+        far, _ = await cache.lookup("scope", "weather")
+        other_scope, _ = await cache.lookup("other", "buy shoes")
+        return near, far, other_scope
+
+    near, far, other_scope = asyncio.run(run())
+    assert near == {"text": "answer"}
+    assert far is None
+    assert other_scope is None
+    assert cache.stats()["hits"] == 1
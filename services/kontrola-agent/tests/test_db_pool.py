@@ -0,0 +1,121 @@
+import threading
+
+import pytest
+
+from app.db_pool import ConnectionPool, PoolConnectionError, PoolExhaustedError
+
+
+class FakeConn:
+    def __init__(self) -> None:
+        self.closed = False
+        self.healthy = True
+
+    def close(self) -> None:
+        self.closed = True
+
+
+def test_connections_are_reused() -> None:
+    created: list[FakeConn] = []
+
+    def factory() -> FakeConn:
+        created.append(FakeConn())
+        return created[-1]
+
+    pool = ConnectionPool(factory, size=2)
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        pass
+
+    assert first is second
+    assert len(created) == 1
+    assert pool.stats()["acquired"] == 2
+
+
+def test_exhausted_pool_raises_after_timeout() -> None:
+    pool = ConnectionPool(FakeConn, size=1, acquire_timeout=0.05)
+    with pool.connection():
+        with pytest.raises(PoolExhaustedError):
+            with pool.connection():
+                pass
+
+    stats = pool.stats()
+    assert stats["timeouts"] == 1
+    assert stats["in_use"] == 0
+
+
+def test_waiter_gets_released_connection() -> None:
+    pool = ConnectionPool(FakeConn, size=1, acquire_timeout=2)
+    ready = threading.Event()
+    got: list[FakeConn] = []
+
+    def borrow() -> None:
+        ready.wait()
+        with pool.connection() as conn:
+            got.append(conn)
+
+    with pool.connection() as held:
+        t = threading.Thread(target=borrow)
+        t.start()
+        ready.set()
+    t.join(timeout=2)
+
+    assert got == [held]
+
+
+def test_recycles_connections_past_max_lifetime() -> None:
+    pool = ConnectionPool(FakeConn, size=1, max_lifetime=0.000001)
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        pass
+
+    assert first is not second
+    assert first.closed
+    assert pool.stats()["recycled"] == 1
+
+
+def test_unhealthy_idle_connection_is_replaced() -> None:
+    pool = ConnectionPool(FakeConn, size=1, ping=lambda c: c.healthy, ping_interval=0)
+    with pool.connection() as first:
+        first.healthy = False
+    with pool.connection() as second:
+        pass
+
+    assert first is not second
+    assert pool.stats()["failed_health_checks"] == 1
+
+
+def test_connection_is_discarded_when_block_raises() -> None:
+    pool = ConnectionPool(FakeConn, size=1)
+    with pytest.raises(ValueError):
+        with pool.connection() as conn:
+            raise ValueError("boom")
+
+    assert conn.closed
+    assert pool.stats()["idle"] == 0
+    assert pool.stats()["discarded"] == 1
+
+
+def test_factory_failure_frees_slot() -> None:
+    def factory() -> FakeConn:
+        raise OSError("db down")
+
+    pool = ConnectionPool(factory, size=1, acquire_timeout=0.05)
+    for _ in range(2):
+        with pytest.raises(PoolConnectionError):
+            with pool.connection():
+                pass
+
+
+def test_warm_fills_to_min_size_and_reports_utilization() -> None:
+    pool = ConnectionPool(FakeConn, size=4, min_size=2)
+    assert pool.warm() == 2
+    assert pool.warm() == 0
+
+    with pool.connection():
+        stats = pool.stats()
+    assert stats["created"] == 2
+    assert stats["in_use"] == 1
+    assert stats["idle"] == 1
+    assert stats["utilization"] == 0.25
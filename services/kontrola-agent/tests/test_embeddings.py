@@ -0,0 +1,105 @@
+import asyncio
+import base64
+import json
+
+import httpx
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+from app.caching import ReadThroughCache
+from app.embeddings import EmbeddingService, MicroBatcher
+from app.llm import OpenAICompatibleClient, UpstreamScheduler
+
+
+class FakeRedis:
+    def __init__(self) -> None:
+        self.data: dict[str, str] = {}
+
+    def mget(self, keys: list[str]) -> list[str | None]:
+        return [self.data.get(k) for k in keys]
+
+    def pipeline(self, transaction: bool = True) -> "FakeRedis":
+        return self
+
+    def set(self, key: str, value: str, ex: int | None = None) -> None:
+        self.data[key] = value
+
+    def execute(self) -> None:
+        pass
+
+
+def _fake_model(calls: list[list[str]]):
+    async def embed_batch(texts: list[str]) -> list[list[float]]:
+        calls.append(texts)
+        return [[float(len(t)), 1.0] for t in texts]
+
+    return embed_batch
+
+
+def test_concurrent_requests_share_one_model_call() -> None:
+    calls: list[list[str]] = []
+    batcher = MicroBatcher(_fake_model(calls), max_batch=100, max_wait=0.01)
+
+    async def run() -> list[list[list[float]]]:
+        return await asyncio.gather(batcher.submit(["a", "bb"]), batcher.submit(["bb", "ccc"]), batcher.submit(["a"]))
+
+    results = asyncio.run(run())
+    assert calls == [["a", "bb", "ccc"]]
+    assert results == [[[1.0, 1.0], [2.0, 1.0]], [[2.0, 1.0], [3.0, 1.0]], [[1.0, 1.0]]]
+    assert batcher.stats()["avg_batch"] == 3.0
+
+
+def test_full_batch_is_sent_without_waiting() -> None:
+    calls: list[list[str]] = []
+    batcher = MicroBatcher(_fake_model(calls), max_batch=2, max_wait=60)
+
+    asyncio.run(asyncio.wait_for(batcher.submit(["a", "b", "c", "d"]), timeout=1))
+    assert calls == [["a", "b"], ["c", "d"]]
+
+
+def test_cached_texts_skip_the_model() -> None:
+    calls: list[list[str]] = []
+    cache = ReadThroughCache(FakeRedis(), namespace="test:embed")
+    service = EmbeddingService("openai", "m", _fake_model(calls), cache, max_wait=0)
+
+    first, cached = asyncio.run(service.embed(["a", "bb", "a"]))
+    assert first == [[1.0, 1.0], [2.0, 1.0], [1.0, 1.0]] and cached == 0
+    second, cached = asyncio.run(service.embed(["bb", "new"]))
+    assert second == [[2.0, 1.0], [3.0, 1.0]] and cached == 1
+    assert calls == [["a", "bb"], ["new"]]
+
+
+def test_embed_endpoint_batches_upstream(monkeypatch: pytest.MonkeyPatch) -> None:
+    seen: list[list[str]] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        texts = json.loads(request.content)["input"]
+        seen.append(texts)
+        data = [{"index": i, "embedding": [float(i), 0.5]} for i in range(len(texts))]
+        return httpx.Response(200, json={"data": data})
+
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.delenv("KONTROLA_AGENT_SHARED_SECRET", raising=False)
+    monkeypatch.delenv("EMBEDDING_BACKEND", raising=False)
+    monkeypatch.setattr(main, "llm_scheduler", UpstreamScheduler("openai", backoff_base=0.0))
+    monkeypatch.setattr(
+        main, "llm_client", OpenAICompatibleClient("http://llm.test/v1", "sk", http2=False, transport=httpx.MockTransport(handler))
+    )
+    monkeypatch.setattr(main, "embed_cache", ReadThroughCache(None, namespace="test:embed"))
+    monkeypatch.setattr(main, "embedding_service", None)
+    client = TestClient(main.app)
+
+    r = client.post("/embed", json={"texts": ["x", "y", "x"]})
+    assert r.status_code == 200
+    body = r.json()
+    assert seen == [["x", "y"]]
+    assert body["embeddings"] == [[0.0, 0.5], [1.0, 0.5], [0.0, 0.5]]
+    assert body["dimension"] == 2
+
+    r = client.post("/embed", json={"texts": ["y"], "encoding_format": "base64"})
+    matrix = np.frombuffer(base64.b64decode(r.json()["embeddings"]), dtype="<f4").reshape(-1, 2)
+    assert matrix.tolist() == [[0.0, 0.5]]
+
+    assert client.post("/embed", json={"texts": []}).status_code == 400
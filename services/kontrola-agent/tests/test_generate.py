@@ -0,0 +1,123 @@
+import json
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+from app.caching import ReadThroughCache
+from app.llm import OpenAICompatibleClient, UpstreamScheduler
+
+
+def _mock_llm(handler) -> OpenAICompatibleClient:
+    return OpenAICompatibleClient(
+        "http://llm.test/v1", "sk-test", http2=False, transport=httpx.MockTransport(handler)
+    )
+
+
+@pytest.fixture
+def client(monkeypatch: pytest.MonkeyPatch) -> TestClient:
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.delenv("KONTROLA_AGENT_SHARED_SECRET", raising=False)
+    monkeypatch.setattr(main, "llm_scheduler", UpstreamScheduler("openai", backoff_base=0.0))
+    return TestClient(main.app)
+
+
+def test_generate_uses_shared_client_and_base_url(client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    seen: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request)
+        return httpx.Response(200, json={"choices": [{"message": {"content": "hello"}}]})
+
+    monkeypatch.setattr(main, "llm_client", _mock_llm(handler))
+
+    for _ in range(2):
+        r = client.post("/generate", json={"prompt": "hi"})
+        assert r.status_code == 200
+        assert r.json()["text"] == "hello"
+
+    assert [str(req.url) for req in seen] == ["http://llm.test/v1/chat/completions"] * 2
+    assert seen[0].headers["Authorization"] == "Bearer sk-test"
+
+
+def test_generate_maps_upstream_errors_to_502(client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(main, "llm_client", _mock_llm(lambda request: httpx.Response(500, text="boom")))
+
+    r = client.post("/generate", json={"prompt": "hi"})
+    assert r.status_code == 502
+
+
+def test_generate_stream_forwards_tokens_as_sse(client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    chunks = [
+        'data: {"choices": [{"delta": {"content": "Hel"}}]}',
+        'data: {"choices": [{"delta": {"content": "lo"}}]}',
+        "data: [DONE]",
+    ]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert json.loads(request.content)["stream"] is True
+        return httpx.Response(200, text="\n\n".join(chunks) + "\n\n", headers={"content-type": "text/event-stream"})
+
+    monkeypatch.setattr(main, "llm_client", _mock_llm(handler))
+
+    r = client.post("/generate/stream", json={"prompt": "hi"})
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/event-stream")
+
+    events = [block.split("\n") for block in r.text.strip().split("\n\n")]
+    assert [e[0] for e in events] == ["event: token", "event: token", "event: done"]
+    done = json.loads(events[-1][1][len("data: "):])
+    assert done["text"] == "Hello"
+    assert done["provider"].startswith("openai:")
+
+
+class _DictRedis:
+    def __init__(self) -> None:
+        self.data: dict[str, str] = {}
+
+    def get(self, key: str) -> str | None:
+        return self.data.get(key)
+
+    def set(self, key: str, value: str, ex: int | None = None) -> None:
+        self.data[key] = value
+
+
+def test_generate_serves_repeated_prompt_from_exact_cache(client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    calls = 0
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal calls
+        calls += 1
+        return httpx.Response(200, json={"choices": [{"message": {"content": "cached answer"}}]})
+
+    monkeypatch.setattr(main, "llm_client", _mock_llm(handler))
+    monkeypatch.setattr(main, "generate_cache", ReadThroughCache(_DictRedis(), namespace="test:generate"))
+
+    first = client.post("/generate", json={"prompt": "same prompt"}).json()
+    second = client.post("/generate", json={"prompt": "same prompt"}).json()
+
+    assert calls == 1
+    assert first["provider"].startswith("openai:")
+    assert second == {"text": "cached answer", "provider": "cache:exact"}
+
+
+def test_generate_miss_embeds_prompt_once(client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    from app.caching import SemanticCache
+    from test_caching import FakeVectorStore
+
+    embedded: list[str] = []
+
+    async def embed(text: str) -> list[float]:
+        embedded.append(text)
+        return [1.0, 0.0]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={"choices": [{"message": {"content": "fresh"}}]})
+
+    monkeypatch.setattr(main, "llm_client", _mock_llm(handler))
+    monkeypatch.setattr(main, "generate_cache", ReadThroughCache(_DictRedis(), namespace="test:generate"))
+    monkeypatch.setattr(main, "semantic_generate_cache", SemanticCache(FakeVectorStore(), embed, collection="c"))
+
+    assert client.post("/generate", json={"prompt": "new prompt"}).json()["text"] == "fresh"
+    assert embedded == ["new prompt"]
@@ -0,0 +1,129 @@
+import asyncio
+
+import pytest
+
+from app.ingest import Document, IngestManager, IngestManifest, chunk_text
+from app.numpy_store import NumpyVectorStore
+
+
+async def fake_embed(texts: list[str]) -> list[list[float]]:
+    await asyncio.sleep(0)
+    return [[float(len(t)), 1.0] for t in texts]
+
+
+def test_chunks_overlap_and_cut_on_whitespace() -> None:
+    text = " ".join(f"w{i:02d}" for i in range(30))  # 30 words of 3 chars
+    chunks = list(chunk_text(text, size=20, overlap=5))
+    assert all(len(c) <= 20 for c in chunks)
+    assert chunks[0] == "w00 w01 w02 w03 w04"
+    assert chunks[1].startswith("w04")
+    assert chunks[-1].endswith("w29")
+    assert list(chunk_text("  short  ", size=20, overlap=5)) == ["short"]
+    with pytest.raises(ValueError):
+        list(chunk_text(text, size=10, overlap=10))
+
+
+def test_job_chunks_embeds_and_upserts_every_document(tmp_path) -> None:
+    store = NumpyVectorStore(tmp_path)
+    manager = IngestManager(store, fake_embed, batch_size=3, embed_workers=2, upsert_workers=2, queue_depth=1)
+    documents = [Document(f"d{i}", "alpha beta gamma delta " * 10, {"site": i}) for i in range(5)]
+
+    async def run():
+        job = manager.submit("docs", documents, chunk_size=50, chunk_overlap=10)
+        assert job.status == "queued"
+        return await manager.wait(job.id)
+
+    job = asyncio.run(run())
+    progress = job.progress()
+    assert progress["status"] == "done", progress["error"]
+    assert progress["documents_chunked"] == 5
+    assert progress["chunks"] == progress["chunks_embedded"] == progress["chunks_upserted"] > 5
+    assert progress["progress"] == 1.0
+
+    hits = store.search("docs", [0.0, 1.0], top_k=100, filter_dict={"doc_id": "d3"})
+    assert sorted(h["id"] for h in hits) == [f"d3:{i}" for i in range(progress["chunks"] // 5)]
+    assert hits[0]["metadata"]["site"] == 3
+
+
+def test_failed_stage_stops_the_job(tmp_path) -> None:
+    async def broken_embed(texts: list[str]) -> list[list[float]]:
+        raise RuntimeError("model down")
+
+    manager = IngestManager(NumpyVectorStore(tmp_path), broken_embed, batch_size=1, queue_depth=1)
+    documents = [Document(str(i), "some text") for i in range(20)]
+
+    async def run():
+        job = manager.submit("docs", documents)
+        return await asyncio.wait_for(manager.wait(job.id), timeout=2)
+
+    job = asyncio.run(run())
+    assert job.status == "failed" and job.error == "model down"
+    assert job.chunks_upserted == 0
+
+
+def test_reindex_skips_unchanged_and_removes_stale_chunks(tmp_path) -> None:
+    store = NumpyVectorStore(tmp_path / "store")
+    manifest = IngestManifest(tmp_path / "manifest.sqlite3")
+    embedded: list[str] = []
+
+    async def embed(texts: list[str]) -> list[list[float]]:
+        embedded.extend(texts)
+        return await fake_embed(texts)
+
+    def ingest(documents, model="m1", **kwargs) -> dict:
+        manager = IngestManager(store, embed, model=model, manifest=manifest, batch_size=2)
+
+        async def run():
+            job = manager.submit("docs", documents, chunk_size=20, chunk_overlap=0, **kwargs)
+            return await manager.wait(job.id)
+
+        return asyncio.run(run()).progress()
+
+    long_text = "one two three four five six seven eight nine ten"
+    first = ingest([Document("a", long_text), Document("b", "beta"), Document("c", "gamma")])
+    assert first["chunks_upserted"] == 5
+    assert manifest.entries("docs")["a"].chunks == 3
+
+    embedded.clear()
+    second = ingest([Document("a", "short now"), Document("b", "beta"), Document("c", "gamma")], prune=False)
+    assert embedded == ["short now"]
+    assert second["documents_skipped"] == 2 and second["chunks_deleted"] == 2
+
+    third = ingest([Document("a", "short now"), Document("b", "beta")], prune=True)
+    assert third["documents_skipped"] == 2 and third["documents_deleted"] == 1
+    ids = sorted(h["id"] for h in store.search("docs", [0.0, 0.0], top_k=100))
+    assert ids == ["a:0", "b:0"]
+    assert set(manifest.entries("docs")) == {"a", "b"}
+
+    # A different embedding model invalidates every entry.
+    embedded.clear()
+    assert ingest([Document("a", "short now"), Document("b", "beta")], model="m2")["documents_skipped"] == 0
+    assert sorted(embedded) == ["beta", "short now"]
+
+
+def test_dropped_collection_is_fully_reindexed(tmp_path, monkeypatch: pytest.MonkeyPatch) -> None:
+    from fastapi.testclient import TestClient
+
+    from app import main
+
+    store = NumpyVectorStore(tmp_path / "store")
+    manager = IngestManager(store, fake_embed, model="m1", manifest=IngestManifest(tmp_path / "manifest.sqlite3"))
+    monkeypatch.delenv("KONTROLA_AGENT_SHARED_SECRET", raising=False)
+    monkeypatch.setattr(main, "vector_store", store)
+    monkeypatch.setattr(main, "ingest_manager", manager)
+
+    def ingest() -> dict:
+        async def run():
+            job = manager.submit("docs", [Document("a", "alpha"), Document("b", "beta")], chunk_size=20, chunk_overlap=0)
+            return await manager.wait(job.id)
+
+        return asyncio.run(run()).progress()
+
+    assert ingest()["chunks_upserted"] == 2
+    r = TestClient(main.app).delete("/vector/collection/docs")
+    assert r.status_code == 200
+    assert manager.manifest.entries("docs") == {}
+
+    again = ingest()
+    assert again["documents_skipped"] == 0 and again["chunks_upserted"] == 2
+    assert sorted(h["id"] for h in store.search("docs", [0.0, 0.0], top_k=10)) == ["a:0", "b:0"]
@@ -0,0 +1,91 @@
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+from app.lexical import LexicalIndex, LexicalIndexedStore, reciprocal_rank_fusion
+from app.numpy_store import NumpyVectorStore
+
+
+@pytest.fixture
+def index(tmp_path) -> LexicalIndex:
+    return LexicalIndex(tmp_path / "lexical.sqlite3", ["text"], ThreadPoolExecutor(max_workers=2))
+
+
+def test_bm25_ranks_rarer_terms_and_stems(index: LexicalIndex) -> None:
+    index.add("docs", ["a", "b", "c"], [
+        {"text": "caching plugins for wordpress", "lang": "en"},
+        {"text": "wordpress themes and wordpress plugins", "lang": "en"},
+        {"text": "Redis cache for WordPress", "lang": "de"},
+    ])
+
+    hits = index.search("docs", "text", "redis caches")
+    assert [h["id"] for h in hits] == ["c", "a"]
+    assert hits[0]["score"] > hits[1]["score"] > 0
+
+    assert [h["id"] for h in index.search("docs", "text", "wordpress", filter_dict={"lang": "de"})] == ["c"]
+    assert index.search("other", "text", "wordpress") == []
+    with pytest.raises(ValueError):
+        index.search("docs", "title", "wordpress")
+
+
+def test_upserts_deletes_and_drops_keep_the_index_in_step(index: LexicalIndex) -> None:
+    index.add("docs", ["a", "b"], [{"text": "alpha"}, {"text": "beta"}])
+    index.add("docs", ["a"], [{"text": "gamma"}])
+    assert index.search("docs", "text", "alpha") == []
+    assert [h["id"] for h in index.search("docs", "text", "gamma")] == ["a"]
+
+    index.remove("docs", ["b"])
+    assert index.search("docs", "text", "beta") == []
+    index.drop("docs")
+    assert index.search("docs", "text", "gamma") == []
+    # Searching is read-only: it does not recreate the dropped tables.
+    with sqlite3.connect(index.path) as conn:
+        assert conn.execute("SELECT count(*) FROM sqlite_master WHERE name LIKE 'lex_%'").fetchone() == (0,)
+
+
+def test_wrapper_initialises_the_base_store_and_close_stops_the_executor(tmp_path, index: LexicalIndex) -> None:
+    store = LexicalIndexedStore(NumpyVectorStore(tmp_path / "numpy"), index)
+    assert store._settings == {}
+    store.close()
+    index.close()
+    with pytest.raises(RuntimeError):
+        index.executor.submit(print)
+
+
+def test_reciprocal_rank_fusion_rewards_agreement() -> None:
+    fused = reciprocal_rank_fusion({
+        "vector": [{"id": "x"}, {"id": "y"}, {"id": "z"}],
+        "lexical": [{"id": "y"}, {"id": "z"}],
+    }, k=60)
+    assert [h["id"] for h in fused] == ["y", "z", "x"]
+    assert fused[0]["ranks"] == {"vector": 2, "lexical": 1}
+    assert fused[0]["score"] == pytest.approx(1 / 62 + 1 / 61)
+    assert fused[2]["ranks"] == {"vector": 1}
+
+
+def test_hybrid_search_endpoint(monkeypatch: pytest.MonkeyPatch, tmp_path, index: LexicalIndex) -> None:
+    monkeypatch.delenv("KONTROLA_AGENT_SHARED_SECRET", raising=False)
+    store = LexicalIndexedStore(NumpyVectorStore(tmp_path / "numpy"), index)
+    monkeypatch.setattr(main, "vector_store", store)
+    monkeypatch.setattr(main, "lexical_index", index)
+    store.insert("docs", [[1.0, 0.0], [0.0, 1.0], [0.7, 0.7]], [
+        {"text": "install a backup plugin"},
+        {"text": "speed up page caching"},
+        {"text": "nothing relevant"},
+    ], ids=["backup", "cache", "other"])
+    client = TestClient(main.app)
+
+    r = client.post("/vector/search", json={
+        "collection": "docs", "query_vector": [1.0, 0.0], "top_k": 2, "mode": "hybrid", "query_text": "caching",
+    })
+    body = r.json()
+    assert r.status_code == 200
+    assert [h["id"] for h in body["results"]] == ["cache", "backup"]
+    assert body["results"][0]["ranks"] == {"vector": 3, "lexical": 1}
+    assert set(body["latency_ms"]) == {"vector_ms", "lexical_ms", "fusion_ms", "total_ms"}
+
+    r = client.post("/vector/search", json={"collection": "docs", "query_vector": [1.0, 0.0], "mode": "hybrid"})
+    assert r.status_code == 400
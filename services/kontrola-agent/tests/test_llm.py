@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+from app.llm import UpstreamError, UpstreamScheduler
+
+
+def test_scheduler_shares_identical_in_flight_calls() -> None:
+    scheduler = UpstreamScheduler("test")
+    calls = 0
+
+    async def call() -> str:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return "text"
+
+    async def run() -> list[str]:
+        return await asyncio.gather(*(scheduler.run("same-prompt", call) for _ in range(4)))
+
+    assert asyncio.run(run()) == ["text"] * 4
+    assert calls == 1
+    stats = scheduler.stats()
+    assert stats["requests"] == 4
+    assert stats["deduplicated"] == 3
+
+
+def test_scheduler_retries_rate_limits_and_backs_off_rate() -> None:
+    scheduler = UpstreamScheduler("test", rate=100, burst=10, backoff_base=0.0)
+    attempts = 0
+
+    async def call() -> str:
+        nonlocal attempts
+        attempts += 1
+        if attempts < 3:
+            raise UpstreamError(429, "slow down")
+        return "ok"
+
+    assert asyncio.run(scheduler.run(None, call)) == "ok"
+    stats = scheduler.stats()
+    assert stats["retries"] == 2
+    assert stats["rate_limited"] == 2
+    assert stats["rate_limit_rps"] < 100
+
+
+def test_scheduler_does_not_retry_client_errors() -> None:
+    scheduler = UpstreamScheduler("test", backoff_base=0.0)
+    attempts = 0
+
+    async def call() -> str:
+        nonlocal attempts
+        attempts += 1
+        raise UpstreamError(400, "bad request")
+
+    with pytest.raises(UpstreamError):
+        asyncio.run(scheduler.run(None, call))
+    assert attempts == 1
+    assert scheduler.stats()["failures"] == 1
+
+
+def test_scheduler_caps_concurrency_and_reports_queue_depth() -> None:
+    scheduler = UpstreamScheduler("test", rate=1000, burst=100, max_concurrency=2)
+    running = 0
+    peak = 0
+    depths: list[int] = []
+
+    async def call() -> None:
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        depths.append(scheduler.stats()["queue_depth"])
+        await asyncio.sleep(0.02)
+        running -= 1
+
+    async def run() -> None:
+        await asyncio.gather(*(scheduler.run(None, call) for _ in range(6)))
+
+    asyncio.run(run())
+    assert peak == 2
+    assert max(depths) > 0
+    assert scheduler.stats()["queue_depth"] == 0
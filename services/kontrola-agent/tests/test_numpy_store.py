@@ -0,0 +1,143 @@
+import numpy as np
+import pytest
+
+from app.numpy_store import NumpyVectorStore
+
+
+@pytest.fixture
+def store(tmp_path) -> NumpyVectorStore:
+    return NumpyVectorStore(tmp_path)
+
+
+def test_search_matches_brute_force(store: NumpyVectorStore) -> None:
+    rng = np.random.default_rng(0)
+    data = rng.normal(size=(500, 16)).astype(np.float32)
+    store.insert("docs", data, [{"i": i} for i in range(500)], ids=[str(i) for i in range(500)])
+
+    queries = rng.normal(size=(3, 16)).astype(np.float32)
+    results = store.search_batch("docs", queries, top_k=5)
+    for q, hits in zip(queries, results):
+        expected = np.argsort(((data - q) ** 2).sum(axis=1))[:5]
+        assert [h["id"] for h in hits] == [str(i) for i in expected]
+        assert hits[0]["score"] == pytest.approx(float(((data[expected[0]] - q) ** 2).sum()), rel=1e-4)
+
+
+def test_filter_is_applied_before_top_k(store: NumpyVectorStore) -> None:
+    vectors = [[float(i), 0.0] for i in range(10)]
+    metadata = [{"lang": "en" if i % 5 == 0 else "de"} for i in range(10)]
+    store.insert("docs", vectors, metadata, ids=[str(i) for i in range(10)])
+
+    hits = store.search("docs", [0.0, 0.0], top_k=3, filter_dict={"lang": "en"})
+    assert [h["id"] for h in hits] == ["0", "5"]
+
+    # Postings built by the first filter are kept current by later inserts.
+    store.insert("docs", [[1.0, 0.0]], [{"lang": "en"}], ids=["new"])
+    hits = store.search("docs", [0.0, 0.0], top_k=3, filter_dict={"lang": "en"})
+    assert [h["id"] for h in hits] == ["0", "new", "5"]
+
+
+def test_range_and_or_filters(store: NumpyVectorStore) -> None:
+    vectors = [[float(i), 0.0] for i in range(10)]
+    store.insert("docs", vectors, [{"n": i} for i in range(10)], ids=[str(i) for i in range(10)])
+
+    hits = store.search("docs", [0.0, 0.0], top_k=3, filter_dict={"n": {"$gte": 4}})
+    assert [h["id"] for h in hits] == ["4", "5", "6"]
+    hits = store.search("docs", [0.0, 0.0], top_k=3, filter_dict={"$or": [{"n": 9}, {"n": {"$lt": 1}}]})
+    assert [h["id"] for h in hits] == ["0", "9"]
+
+
+def test_upserts_and_deletes_survive_reopen(store: NumpyVectorStore, tmp_path) -> None:
+    store.insert("docs", [[0.0, 0.0], [5.0, 5.0]], [{"v": 1}, {"v": 1}], ids=["a", "b"])
+    store.insert("docs", [[9.0, 9.0]], [{"v": 2}], ids=["a"])
+    store.delete("docs", ["b"])
+
+    reopened = NumpyVectorStore(tmp_path)
+    hits = reopened.search("docs", [0.0, 0.0], top_k=10)
+    assert [(h["id"], h["metadata"]) for h in hits] == [("a", {"v": 2})]
+
+
+def test_orphan_rows_from_an_interrupted_insert_are_dropped(store: NumpyVectorStore, tmp_path) -> None:
+    store.insert("docs", [[1.0, 1.0]], [{}], ids=["a"])
+    with open(tmp_path / "docs" / "vectors.f32", "ab") as f:
+        f.write(np.zeros(2, dtype=np.float32).tobytes())
+
+    reopened = NumpyVectorStore(tmp_path)
+    reopened.insert("docs", [[2.0, 2.0]], [{}], ids=["b"])
+    hits = reopened.search("docs", [2.0, 2.0], top_k=1)
+    assert hits[0]["id"] == "b"
+    assert hits[0]["score"] == pytest.approx(0.0)
+
+
+def test_compact_drops_retired_rows(store: NumpyVectorStore, tmp_path) -> None:
+    store.insert("docs", [[float(i), 0.0] for i in range(4)], [{}] * 4, ids=list("abcd"))
+    store.delete("docs", ["a", "c"])
+    store.compact("docs")
+
+    assert (tmp_path / "docs" / "vectors.f32").stat().st_size == 2 * 2 * 4
+    assert [h["id"] for h in store.search("docs", [0.0, 0.0])] == ["b", "d"]
+    assert [h["id"] for h in NumpyVectorStore(tmp_path).search("docs", [0.0, 0.0])] == ["b", "d"]
+
+
+@pytest.mark.parametrize("quantization", ["int8", "float16"])
+def test_quantized_search_reranks_at_full_precision(store: NumpyVectorStore, tmp_path, quantization: str) -> None:
+    rng = np.random.default_rng(1)
+    data = rng.normal(size=(2000, 32)).astype(np.float32)
+    store.create_collection("docs", 32, quantization=quantization)
+    store.insert("docs", data, [{}] * 2000, ids=[str(i) for i in range(2000)])
+
+    queries = rng.normal(size=(20, 32)).astype(np.float32)
+    report = store.recall_at_k("docs", queries, top_k=10)
+    assert report["queries"] == 20 and report["recall"] >= 0.95
+
+    # Re-ranked scores are exact distances; rerank=0 returns the approximate ones.
+    hit = store.search("docs", queries[0], top_k=1)[0]
+    assert hit["score"] == pytest.approx(float(((data[int(hit["id"])] - queries[0]) ** 2).sum()), rel=1e-5)
+    assert store.search("docs", queries[0], top_k=10, search_params={"rerank": 0})
+
+    footprint = NumpyVectorStore(tmp_path).footprint("docs")
+    assert footprint["quantization"] == quantization
+    assert footprint["compression"] > (3 if quantization == "int8" else 1.8)
+
+    with pytest.raises(ValueError):
+        store.create_collection("docs", 32, quantization="float16" if quantization == "int8" else "int8")
+    with pytest.raises(ValueError):
+        store.create_collection("other", 32, quantization="pq")
+
+
+def test_insert_rejects_mismatched_lengths(store: NumpyVectorStore, tmp_path) -> None:
+    with pytest.raises(ValueError):
+        store.insert("docs", [[1.0, 0.0], [0.0, 1.0], [1.0, 1.0]], [{}, {}], ids=["a", "b", "c"])
+    with pytest.raises(ValueError):
+        store.insert("docs", [[1.0, 0.0], [0.0, 1.0]], [{}, {}], ids=["a"])
+    store.insert("docs", [[5.0, 5.0]], [{}], ids=["z"])
+    assert store.search("docs", [5.0, 5.0], top_k=1)[0]["id"] == "z"
+    assert (tmp_path / "docs" / "vectors.f32").stat().st_size == 2 * 4
+
+
+def test_insert_racing_compact_lands_in_the_fresh_collection(store: NumpyVectorStore, tmp_path, monkeypatch) -> None:
+    store.insert("docs", [[1.0, 0.0], [0.0, 1.0]], [{}, {}], ids=["a", "b"])
+    store.delete("docs", ["a"])
+    stale = store._open("docs")
+    store.compact("docs")
+
+    # The insert resolved the collection just before compact swapped it out.
+    opened = iter([stale])
+    open_ = store._open
+    monkeypatch.setattr(store, "_open", lambda name, dimension=None: next(opened, None) or open_(name, dimension))
+    store.insert("docs", [[3.0, 4.0]], [{}], ids=["c"])
+
+    assert store.search("docs", [3.0, 4.0], top_k=1)[0]["id"] == "c"
+    assert NumpyVectorStore(tmp_path).search("docs", [3.0, 4.0], top_k=1)[0]["id"] == "c"
+
+
+def test_tune_defaults_survive_reopen_and_compaction(store: NumpyVectorStore, tmp_path) -> None:
+    store.insert("docs", [[1.0, 0.0], [0.0, 1.0]], [{}, {}], ids=["a", "b"])
+    assert store.tune("docs", rerank=2) == {"rerank": 2}
+    store.delete("docs", ["a"])
+    store.compact("docs")
+
+    reopened = NumpyVectorStore(tmp_path)
+    assert reopened._search_params("docs", None) == {"rerank": 2}
+    assert reopened.search("docs", [0.0, 1.0], top_k=1)[0]["id"] == "b"
+    reopened.drop_collection("docs")
+    assert NumpyVectorStore(tmp_path)._search_params("docs", None) == {}
@@ -1,5 +1,8 @@
+import asyncio
+import json
 import os
 import sqlite3
+import time
 from pathlib import Path
 
 import pytest
@@ -91,3 +94,236 @@ def test_query_latest_items_raises_on_unrecognized_schema(tmp_path: Path) -> Non
 
     with pytest.raises(HTTPException):
         main._query_latest_items(db, kind="news", limit=5)
+
+
+class _ConnectedRequest:
+    async def is_disconnected(self) -> bool:
+        return False
+
+
+class _DisconnectedRequest:
+    async def is_disconnected(self) -> bool:
+        return True
+
+
+def _start_fake_trendradar(monkeypatch: pytest.MonkeyPatch) -> None:
+    from concurrent.futures import ThreadPoolExecutor
+
+    from app.db_pool import ConnectionPool
+
+    class FakeConn:
+        def close(self) -> None:
+            pass
+
+    monkeypatch.setattr(main, "trendradar_pool", ConnectionPool(FakeConn, size=2))
+    monkeypatch.setattr(main, "trendradar_executor", ThreadPoolExecutor(max_workers=2))
+
+
+def test_run_trendradar_query_returns_result(monkeypatch: pytest.MonkeyPatch) -> None:
+    _start_fake_trendradar(monkeypatch)
+
+    result = asyncio.run(main._run_trendradar_query(_ConnectedRequest(), lambda conn: "rows"))
+    assert result == "rows"
+
+
+def test_run_trendradar_query_times_out(monkeypatch: pytest.MonkeyPatch) -> None:
+    _start_fake_trendradar(monkeypatch)
+    monkeypatch.setenv("TRENDRADAR_QUERY_TIMEOUT", "0.05")
+
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(main._run_trendradar_query(_ConnectedRequest(), lambda conn: time.sleep(0.5)))
+    assert exc.value.status_code == 504
+
+
+def test_run_trendradar_query_stops_on_client_disconnect(monkeypatch: pytest.MonkeyPatch) -> None:
+    _start_fake_trendradar(monkeypatch)
+
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(main._run_trendradar_query(_DisconnectedRequest(), lambda conn: time.sleep(0.5)))
+    assert exc.value.status_code == 499
+
+
+def test_latest_rows_sql_uses_half_open_day_range() -> None:
+    from datetime import date, datetime
+
+    sql, params = main._latest_rows_sql("news_items", "`id`, `title`", date(2025, 12, 30), 10)
+    assert "DATE(" not in sql
+    assert "created_at >= %s AND created_at < %s" in sql
+    assert params == (datetime(2025, 12, 30), datetime(2025, 12, 31), 10)
+
+
+def test_recent_dates_walks_back_one_day_per_probe() -> None:
+    from datetime import datetime
+
+    newest = [datetime(2025, 12, 30, 18), datetime(2025, 12, 28, 9), None]
+
+    class FakeCursor:
+        def __init__(self) -> None:
+            self.params: list[tuple] = []
+
+        def execute(self, sql: str, params: tuple = ()) -> None:
+            self.params.append(params)
+
+        def fetchone(self) -> tuple:
+            return (newest[len(self.params) - 1],)
+
+    cursor = FakeCursor()
+    assert main._recent_dates(cursor, "news_items") == ["2025-12-30", "2025-12-28"]
+    assert cursor.params[1] == (datetime(2025, 12, 30),)
+
+
+def test_trends_cursor_round_trips_keyset_position() -> None:
+    from datetime import datetime
+
+    row = {"id": 7, "rank": 3, "created_at": datetime(2025, 12, 30, 8, 15)}
+    assert main._decode_trends_cursor(main._encode_trends_cursor(row)) == (datetime(2025, 12, 30, 8, 15), 3, 7)
+
+    with pytest.raises(HTTPException):
+        main._decode_trends_cursor("not-a-cursor")
+
+
+def test_latest_rows_sql_seeks_past_cursor_instead_of_offset() -> None:
+    from datetime import datetime
+
+    after = (datetime(2025, 12, 30, 8), 3, 7)
+    sql, params = main._latest_rows_sql("news_items", "*", None, 50, after)
+    assert "OFFSET" not in sql
+    assert sql.endswith("ORDER BY created_at DESC, `rank` ASC, id ASC LIMIT %s")
+    assert params == (after[0], after[0], 3, 3, 7, 50)
+
+
+def test_iter_db_files_picks_up_new_day_files(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("TRENDRADAR_OUTPUT_DIR", str(tmp_path))
+    schema = ["CREATE TABLE news_items(id INTEGER PRIMARY KEY, title TEXT)"]
+    _write_sqlite(tmp_path / "news" / "2025-12-29.db", schema)
+    assert [d for d, _ in main._iter_db_files("news")] == ["2025-12-29"]
+
+    _write_sqlite(tmp_path / "news" / "2025-12-30.db", schema)
+    os.utime(tmp_path / "news", ns=(time.time_ns() + 10**9,) * 2)
+    assert [d for d, _ in main._iter_db_files("news")] == ["2025-12-29", "2025-12-30"]
+
+
+def test_query_latest_items_sees_rewritten_day_file(tmp_path: Path) -> None:
+    db = tmp_path / "news" / "2025-12-30.db"
+    _write_sqlite(
+        db,
+        [
+            "CREATE TABLE news_items(id INTEGER PRIMARY KEY, title TEXT, rank INTEGER)",
+            "INSERT INTO news_items(id, title, rank) VALUES (1, 'old', 1)",
+        ],
+    )
+    assert main._query_latest_items(db, kind="news", limit=5)[0]["title"] == "old"
+    assert main._query_latest_items(db, kind="news", limit=5)[0]["title"] == "old"
+
+    _write_sqlite(db, ["UPDATE news_items SET title = 'new'"])
+    os.utime(db, ns=(time.time_ns() + 10**9,) * 2)
+    assert main._query_latest_items(db, kind="news", limit=5)[0]["title"] == "new"
+
+
+def test_merge_ranked_days_takes_top_items_across_days() -> None:
+    from datetime import date
+
+    per_day = [
+        (date(2025, 12, 29), [{"title": "a1", "rank": 1}, {"title": "a3", "rank": 3}]),
+        (date(2025, 12, 30), [{"title": "b1", "rank": 1}, {"title": "b2", "rank": 2}, {"title": "b9", "rank": 9}]),
+    ]
+
+    merged = main._merge_ranked_days(per_day, limit=3)
+    assert [i["title"] for i in merged] == ["b1", "a1", "b2"]
+    assert merged[0]["date"] == "2025-12-30"
+
+
+def test_sqlite_interrupt_only_stops_the_owning_job(tmp_path: Path) -> None:
+    from app.trends_sqlite import SQLiteConnectionCache
+
+    db = tmp_path / "news" / "2025-12-30.db"
+    _write_sqlite(db, ["CREATE TABLE news_items(id INTEGER PRIMARY KEY, title TEXT)"])
+    cache = SQLiteConnectionCache()
+    running, waiting = object(), object()
+    interrupted = []
+    with cache.connect(db, running) as (conn, _):
+        entry = cache._open[db]
+        entry.conn = type("Conn", (), {"interrupt": lambda self: interrupted.append(True)})()
+        cache.interrupt(db, waiting)
+        assert interrupted == []
+        cache.interrupt(db, running)
+        assert interrupted == [True]
+        entry.conn = conn
+
+
+def test_sqlite_trends_version_ignores_vanished_day_file(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("TRENDRADAR_STORAGE_BACKEND", "sqlite")
+    monkeypatch.setattr(main, "_iter_db_files", lambda kind: [("2025-12-30", tmp_path / f"{kind}.db")])
+    assert asyncio.run(main._trends_cache_version(None))
+
+
+def test_day_rows_put_unranked_items_last_for_the_merge() -> None:
+    from datetime import date, datetime
+
+    sql, _ = main._latest_rows_sql("news_items", "*", date(2025, 12, 30), 10)
+    assert "ORDER BY `rank` IS NULL, `rank` ASC" in sql
+    after = (datetime(2025, 12, 30, 8), None, 7)
+    sql, params = main._latest_rows_sql("news_items", "*", date(2025, 12, 30), 10, after)
+    assert "(`rank` IS NULL AND (created_at < %s" in sql
+    assert params[2:] == (after[0], after[0], 7, 10)
+
+    per_day = [
+        (date(2025, 12, 29), [{"title": "a1", "rank": 1}, {"title": "a-", "rank": None}]),
+        (date(2025, 12, 30), [{"title": "b2", "rank": 2}, {"title": "b-", "rank": None}]),
+    ]
+    assert [i["title"] for i in main._merge_ranked_days(per_day, limit=4)] == ["a1", "b2", "b-", "a-"]
+
+
+def test_run_trendradar_query_timeout_starts_when_the_job_runs(monkeypatch: pytest.MonkeyPatch) -> None:
+    from concurrent.futures import ThreadPoolExecutor
+
+    _start_fake_trendradar(monkeypatch)
+    monkeypatch.setattr(main, "trendradar_executor", ThreadPoolExecutor(max_workers=1))
+    monkeypatch.setenv("TRENDRADAR_QUERY_TIMEOUT", "0.3")
+
+    def job(name: str):
+        return lambda conn: time.sleep(0.2) or name
+
+    async def run() -> list[str]:
+        return await asyncio.gather(*(main._run_trendradar_query(_ConnectedRequest(), job(n)) for n in ("a", "b")))
+
+    # "b" waits 0.2s for the only worker, then runs for 0.2s: within its own budget.
+    assert asyncio.run(run()) == ["a", "b"]
+
+
+def test_stream_uses_its_own_capped_connections(monkeypatch: pytest.MonkeyPatch) -> None:
+    _start_fake_trendradar(monkeypatch)
+
+    def connect():
+        raise ConnectionError("db down")
+
+    monkeypatch.setattr(main, "_connect_trendradar_mysql", connect)
+
+    async def first_line(slots: int) -> dict:
+        monkeypatch.setattr(main, "trendradar_stream_slots", asyncio.Semaphore(slots))
+        async for chunk in main._stream_trend_items(_ConnectedRequest(), "news_items", None, None, 10):
+            return json.loads(chunk)
+
+    assert asyncio.run(first_line(1)) == {"error": "TrendRadar MySQL backend unavailable: db down"}
+    assert main.trendradar_pool.stats()["created"] == 0
+    assert "Too many concurrent" in asyncio.run(first_line(0))["error"]
+
+
+def test_sqlite_connect_reopens_an_entry_evicted_before_it_was_locked(tmp_path: Path) -> None:
+    from app.trends_sqlite import SQLiteConnectionCache
+
+    db = tmp_path / "news" / "2025-12-30.db"
+    _write_sqlite(db, ["CREATE TABLE news_items(id INTEGER PRIMARY KEY, title TEXT)"])
+    cache = SQLiteConnectionCache(max_open=1)
+    entry = cache._entry(db)
+    stale = iter([entry])
+    fresh = cache._entry
+    cache._entry = lambda path: next(stale, None) or fresh(path)
+    # Another thread opens a second file, evicting (and closing) the entry we hold.
+    _write_sqlite(tmp_path / "news" / "2025-12-31.db", ["CREATE TABLE news_items(id INTEGER PRIMARY KEY)"])
+    fresh(tmp_path / "news" / "2025-12-31.db")
+    assert entry.closed
+
+    with cache.connect(db) as (conn, schema):
+        assert conn.execute("SELECT count(*) FROM news_items").fetchone()[0] == 0
+        assert "news_items" in schema
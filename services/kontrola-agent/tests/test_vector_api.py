@@ -0,0 +1,125 @@
+import base64
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+from app.vector_wire import VectorDecodeError, decode_matrix
+
+
+class RecordingStore:
+    def __init__(self) -> None:
+        self.inserted = None
+        self.queries = []
+
+    def insert(self, collection, vectors, metadata, ids=None) -> None:
+        self.inserted = vectors
+
+    def search(self, collection, query_vector, top_k=10, filter_dict=None, search_params=None):
+        self.queries.append(query_vector)
+        return [{"id": "a", "score": 0.0, "metadata": {}}]
+
+    def search_batch(self, collection, query_vectors, top_k=10, filter_dict=None, search_params=None):
+        return [self.search(collection, q, top_k) for q in query_vectors]
+
+
+@pytest.fixture
+def store(monkeypatch: pytest.MonkeyPatch) -> RecordingStore:
+    monkeypatch.delenv("KONTROLA_AGENT_SHARED_SECRET", raising=False)
+    fake = RecordingStore()
+    monkeypatch.setattr(main, "vector_store", fake)
+    return fake
+
+
+def _b64(values, dtype="<f4") -> str:
+    return base64.b64encode(np.asarray(values, dtype=dtype).tobytes()).decode()
+
+
+def test_decode_matrix_reads_little_endian_float16_rows() -> None:
+    data = np.array([[1.0, 2.0], [3.0, 4.5]], dtype="<f2").tobytes()
+    matrix = decode_matrix(data, "float16", 2)
+    assert matrix.dtype == np.float32
+    assert matrix.tolist() == [[1.0, 2.0], [3.0, 4.5]]
+    with pytest.raises(VectorDecodeError):
+        decode_matrix(data, "float16", 3)
+
+
+def test_insert_accepts_base64_vectors_as_numpy(store: RecordingStore) -> None:
+    client = TestClient(main.app)
+    r = client.post("/vector/insert", json={
+        "collection": "docs",
+        "vectors_bin": _b64([[0.5, 1.0], [2.0, 3.0]]),
+        "dimension": 2,
+        "metadata": [{}, {}],
+    })
+    assert r.status_code == 200
+    assert r.json()["inserted"] == 2
+    assert isinstance(store.inserted, np.ndarray)
+    assert store.inserted.tolist() == [[0.5, 1.0], [2.0, 3.0]]
+
+
+def test_insert_rejects_ids_of_the_wrong_length(store: RecordingStore) -> None:
+    client = TestClient(main.app)
+    r = client.post("/vector/insert", json={"collection": "docs", "vectors": [[0.5, 1.0]], "metadata": [{}], "ids": ["a", "b"]})
+    assert r.status_code == 400
+    assert store.inserted is None
+
+
+def test_search_accepts_json_and_base64_query_alike(store: RecordingStore) -> None:
+    client = TestClient(main.app)
+    assert client.post("/vector/search", json={"collection": "docs", "query_vector": [1.0, 2.0]}).status_code == 200
+    r = client.post("/vector/search", json={"collection": "docs", "query_vector_bin": _b64([1.0, 2.0], "<f2"), "dtype": "float16"})
+    assert r.status_code == 200
+    assert [q.tolist() for q in store.queries] == [[1.0, 2.0], [1.0, 2.0]]
+
+
+def test_malformed_binary_vectors_are_rejected(store: RecordingStore) -> None:
+    client = TestClient(main.app)
+    r = client.post("/vector/insert", json={
+        "collection": "docs",
+        "vectors_bin": _b64([1.0, 2.0, 3.0]),
+        "dimension": 2,
+        "metadata": [{}],
+    })
+    assert r.status_code == 400
+    assert client.post("/vector/search", json={"collection": "docs"}).status_code == 400
+
+
+def test_msgpack_bodies_carry_raw_bytes(store: RecordingStore) -> None:
+    msgpack = pytest.importorskip("msgpack")
+    client = TestClient(main.app)
+    body = msgpack.packb({
+        "collection": "docs",
+        "query_vectors_bin": np.array([[1, 0], [0, 1]], dtype="<f4").tobytes(),
+        "dimension": 2,
+    })
+    r = client.post(
+        "/vector/search/batch",
+        content=body,
+        headers={"content-type": "application/msgpack", "accept": "application/msgpack"},
+    )
+    assert r.status_code == 200
+    assert len(msgpack.unpackb(r.content)["results"]) == 2
+
+
+def test_quantized_collection_report(monkeypatch: pytest.MonkeyPatch, tmp_path) -> None:
+    from app.numpy_store import NumpyVectorStore
+
+    monkeypatch.delenv("KONTROLA_AGENT_SHARED_SECRET", raising=False)
+    monkeypatch.setattr(main, "vector_store", NumpyVectorStore(tmp_path))
+    client = TestClient(main.app)
+
+    r = client.post("/vector/collection", json={"collection": "docs", "dimension": 8, "quantization": "pq"})
+    assert r.status_code == 400
+    r = client.post("/vector/collection", json={"collection": "docs", "dimension": 8, "quantization": "int8"})
+    assert r.status_code == 200
+
+    data = np.random.default_rng(0).normal(size=(200, 8))
+    client.post("/vector/insert", json={"collection": "docs", "vectors": data.tolist(), "metadata": [{}] * 200})
+    r = client.post("/vector/collection/report", json={"collection": "docs", "query_vectors": data[:5].tolist(), "top_k": 5})
+    body = r.json()
+    assert body["footprint"]["quantization"] == "int8"
+    assert body["recall"]["queries"] == 5 and body["recall"]["recall"] > 0.9
+
+    assert client.post("/vector/collection/report", json={"collection": "missing"}).status_code == 404
@@ -0,0 +1,83 @@
+import pytest
+
+from app.numpy_store import NumpyVectorStore
+from app.vector_cache import CachedVectorStore
+
+
+class FakeRedis:
+    def __init__(self) -> None:
+        self.data: dict[str, str] = {}
+
+    def get(self, key: str):
+        return self.data.get(key)
+
+    def set(self, key: str, value: str, ex: int | None = None) -> None:
+        self.data[key] = value
+
+    def incr(self, key: str) -> int:
+        self.data[key] = str(int(self.data.get(key, 0)) + 1)
+        return int(self.data[key])
+
+
+class CountingStore(NumpyVectorStore):
+    def __init__(self, root) -> None:
+        super().__init__(root)
+        self.searches = 0
+
+    def search_batch(self, *args, **kwargs):
+        self.searches += 1
+        return super().search_batch(*args, **kwargs)
+
+
+@pytest.fixture(params=["memory", "redis"])
+def stores(request, tmp_path):
+    inner = CountingStore(tmp_path)
+    redis = FakeRedis() if request.param == "redis" else None
+    return inner, CachedVectorStore(inner, request.param, redis)
+
+
+def test_repeated_search_is_served_from_cache(stores) -> None:
+    inner, store = stores
+    store.insert("docs", [[0.0, 0.0], [1.0, 1.0]], [{"lang": "en"}, {"lang": "de"}], ids=["a", "b"])
+
+    first = store.search("docs", [0.1, 0.1], top_k=1, filter_dict={"lang": "en"})
+    # Float noise below float16 resolution maps to the same key.
+    again = store.search("docs", [0.1000001, 0.1], top_k=1, filter_dict={"lang": {"$eq": "en"}})
+    assert first == again == [{"id": "a", "score": pytest.approx(0.02), "metadata": {"lang": "en"}}]
+    assert inner.searches == 1
+    assert store.stats()["hits"] == 1
+
+    store.search("docs", [0.1, 0.1], top_k=2)
+    assert inner.searches == 2
+
+
+def test_writes_bump_the_collection_version(stores) -> None:
+    inner, store = stores
+    store.insert("docs", [[1.0, 1.0]], [{}], ids=["far"])
+    assert store.search("docs", [0.0, 0.0], top_k=1)[0]["id"] == "far"
+
+    store.insert("docs", [[0.0, 0.0]], [{}], ids=["near"])
+    assert store.search("docs", [0.0, 0.0], top_k=1)[0]["id"] == "near"
+    store.delete("docs", ["near"])
+    assert store.search("docs", [0.0, 0.0], top_k=1)[0]["id"] == "far"
+    assert inner.searches == 3
+
+
+def test_batch_only_searches_missing_queries(stores) -> None:
+    inner, store = stores
+    store.insert("docs", [[0.0, 0.0], [5.0, 5.0]], [{}, {}], ids=["a", "b"])
+    store.search("docs", [0.0, 0.0], top_k=1)
+
+    results = store.search_batch("docs", [[0.0, 0.0], [5.0, 5.0]], top_k=1)
+    assert [r[0]["id"] for r in results] == ["a", "b"]
+    assert store.stats()["hits"] == 1 and store.stats()["misses"] == 2
+
+
+def test_memory_mode_keeps_versions_local_even_with_a_redis_client(tmp_path) -> None:
+    inner, redis = CountingStore(tmp_path), FakeRedis()
+    store = CachedVectorStore(inner, "memory", redis)
+    store.insert("docs", [[1.0, 1.0]], [{}], ids=["a"])
+    store.search("docs", [1.0, 1.0], top_k=1)
+    store.insert("docs", [[0.0, 0.0]], [{}], ids=["b"])
+    assert store.search("docs", [0.0, 0.0], top_k=1)[0]["id"] == "b"
+    assert redis.data == {}
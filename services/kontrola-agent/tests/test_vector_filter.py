@@ -0,0 +1,48 @@
+import pytest
+
+from app.vector_filter import (
+    And,
+    Condition,
+    equalities,
+    matches,
+    parse_filter,
+    to_lance_where,
+    to_milvus_expr,
+    to_mongo,
+    to_pg_where,
+)
+
+
+def test_parse_keeps_plain_equality_filters_working() -> None:
+    expr = parse_filter({"lang": "en", "year": {"$gte": 2020}})
+    assert expr == And((Condition("lang", "$eq", "en"), Condition("year", "$gte", 2020)))
+    assert equalities(parse_filter({"lang": "en", "site": 1})) == {"lang": "en", "site": 1}
+    assert equalities(expr) is None
+    assert parse_filter({}) is None
+
+
+@pytest.mark.parametrize("bad", [{"$not": {}}, {"a": {"$like": "x"}}, {"a": {"$in": "x"}}, {"$or": []}, {"a": {}}, {"a": {"$gt": True}}, {"a": {"$lte": None}}])
+def test_parse_rejects_malformed_filters(bad) -> None:
+    with pytest.raises(ValueError):
+        parse_filter(bad)
+
+
+def test_backend_renderings() -> None:
+    expr = parse_filter({"$or": [{"lang": "en"}, {"year": {"$lt": 2000}}], "tag": {"$nin": ["a", "it's"]}})
+
+    assert to_lance_where(expr) == "((lang = 'en' OR year < 2000) AND tag NOT IN ('a', 'it''s'))"
+    assert to_milvus_expr(expr) == '((metadata["lang"] == "en" or metadata["year"] < 2000) and metadata["tag"] not in ["a", "it\'s"])'
+    assert to_mongo(expr) == {"$and": [{"$or": [{"lang": {"$eq": "en"}}, {"year": {"$lt": 2000}}]}, {"tag": {"$nin": ["a", "it's"]}}]}
+
+    sql, params = to_pg_where(expr)
+    assert sql.startswith("((metadata @> %s::jsonb OR (CASE WHEN jsonb_typeof(metadata -> %s) = 'number'")
+    assert sql.endswith("AND NOT (metadata @> %s::jsonb OR metadata @> %s::jsonb))")
+    assert params == ['{"lang": "en"}', "year", "year", 2000, '{"tag": "a"}', '{"tag": "it\'s"}']
+
+
+def test_matches_evaluates_expressions() -> None:
+    expr = parse_filter({"year": {"$gte": 2020}, "lang": {"$in": ["en", "de"]}})
+    assert matches(expr, {"year": 2021, "lang": "de"})
+    assert not matches(expr, {"year": 2019, "lang": "de"})
+    assert not matches(expr, {"year": "recent", "lang": "en"})
+    assert matches(parse_filter({"lang": {"$ne": "en"}}), {})
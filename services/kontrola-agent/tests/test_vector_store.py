@@ -0,0 +1,377 @@
+import pytest
+
+from app.vector_store import HandleCache, LanceDBStore, VectorStore
+
+
+class FakeTable:
+    def __init__(self, rows: list[dict]) -> None:
+        self.rows = list(rows)
+        self.metadata: dict[bytes, bytes] | None = None
+
+    @property
+    def schema(self) -> "FakeTable":
+        # Stands in for the pyarrow schema (.metadata) and the Lance dataset.
+        return self
+
+    def to_lance(self) -> "FakeTable":
+        return self
+
+    def replace_schema_metadata(self, metadata: dict[bytes, bytes]) -> None:
+        self.metadata = metadata
+
+    def merge_insert(self, on: str) -> "FakeMergeInsert":
+        return FakeMergeInsert(self, on)
+
+    def search(self, query) -> "FakeLanceQuery":
+        return FakeLanceQuery(self.rows, query)
+
+    def create_index(self, **kwargs) -> None:
+        self.index = kwargs
+
+
+class FakeMergeInsert:
+    def __init__(self, table: FakeTable, on: str) -> None:
+        self.table = table
+        self.on = on
+
+    def when_matched_update_all(self) -> "FakeMergeInsert":
+        return self
+
+    def when_not_matched_insert_all(self) -> "FakeMergeInsert":
+        return self
+
+    def execute(self, rows: list[dict]) -> None:
+        new = {r[self.on]: r for r in rows}
+        self.table.rows = [new.pop(r[self.on], r) for r in self.table.rows] + list(new.values())
+
+
+class FakeLanceDB:
+    def __init__(self) -> None:
+        self.tables: dict[str, FakeTable] = {}
+        self.calls: list[str] = []
+
+    def table_names(self) -> list[str]:
+        self.calls.append("table_names")
+        return list(self.tables)
+
+    def open_table(self, name: str) -> FakeTable:
+        self.calls.append("open_table")
+        return self.tables[name]
+
+    def create_table(self, name: str, data: list[dict]) -> FakeTable:
+        self.calls.append("create_table")
+        self.tables[name] = FakeTable(data)
+        return self.tables[name]
+
+    def drop_table(self, name: str) -> None:
+        del self.tables[name]
+
+
+def _lancedb_store(db: FakeLanceDB) -> LanceDBStore:
+    store = LanceDBStore.__new__(LanceDBStore)
+    VectorStore.__init__(store)
+    store.db = db
+    store._tables = HandleCache(max_size=4)
+    return store
+
+
+def test_handle_cache_is_bounded_lru() -> None:
+    cache = HandleCache(max_size=2)
+    opened: list[str] = []
+
+    def opener(name: str):
+        return lambda: opened.append(name) or name
+
+    for name in ["a", "b", "a", "c", "a", "b"]:
+        assert cache.get(name, opener(name)) == name
+
+    # "b" was evicted by "c" (least recently used) and had to be reopened.
+    assert opened == ["a", "b", "c", "b"]
+    assert cache.stats() == {"size": 2, "max_size": 2, "hits": 2, "misses": 4}
+
+
+def test_lancedb_store_reuses_table_handle() -> None:
+    db = FakeLanceDB()
+    store = _lancedb_store(db)
+
+    store.insert("docs", [[0.0, 1.0]], [{"t": 1}], ids=["a"])
+    store.insert("docs", [[1.0, 0.0]], [{"t": 2}], ids=["b"])
+    store.insert("docs", [[1.0, 1.0]], [{"t": 3}], ids=["c"])
+
+    assert db.calls == ["table_names", "create_table"]
+    assert [r["id"] for r in db.tables["docs"].rows] == ["a", "b", "c"]
+
+
+def test_lancedb_insert_upserts_by_id() -> None:
+    db = FakeLanceDB()
+    store = _lancedb_store(db)
+
+    store.insert("docs", [[0.0, 1.0], [0.5, 0.5], [1.0, 1.0]], [{"t": 1}, {"t": 2}, {"t": 3}], ids=["a", "b", "a"])
+    store.insert("docs", [[1.0, 0.0], [0.0, 0.0]], [{"t": 4}, {"t": 5}], ids=["b", "c"])
+
+    assert [(r["id"], r["t"]) for r in db.tables["docs"].rows] == [("a", 3), ("b", 4), ("c", 5)]
+
+
+def test_lancedb_store_drop_invalidates_handle() -> None:
+    db = FakeLanceDB()
+    store = _lancedb_store(db)
+    store.insert("docs", [[0.0, 1.0]], [{}], ids=["a"])
+
+    store.drop_collection("docs")
+    store.insert("docs", [[1.0, 0.0]], [{}], ids=["b"])
+
+    assert [r["id"] for r in db.tables["docs"].rows] == ["b"]
+
+
+class FakeCopy:
+    def __init__(self, rows: list[tuple]) -> None:
+        self.rows = rows
+
+    def __enter__(self) -> "FakeCopy":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+    def write_row(self, row: tuple) -> None:
+        self.rows.append(row)
+
+
+class FakePGConnection:
+    """Records statements; COPY rows are collected per transaction."""
+
+    def __init__(self) -> None:
+        self.statements: list[str] = []
+        self.copied: list[list[tuple]] = []
+        self.adapters = type("Adapters", (), {"types": {}})()
+
+    def execute(self, sql: str, params=None) -> None:
+        self.statements.append(sql)
+
+    def cursor(self) -> "FakePGConnection":
+        return self
+
+    def copy(self, sql: str) -> FakeCopy:
+        self.statements.append(sql)
+        self.copied.append([])
+        return FakeCopy(self.copied[-1])
+
+    def transaction(self) -> "FakePGConnection":
+        return self
+
+    def __enter__(self) -> "FakePGConnection":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+def test_pgvector_insert_copies_batches_and_merges_once_per_batch() -> None:
+    from app.db_pool import ConnectionPool
+    from app.vector_store import PGVectorStore
+
+    conn = FakePGConnection()
+    store = PGVectorStore.__new__(PGVectorStore)
+    store.pool = ConnectionPool(lambda: conn, size=1)
+    store.batch_size = 2
+
+    store.insert("docs", [[0.5, 1.0], [1.0, 0.0], [0.0, 0.0]], [{"a": 1}, {}, {}], ids=["x", "y", "x"])
+
+    assert [len(rows) for rows in conn.copied] == [2, 1]
+    assert conn.copied[0][0] == (0, "x", "[0.5,1.0]", '{"a": 1}')
+    assert conn.copied[1][0][:2] == (2, "x")
+    merges = [s for s in conn.statements if s.startswith("INSERT INTO docs")]
+    assert len(merges) == 2
+    assert "DISTINCT ON (id)" in merges[0] and "ON CONFLICT (id)" in merges[0]
+    # One pooled connection served the whole call.
+    assert store.pool.stats()["created"] == 1
+
+
+def test_tune_defaults_merge_with_request_overrides() -> None:
+    store = _lancedb_store(FakeLanceDB())
+    assert store.tune("docs", ef=64) == {"ef": 64}
+    assert store._search_params("docs", {"nprobe": 8}) == {"ef": 64, "nprobe": 8}
+    assert store._search_params("docs", {"ef": 128}) == {"ef": 128}
+    assert store._search_params("other", None) == {}
+
+
+def test_index_and_search_params_are_validated() -> None:
+    store = _lancedb_store(FakeLanceDB())
+    with pytest.raises(ValueError):
+        store.tune("docs", probes=4)
+    with pytest.raises(ValueError):
+        store.create_index("docs", "flat")
+    with pytest.raises(ValueError):
+        store.create_index("docs", "ivf", m=16)
+
+
+class FakeLanceQuery:
+    def __init__(self, rows: list[dict], query) -> None:
+        self.rows = rows
+        self.query = query
+        self.k = 10
+
+    def limit(self, k: int) -> "FakeLanceQuery":
+        self.k = k
+        return self
+
+    def refine_factor(self, factor: int) -> "FakeLanceQuery":
+        self.refine = factor
+        return self
+
+    def to_list(self) -> list[dict]:
+        queries = self.query if isinstance(self.query[0], list) else [self.query]
+        out = []
+        for qi, q in enumerate(queries):
+            ranked = sorted(self.rows, key=lambda r: sum((a - b) ** 2 for a, b in zip(r["vector"], q)))
+            for r in ranked[: self.k]:
+                out.append({**r, "_distance": 0.0, **({"query_index": qi} if len(queries) > 1 else {})})
+        return out
+
+
+def test_lancedb_search_batch_groups_rows_by_query_index() -> None:
+    db = FakeLanceDB()
+    store = _lancedb_store(db)
+    store.insert("docs", [[0.0, 1.0], [1.0, 0.0]], [{"t": "up"}, {"t": "right"}], ids=["u", "r"])
+
+    results = store.search_batch("docs", [[1.0, 0.1], [0.1, 1.0]], top_k=1)
+
+    assert [[r["id"] for r in rs] for rs in results] == [["r"], ["u"]]
+    assert "query_index" not in results[0][0]["metadata"]
+
+
+def test_search_batch_falls_back_to_parallel_searches() -> None:
+    class OneAtATime(VectorStore):
+        create_collection = insert = delete = health_check = None
+
+        def search(self, collection, query_vector, top_k=10, filter_dict=None, search_params=None):
+            return [{"id": str(query_vector[0]), "score": 0.0, "metadata": {}}]
+
+    results = OneAtATime().search_batch("c", [[3.0], [1.0], [2.0]])
+    assert [rs[0]["id"] for rs in results] == ["3.0", "1.0", "2.0"]
+
+
+def test_lancedb_quantization_picks_index_and_refine_factor() -> None:
+    db = FakeLanceDB()
+    store = _lancedb_store(db)
+    with pytest.raises(ValueError):
+        store.create_collection("docs", 2, quantization="float16")
+    store.create_collection("docs", 2, quantization="pq")
+    store.insert("docs", [[0.0, 1.0], [1.0, 0.0]], [{}, {}], ids=["u", "r"])
+
+    store.create_index("docs", "hnsw")
+    assert db.tables["docs"].index["index_type"] == "IVF_HNSW_PQ"
+    assert store._query("docs", [1.0, 0.0], 1, None, None).refine == 4
+    assert store._query("docs", [1.0, 0.0], 1, None, {"rerank": 8}).refine == 8
+    assert not hasattr(store._query("docs", [1.0, 0.0], 1, None, {"rerank": 0}), "refine")
+
+
+def test_qdrant_maps_string_ids_to_uuid_points() -> None:
+    from types import SimpleNamespace
+    from uuid import UUID
+
+    from app.vector_store import QdrantStore
+
+    class FakeQdrant:
+        def delete(self, collection_name: str, points_selector: list[str]) -> None:
+            self.deleted = points_selector
+
+    store = QdrantStore.__new__(QdrantStore)
+    store.client = FakeQdrant()
+    point = QdrantStore._point_id("doc-1:0")
+    assert UUID(point).version == 5 and point == QdrantStore._point_id("doc-1:0") != QdrantStore._point_id("doc-1:1")
+
+    hit = SimpleNamespace(id=point, score=0.9, payload={"lang": "en", "_id": "doc-1:0"})
+    assert QdrantStore._hit(hit) == {"id": "doc-1:0", "score": 0.9, "metadata": {"lang": "en"}}
+    store.delete("docs", ["doc-1:0"])
+    assert store.client.deleted == [point]
+
+
+def test_qdrant_without_collection_metadata_keeps_settings_in_process() -> None:
+    from types import SimpleNamespace
+
+    from app.vector_store import QdrantStore
+
+    class OldQdrant:
+        def get_collection(self, collection_name: str) -> SimpleNamespace:
+            scalar = SimpleNamespace(scalar=object(), product=None)
+            return SimpleNamespace(config=SimpleNamespace(params=SimpleNamespace(vectors=None), quantization_config=scalar))
+
+        def update_collection(self, collection_name: str) -> None:
+            raise AssertionError("old clients have no metadata to update")
+
+    store = QdrantStore.__new__(QdrantStore)
+    VectorStore.__init__(store)
+    store.client = OldQdrant()
+    store._metadata_supported = True
+    assert store._collection_settings("docs") == {"quantization": "int8"}
+    assert store._metadata_supported is False
+    store.tune("docs", ef=64)
+    assert store._collection_settings("docs") == {"quantization": "int8", "tuning": {"ef": 64}}
+    assert store._rerank("docs", {}) is not None
+
+
+def test_lancedb_settings_are_stored_with_the_table() -> None:
+    db = FakeLanceDB()
+    store = _lancedb_store(db)
+    store.create_collection("docs", 2, quantization="int8")
+    store.tune("docs", ef=64)
+    store.insert("docs", [[0.0, 1.0]], [{}], ids=["a"])
+    store.tune("docs", rerank=8)
+
+    fresh = _lancedb_store(db)
+    assert fresh._collection_settings("docs") == {"quantization": "int8", "tuning": {"ef": 64, "rerank": 8}}
+    assert fresh._query("docs", [1.0, 0.0], 1, None, None).refine == 8
+    assert fresh._collection_settings("other") == {}
+
+    fresh.drop_collection("docs")
+    fresh.insert("docs", [[0.0, 1.0]], [{}], ids=["a"])
+    assert _lancedb_store(db)._collection_settings("docs") == {}
+
+
+def test_milvus_writes_do_not_load_the_collection() -> None:
+    from app.vector_store import MilvusStore
+
+    class FakeCollection:
+        writes: list[tuple] = []
+
+        def __init__(self, name: str) -> None:
+            self.name = name
+
+        def load(self) -> None:
+            raise RuntimeError("index not found")
+
+        def upsert(self, data: list) -> None:
+            self.writes.append(("upsert", data[0]))
+
+        def delete(self, expr: str) -> None:
+            self.writes.append(("delete", expr))
+
+    store = MilvusStore.__new__(MilvusStore)
+    VectorStore.__init__(store)
+    store.Collection = FakeCollection
+    store._collections = HandleCache()
+
+    store.insert("docs", [[0.0, 1.0]], [{}], ids=["a"])
+    store.delete("docs", ["a"])
+    assert FakeCollection.writes == [("upsert", ["a"]), ("delete", "id in ['a']")]
+
+
+def test_lancedb_plain_collections_keep_full_precision_recall() -> None:
+    db = FakeLanceDB()
+    store = _lancedb_store(db)
+    store.insert("docs", [[0.0, 1.0], [1.0, 0.0]], [{}, {}], ids=["u", "r"])
+    assert not hasattr(store._query("docs", [1.0, 0.0], 1, None, None), "refine")
+
+    store.create_index("docs", "ivf", nlist=4)
+    assert db.tables["docs"].index["index_type"] == "IVF_FLAT"
+    assert not hasattr(store._query("docs", [1.0, 0.0], 1, None, None), "refine")
+
+    # HNSW indexes are SQ-coded: re-rank the shortlist unless told not to.
+    store.create_index("docs", "hnsw")
+    assert db.tables["docs"].index["index_type"] == "IVF_HNSW_SQ"
+    assert store._query("docs", [1.0, 0.0], 1, None, None).refine == 4
+    assert not hasattr(store._query("docs", [1.0, 0.0], 1, None, {"rerank": 0}), "refine")